@@ -1,13 +1,30 @@
 import os
 import sys
+import time
+import atexit
 
-from flask import Flask, request, render_template
 import numpy as np
-import pandas as pd
 
-# The project's 'src' directory is now automatically on the Python path
-# due to the 'setup.py' file. The manual fix is no longer needed.
-from engine_sentinel.pipeline.predict_pipeline import CustomData, PredictionPipeline
+from src.engine_sentinel.logger import configure_logging, logger
+from src.engine_sentinel.pipeline.startup import get_startup_profile
+
+# Import and preload times are recorded so cold starts can be tracked
+startup = get_startup_profile()
+
+with startup.phase("import"):
+    from flask import Flask, Response, g, request, render_template, jsonify
+
+    # Import through the same 'src.engine_sentinel' path the package uses internally,
+    # so the app and the pipeline share one process-wide model registry.
+    from src.engine_sentinel.pipeline.predict_pipeline import CustomData, PredictionPipeline, SnapshotScoringError
+    from src.engine_sentinel.pipeline.batch_predict_pipeline import BatchPredictionPipeline, BatchSchemaError
+    from src.engine_sentinel.pipeline.streaming_pipeline import StaleCycleError, StreamingPipeline
+    from src.engine_sentinel.metrics import (PROMETHEUS_CONTENT_TYPE, drift_monitor_collector, get_metrics,
+                                             model_registry_collector, observe_request)
+    from src.engine_sentinel.profiling import SlowRequestProfiler
+    from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+configure_logging()
 
 # Create a Flask application instance
 application = Flask(__name__)
@@ -15,6 +32,42 @@ application = Flask(__name__)
 # For convenience, we can use 'app' as well
 app = application
 
+# One pipeline per worker process; the model itself is cached by the model registry
+predict_pipeline = PredictionPipeline()
+batch_pipeline = BatchPredictionPipeline(prediction_pipeline=predict_pipeline)
+
+# Load the model before the first request. Under gunicorn with preload_app
+# (see gunicorn.conf.py) this runs once in the master and workers share it.
+with startup.phase("preload"):
+    predict_pipeline.warm_up()
+
+# Per-engine rolling state survives restarts through on-disk snapshots. Each
+# worker restores its own snapshot file on its first streaming request, saves
+# it periodically and at exit; a preloading master never claims one.
+streaming_pipeline = StreamingPipeline(prediction_pipeline=predict_pipeline)
+atexit.register(streaming_pipeline.close)
+
+# Latency histograms per endpoint and model registry counters on /metrics;
+# stacks of slow requests are sampled when ENGINE_SENTINEL_PROFILE_SLOW_MS is set
+metrics = get_metrics()
+metrics.add_collector(model_registry_collector(predict_pipeline.registry))
+metrics.add_collector(drift_monitor_collector(predict_pipeline.drift_monitor))
+profiler = SlowRequestProfiler()
+
+startup.mark_ready()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_samples = profiler.begin(request.path)
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    observe_request(endpoint, response.status_code, time.perf_counter() - g.request_started)
+    profiler.end(g.request_samples)
+    return response
+
 @app.route('/')
 def index():
     """
@@ -59,19 +112,144 @@ def predict_datapoint():
                 sensor_21=float(request.form.get('sensor_21'))
             )
             
-            # Convert the data to a DataFrame for prediction
-            pred_df = data.get_data_as_dataframe()
-            
-            # Use the prediction pipeline to get the RUL
-            predict_pipeline = PredictionPipeline()
-            results = predict_pipeline.predict(pred_df)
+            # Convert the data to a float32 row for prediction
+            pred_row = data.get_data_as_array(predict_pipeline.feature_schema())
+
+            # Use the shared prediction pipeline to get the RUL
+            results = predict_pipeline.predict(pred_row)
+
+            # Readings outside the training range make the prediction less trustworthy
+            out_of_range = predict_pipeline.monitor_inputs(pred_row).get(0, [])
             
             # Render the results page with the prediction
-            return render_template('results.html', results=round(results[0], 2))
+            return render_template('results.html', results=round(results[0], 2), out_of_range=out_of_range)
+        except SnapshotScoringError as e:
+            # A single reading cannot feed a model trained on engine histories
+            return f"Cannot score a single reading: {e}", 422
         except Exception as e:
             # This will print the specific error to your terminal
             print(f"An error occurred during prediction: {e}")
             return f"An error occurred: {e}", 500
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Scores many engines in one request.
+
+    Accepts a columnar JSON body (application/json), a CSV upload (text/csv body
+    or a multipart 'file' field) or streamed NDJSON (application/x-ndjson).
+    Columns pruned by the feature schema may be left out. Rows with
+    unit_number (and time_in_cycles) are scored with their engine's history.
+    Results are streamed back in chunks as NDJSON, or as CSV when the client
+    sends 'Accept: text/csv'. The X-Out-Of-Range-Rows header counts the rows
+    with a reading outside the training range.
+    """
+    try:
+        content_type = request.mimetype
+        if 'file' in request.files:
+            matrix, ids, times = batch_pipeline.parse_csv(request.files['file'].stream)
+        elif content_type == 'text/csv':
+            matrix, ids, times = batch_pipeline.parse_csv(request.stream)
+        elif content_type in ('application/x-ndjson', 'application/jsonl'):
+            matrix, ids, times = batch_pipeline.parse_ndjson(request.stream)
+        elif content_type == 'application/json':
+            # An empty or malformed body gets the same JSON error as a wrong shape
+            matrix, ids, times = batch_pipeline.parse_columnar_json(request.get_json(silent=True))
+        else:
+            return jsonify(error=f"Unsupported content type: {content_type}"), 415
+    except BatchSchemaError as e:
+        return jsonify(error=str(e)), 400
+
+    try:
+        preds = batch_pipeline.predict(matrix, ids, times)
+        out_of_range = predict_pipeline.monitor_inputs(matrix)
+    except SnapshotScoringError as e:
+        return jsonify(error=str(e)), 422
+    except Exception as e:
+        logger.exception("Batch prediction failed")
+        return jsonify(error=str(e)), 500
+
+    headers = {'X-Out-Of-Range-Rows': str(len(out_of_range))}
+    if request.accept_mimetypes.best == 'text/csv':
+        return Response(batch_pipeline.iter_csv(preds, ids), mimetype='text/csv', headers=headers)
+    return Response(batch_pipeline.iter_ndjson(preds, ids), mimetype='application/x-ndjson', headers=headers)
+
+@app.route('/stream/update', methods=['POST'])
+def stream_update():
+    """
+    Ingests the latest cycle of one or more engines and returns their updated RUL.
+
+    Body: a JSON record {"unit_number": ..., "time_in_cycles": ..., <features>}
+    or a list of such records. Results with readings outside the training
+    range list them under "out_of_range". A cycle that is not after the
+    unit's previous one is rejected with 400.
+    """
+    payload = request.get_json(silent=True)
+    records = payload if isinstance(payload, list) else [payload]
+    try:
+        if not records or not all(isinstance(record, dict) for record in records):
+            raise TypeError("Each record must be a JSON object")
+        units = [record['unit_number'] for record in records]
+        times = [float(record['time_in_cycles']) for record in records]
+        readings = [[float(record[column]) for column in FEATURE_COLUMNS] for record in records]
+    except (KeyError, TypeError, ValueError):
+        return jsonify(error=f"Each record needs unit_number, time_in_cycles and {FEATURE_COLUMNS}"), 400
+
+    try:
+        preds = streaming_pipeline.update_batch(units, times, readings)
+        # Only readings that were accepted count towards the drift statistics
+        out_of_range = predict_pipeline.monitor_inputs(np.asarray(readings, dtype=np.float32))
+    except StaleCycleError as e:
+        return jsonify(error=str(e)), 400
+    except Exception as e:
+        logger.exception("Streaming prediction failed")
+        return jsonify(error=str(e)), 500
+
+    results = [{"unit_number": unit, "RUL": round(float(pred), 4)} for unit, pred in zip(units, preds)]
+    for row, columns in out_of_range.items():
+        results[row]["out_of_range"] = columns
+    return jsonify(results if isinstance(payload, list) else results[0])
+
+@app.route('/stream/stats', methods=['GET'])
+def stream_stats():
+    """
+    Reports the number of tracked engines and the memory held by their state.
+    """
+    return jsonify(streaming_pipeline.stats())
+
+@app.route('/drift/stats', methods=['GET'])
+def drift_stats():
+    """
+    Reports how the raw inputs this worker served compare with the training
+    data: PSI per column, live vs training moments and quantiles, and
+    out-of-range counts.
+    """
+    monitor = predict_pipeline.drift_monitor()
+    if monitor is None:
+        return jsonify(enabled=False, reason=f"No drift reference at {predict_pipeline.drift_reference_path}")
+    return jsonify(monitor.report())
+
+@app.route('/model/stats', methods=['GET'])
+def model_stats():
+    """
+    Reports model registry load/reload counters and timings.
+    """
+    return jsonify(predict_pipeline.registry.stats())
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Exposes request latency histograms, model load counters and stage
+    timings in the Prometheus text format.
+    """
+    return Response(metrics.render(), mimetype=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/startup/stats', methods=['GET'])
+def startup_stats():
+    """
+    Reports import, preload and time-to-ready of this worker process.
+    """
+    return jsonify(startup.stats())
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8080)
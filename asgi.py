@@ -0,0 +1,125 @@
+import time
+from contextlib import asynccontextmanager
+
+import numpy as np
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import create_model
+
+# Import through the same 'src.engine_sentinel' path the package uses internally,
+# so the app and the pipeline share one process-wide model registry.
+from src.engine_sentinel.logger import configure_logging
+from src.engine_sentinel.metrics import (PROMETHEUS_CONTENT_TYPE, drift_monitor_collector, get_metrics,
+                                         model_registry_collector, observe_request)
+from src.engine_sentinel.pipeline.micro_batcher import MicroBatcher, MicroBatcherConfig
+from src.engine_sentinel.pipeline.predict_pipeline import PredictionPipeline
+from src.engine_sentinel.pipeline.startup import get_startup_profile
+from src.engine_sentinel.profiling import SlowRequestProfiler
+from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+# Async serving mode: concurrent /predict requests are coalesced into
+# micro-batches and scored with one vectorized call on a worker thread.
+# Run with: uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers <n>
+
+configure_logging()
+startup = get_startup_profile()
+
+# One pipeline and one batcher per worker process; the model itself is cached by the model registry
+predict_pipeline = PredictionPipeline()
+batcher = MicroBatcher(predict_pipeline.predict_matrix, n_features=len(FEATURE_COLUMNS), config=MicroBatcherConfig())
+
+metrics = get_metrics()
+metrics.add_collector(model_registry_collector(predict_pipeline.registry))
+metrics.add_collector(drift_monitor_collector(predict_pipeline.drift_monitor))
+profiler = SlowRequestProfiler()
+
+# Request body: the 24 raw features of one engine cycle
+EngineReading = create_model("EngineReading", **{column: (float, ...) for column in FEATURE_COLUMNS})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the model before the first request instead of inside it
+    with startup.phase("preload"):
+        predict_pipeline.warm_up()
+    await batcher.start()
+    startup.mark_ready()
+    yield
+    await batcher.stop()
+
+
+app = FastAPI(title="EngineSentinel", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    samples = profiler.begin(request.url.path)
+    response = await call_next(request)
+    route = request.scope.get("route")
+    observe_request(route.path if route else "unmatched", response.status_code, time.perf_counter() - started)
+    profiler.end(samples)
+    return response
+
+
+@app.post("/predict")
+async def predict(reading: EngineReading):
+    """
+    Predicts the RUL of one engine cycle. Concurrent calls share micro-batches.
+    Readings outside the training range are listed under "out_of_range".
+    A model trained with per-unit rolling features cannot score a lone
+    reading; the request is then rejected with 422.
+    """
+    if predict_pipeline.needs_history():
+        return JSONResponse({"error": "The model uses per-unit rolling features; a single reading cannot be scored"},
+                            status_code=422)
+    row = np.fromiter((getattr(reading, column) for column in FEATURE_COLUMNS),
+                      dtype=np.float32, count=len(FEATURE_COLUMNS))
+    out_of_range = predict_pipeline.monitor_inputs(row[None, :]).get(0)
+    result = {"RUL": round(await batcher.submit(row), 4)}
+    if out_of_range:
+        result["out_of_range"] = out_of_range
+    return result
+
+
+@app.get("/batching/stats")
+async def batching_stats():
+    """
+    Reports the batch-size distribution, queueing delay and scoring time.
+    """
+    return batcher.stats()
+
+
+@app.get("/drift/stats")
+async def drift_stats():
+    """
+    Reports how the raw inputs this worker served compare with the training data.
+    """
+    monitor = predict_pipeline.drift_monitor()
+    if monitor is None:
+        return {"enabled": False, "reason": f"No drift reference at {predict_pipeline.drift_reference_path}"}
+    return monitor.report()
+
+
+@app.get("/model/stats")
+async def model_stats():
+    """
+    Reports model registry load/reload counters and timings.
+    """
+    return predict_pipeline.registry.stats()
+
+
+@app.get("/startup/stats")
+async def startup_stats():
+    """
+    Reports preload time and time-to-ready of this worker process.
+    """
+    return startup.stats()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Exposes request latency histograms and model load counters in the Prometheus text format.
+    """
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
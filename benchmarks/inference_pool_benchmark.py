@@ -0,0 +1,122 @@
+"""
+Measures how the shared-memory inference pool scales with the number of
+worker processes on a large input, against PredictionPipeline.predict_matrix
+in the calling process (LightGBM with its default thread count).
+
+    python benchmarks/inference_pool_benchmark.py [--rows 1048576] [--workers 1,2,4,8] [--json out.json]
+
+The input is train_FD001.txt tiled to --rows rows. With --units, each copy
+gets new unit numbers and the unit ids and cycles are passed along, so models
+with rolling features compute them per unit. Pool start-up (spawning the
+workers and loading the model) is timed separately from scoring.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.engine_sentinel.components.data_ingestion import parse_cmapss_file  # noqa: E402
+from src.engine_sentinel.pipeline.inference_pool import InferencePool, InferencePoolConfig  # noqa: E402
+from src.engine_sentinel.pipeline.predict_pipeline import PredictionPipeline  # noqa: E402
+
+
+def tiled_input(source, n_rows):
+    table = parse_cmapss_file(source)
+    copies = -(-n_rows // len(table))
+    tiled = np.tile(table, (copies, 1))[:n_rows]
+    # Copy k of unit u becomes unit u + k * (max unit + 1)
+    copy_index = np.repeat(np.arange(copies), len(table))[:n_rows]
+    units = tiled[:, 0] + copy_index * (table[:, 0].max() + 1)
+    return np.ascontiguousarray(tiled[:, 2:], dtype=np.float32), units, tiled[:, 1]
+
+
+def median_seconds(function, repeats):
+    function()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run(pipeline, matrix, units, times, worker_counts, repeats, config_kwargs):
+    rows = {}
+    reference = pipeline.predict_matrix(matrix, units, times)
+    seconds = median_seconds(lambda: pipeline.predict_matrix(matrix, units, times), repeats)
+    rows["in_process"] = {"workers": 0, "seconds": seconds, "start_seconds": 0.0, "max_abs_diff": 0.0}
+
+    for n_workers in worker_counts:
+        started = time.perf_counter()
+        pool = InferencePool(pipeline, InferencePoolConfig(n_workers=n_workers, **config_kwargs)).start()
+        start_seconds = time.perf_counter() - started
+        try:
+            preds = pool.predict(matrix, units, times)
+            seconds = median_seconds(lambda: pool.predict(matrix, units, times), repeats)
+        finally:
+            pool.close()
+        rows[f"pool_{n_workers}"] = {
+            "workers": n_workers, "seconds": seconds, "start_seconds": start_seconds,
+            "max_abs_diff": float(np.abs(preds - reference).max()),
+        }
+
+    one_worker = rows.get("pool_1", rows["in_process"])["seconds"]
+    for row in rows.values():
+        row["rows_per_second"] = len(matrix) / row["seconds"]
+        row["speedup_vs_in_process"] = rows["in_process"]["seconds"] / row["seconds"]
+        row["speedup_vs_one_worker"] = one_worker / row["seconds"]
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=os.path.join(PROJECT_ROOT, "data", "train_FD001.txt"))
+    parser.add_argument("--artifacts-dir", default=os.path.join(PROJECT_ROOT, "artifacts"))
+    parser.add_argument("--rows", type=int, default=1 << 20)
+    parser.add_argument("--workers", default=None, help="Worker counts to time (default: 1..cpu_count).")
+    parser.add_argument("--units", action="store_true", help="Pass unit ids and cycles with the rows.")
+    parser.add_argument("--slice-rows", type=int, default=InferencePoolConfig.slice_rows)
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    artifacts = args.artifacts_dir
+    pipeline = PredictionPipeline(
+        model_path=os.path.join(artifacts, "model", "booster.txt"),
+        feature_spec_path=os.path.join(artifacts, "feature_spec.json"),
+        compiled_model_path=os.path.join(artifacts, "compiled_model.npz"),
+        feature_schema_path=os.path.join(artifacts, "feature_schema.json"),
+        regime_index_path=os.path.join(artifacts, "regime_index.npz"),
+    )
+    pipeline.warm_up()
+    worker_counts = ([int(count) for count in args.workers.split(",") if count] if args.workers
+                     else list(range(1, (os.cpu_count() or 1) + 1)))
+    matrix, units, times = tiled_input(args.source, args.rows)
+    if not args.units:
+        units = times = None
+    config_kwargs = {"slice_rows": args.slice_rows, "threads_per_worker": args.threads_per_worker,
+                     "capacity_rows": max(args.rows, InferencePoolConfig.capacity_rows)}
+
+    rows = run(pipeline, matrix, units, times, worker_counts, args.repeats, config_kwargs)
+
+    print(f"{len(matrix)} rows, {os.cpu_count()} CPU(s)")
+    print(f"{'run':<12}{'seconds':>9}{'rows/s':>12}{'vs 1 worker':>13}{'vs in-process':>15}{'start s':>9}{'max diff':>10}")
+    for name, row in rows.items():
+        print(f"{name:<12}{row['seconds']:>9.3f}{row['rows_per_second']:>12.0f}{row['speedup_vs_one_worker']:>13.2f}"
+              f"{row['speedup_vs_in_process']:>15.2f}{row['start_seconds']:>9.2f}{row['max_abs_diff']:>10.2g}")
+
+    if args.json:
+        with open(args.json, "w") as file_obj:
+            json.dump({"rows": len(matrix), "cpu_count": os.cpu_count(), "runs": rows}, file_obj, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+"""
+Open-loop load test of the serving apps through a local HTTP server.
+
+Starts the Flask app under gunicorn or an ASGI app under uvicorn on a free
+local port (or targets a running server with --url), then replays requests
+built from the rows of data/test_FD00x.txt at fixed arrival rates. Arrivals
+follow a Poisson process (or a constant interval) and are sent whether or not
+earlier requests have returned, so a saturated server shows up as growing
+latency instead of a slower client. Latency is measured from each request's
+scheduled send time, so it includes any wait for a free connection.
+
+For every rate step, throughput, error rate and p50/p95/p99/max latency are
+reported overall and per endpoint. --output saves the run as JSON, and
+--compare prints the change against a saved run. Everything runs on the
+local machine; nothing needs network access.
+
+    python benchmarks/load_test.py --target flask --rates 20,50,100 --duration 10 --output flask.json
+    python benchmarks/load_test.py --target asgi --server-workers 2 --rates 200,400 --compare asgi-before.json
+    python benchmarks/load_test.py --app asgi:app --server uvicorn --mix predict=1 --rates 100
+    python benchmarks/load_test.py --url http://127.0.0.1:8080 --mix form=0.8,batch=0.2 --rates 50
+
+Request kinds (--mix, as kind=weight):
+  form     POST /predictdata, one reading as an HTML form (Flask)
+  batch    POST /predict/batch, --batch-rows consecutive readings as columnar JSON (Flask)
+  stream   POST /stream/update, the next cycle of an engine, in time order (Flask)
+  predict  POST /predict, one reading as JSON (ASGI)
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.engine_sentinel.components.data_ingestion import parse_cmapss_file  # noqa: E402
+from src.engine_sentinel.utils import FEATURE_COLUMNS  # noqa: E402
+
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+# Preset servers: what to run and the request mix its endpoints support
+TARGETS = {
+    "flask": {"server": "gunicorn", "app": "application:app", "mix": "form=0.6,stream=0.3,batch=0.1"},
+    "asgi": {"server": "uvicorn", "app": "asgi:app", "mix": "predict=1"},
+}
+ENDPOINTS = {
+    "form": "/predictdata",
+    "batch": "/predict/batch",
+    "stream": "/stream/update",
+    "predict": "/predict",
+}
+# Replayed engines are renumbered from here, clear of real unit numbers;
+# every pass over the test rows gets a new range so cycles never go backwards
+UNIT_OFFSET = 1_000_000
+PASS_UNITS = 100_000
+# Distinct payloads built per kind; requests cycle through them
+PAYLOAD_POOL = 1024
+
+
+# --- Request mix ---
+
+def load_test_rows(data_dir):
+    """
+    Reads every data_dir/test_FD00x.txt file.
+
+    Returns:
+        tuple: (readings (n_rows, 24) float32, unit ids, cycles), with unit
+            ids made unique across files.
+    """
+    tables = []
+    for subset, file_path in enumerate(sorted(glob.glob(os.path.join(data_dir, "test_FD00*.txt"))), start=1):
+        table = parse_cmapss_file(file_path)
+        table[:, 0] += subset * 1000
+        tables.append(table)
+    if not tables:
+        raise FileNotFoundError(f"No test_FD00x.txt files in {data_dir}")
+    table = np.concatenate(tables)
+    return table[:, 2:].astype(np.float32), table[:, 0].astype(np.int64), table[:, 1].astype(np.int64)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in ENDPOINTS:
+            raise ValueError(f"Unknown request kind {kind!r}; choose from {sorted(ENDPOINTS)}")
+        mix[kind] = float(weight or 1.0)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("The request mix needs a positive weight")
+    return {kind: weight / total for kind, weight in mix.items()}
+
+
+def http_request(host, path, content_type, body):
+    head = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+class RequestFactory:
+    """
+    Builds the raw HTTP requests of each kind from the test rows. Stateless
+    kinds come from a fixed pool of random rows; stream requests walk the
+    engines cycle by cycle (every engine's first cycle, then every engine's
+    second, ...), so each engine's updates arrive in time order.
+    """
+    def __init__(self, host, readings, units, times, batch_rows, seed):
+        self.host = host
+        self.readings, self.units, self.times = readings, units, times
+        self.batch_rows = batch_rows
+        self.rng = np.random.default_rng(seed)
+        self.stream_order = np.lexsort((units, times))
+        self.stream_next = 0
+        self.pools = {}
+
+    def _reading(self, row):
+        return {column: float(value) for column, value in zip(FEATURE_COLUMNS, self.readings[row])}
+
+    def _build(self, kind):
+        if kind == "form":
+            body = urllib.parse.urlencode(self._reading(self.rng.integers(len(self.readings)))).encode()
+            return http_request(self.host, ENDPOINTS[kind], "application/x-www-form-urlencoded", body)
+        if kind == "predict":
+            body = json.dumps(self._reading(self.rng.integers(len(self.readings)))).encode()
+            return http_request(self.host, ENDPOINTS[kind], "application/json", body)
+        if kind == "batch":
+            start = self.rng.integers(max(len(self.readings) - self.batch_rows, 0) + 1)
+            block = self.readings[start:start + self.batch_rows]
+            body = json.dumps({column: block[:, j].tolist() for j, column in enumerate(FEATURE_COLUMNS)}).encode()
+            return http_request(self.host, ENDPOINTS[kind], "application/json", body)
+        raise ValueError(kind)
+
+    def next(self, kind):
+        if kind == "stream":
+            passes, position = divmod(self.stream_next, len(self.stream_order))
+            self.stream_next += 1
+            row = self.stream_order[position]
+            record = {"unit_number": int(self.units[row] + UNIT_OFFSET + passes * PASS_UNITS),
+                      "time_in_cycles": int(self.times[row]), **self._reading(row)}
+            return http_request(self.host, ENDPOINTS[kind], "application/json", json.dumps(record).encode())
+        pool = self.pools.get(kind)
+        if pool is None:
+            pool = self.pools[kind] = [[self._build(kind) for _ in range(PAYLOAD_POOL)], 0]
+        request = pool[0][pool[1] % PAYLOAD_POOL]
+        pool[1] += 1
+        return request
+
+
+# --- HTTP/1.1 client ---
+
+async def read_response(reader):
+    """
+    Reads one response (Content-Length, chunked or close-delimited body).
+
+    Returns:
+        tuple: (status code, body size in bytes, whether the connection can be reused)
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    reusable = headers.get("connection", "").lower() != "close"
+    if "content-length" in headers:
+        n_bytes = len(await reader.readexactly(int(headers["content-length"])))
+    elif headers.get("transfer-encoding", "").lower() == "chunked":
+        n_bytes = 0
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                break
+            n_bytes += len(await reader.readexactly(size + 2)) - 2
+    else:
+        n_bytes = len(await reader.read())
+        reusable = False
+    return status, n_bytes, reusable
+
+
+class ConnectionPool:
+    """
+    Keep-alive connections to one server, at most `max_connections` open.
+    Servers that close after every response (gunicorn's sync workers) get a
+    new connection per request.
+    """
+    def __init__(self, host, port, max_connections):
+        self.host, self.port = host, port
+        self.slots = asyncio.Semaphore(max_connections)
+        self.idle = []
+        self.opened = 0
+
+    async def request(self, payload):
+        async with self.slots:
+            if self.idle:
+                reader, writer = self.idle.pop()
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                self.opened += 1
+            reusable = False
+            try:
+                writer.write(payload)
+                await writer.drain()
+                status, n_bytes, reusable = await read_response(reader)
+                return status, n_bytes
+            finally:
+                if reusable:
+                    self.idle.append((reader, writer))
+                else:
+                    writer.close()
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+
+
+# --- Load generation ---
+
+def arrival_offsets(rate, duration, process, rng):
+    """
+    Scheduled send times (seconds from the start of the step).
+    """
+    if process == "constant":
+        return np.arange(0.0, duration, 1.0 / rate)
+    gaps = rng.exponential(1.0 / rate, size=int(rate * duration * 1.5) + 16)
+    offsets = np.cumsum(gaps)
+    while offsets[-1] < duration:
+        offsets = np.concatenate([offsets, offsets[-1] + np.cumsum(rng.exponential(1.0 / rate, size=len(gaps)))])
+    return offsets[offsets < duration]
+
+
+async def run_step(pool, factory, mix, rate, duration, process, timeout, rng):
+    """
+    Sends requests at `rate` per second for `duration` seconds, open loop.
+
+    Returns:
+        dict: Per-request arrays: kind index, latency, send lag, status
+            (0 for transport errors) and error names.
+    """
+    kinds = list(mix)
+    offsets = arrival_offsets(rate, duration, process, rng)
+    n_requests = len(offsets)
+    chosen = rng.choice(len(kinds), size=n_requests, p=[mix[kind] for kind in kinds])
+    payloads = [factory.next(kinds[k]) for k in chosen]
+    latency = np.full(n_requests, np.nan)
+    lag = np.zeros(n_requests)
+    status = np.zeros(n_requests, dtype=np.int64)
+    errors = {}
+    loop = asyncio.get_running_loop()
+
+    async def send(i, scheduled):
+        lag[i] = loop.time() - scheduled
+        try:
+            status[i], _ = await asyncio.wait_for(pool.request(payloads[i]), timeout)
+        except Exception as e:
+            name = type(e).__name__
+            errors[name] = errors.get(name, 0) + 1
+        latency[i] = loop.time() - scheduled
+
+    started = loop.time() + 0.05
+    tasks = []
+    for i, offset in enumerate(offsets):
+        scheduled = started + offset
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(send(i, scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - started
+    return {"kinds": kinds, "chosen": chosen, "latency": latency, "lag": lag, "status": status,
+            "errors": errors, "elapsed": elapsed, "offered_rps": n_requests / duration}
+
+
+def summarize(latency, status, elapsed):
+    ok = (status >= 200) & (status < 400)
+    summary = {
+        "requests": int(len(status)),
+        "ok": int(ok.sum()),
+        "errors": int((~ok).sum()),
+        "error_rate": float((~ok).mean()) if len(status) else 0.0,
+        "throughput_rps": float(ok.sum() / elapsed) if elapsed > 0 else 0.0,
+    }
+    if ok.any():
+        ms = latency[ok] * 1000
+        summary.update({
+            "mean_ms": float(ms.mean()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+        })
+    statuses = np.unique(status[~ok], return_counts=True)
+    summary["error_status"] = {str(int(code)): int(count) for code, count in zip(*statuses) if code}
+    return summary
+
+
+def step_report(rate, result):
+    report = {"rate": rate, "offered_rps": result["offered_rps"], "duration_s": result["elapsed"],
+              **summarize(result["latency"], result["status"], result["elapsed"])}
+    report["error_status"].update(result["errors"])
+    report["client_lag_p99_ms"] = float(np.percentile(result["lag"], 99) * 1000) if len(result["lag"]) else 0.0
+    report["endpoints"] = {
+        kind: summarize(result["latency"][result["chosen"] == k], result["status"][result["chosen"] == k],
+                        result["elapsed"])
+        for k, kind in enumerate(result["kinds"])
+    }
+    return report
+
+
+async def run_load(host, port, factory, mix, rates, duration, warmup, process, timeout, max_connections, seed):
+    rng = np.random.default_rng(seed)
+    pool = ConnectionPool(host, port, max_connections)
+    steps = []
+    try:
+        if warmup > 0:
+            await run_step(pool, factory, mix, rates[0], warmup, process, timeout, rng)
+        for rate in rates:
+            result = await run_step(pool, factory, mix, rate, duration, process, timeout, rng)
+            steps.append(step_report(rate, result))
+            print_step(steps[-1])
+    finally:
+        pool.close()
+    return steps
+
+
+# --- Local server ---
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(server, app, port, workers, work_dir):
+    """
+    Starts `app` under gunicorn (WSGI) or uvicorn (ASGI) on 127.0.0.1:port.
+    It runs from `work_dir`, so its logs and streaming state stay out of the tree.
+    """
+    if server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(PROJECT_ROOT, "gunicorn.conf.py"),
+                   "--bind", f"127.0.0.1:{port}", "--workers", str(workers), app]
+    elif server == "uvicorn":
+        command = [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port),
+                   "--workers", str(workers), "--no-access-log"]
+    else:
+        raise ValueError(f"Unknown server {server!r}")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [PROJECT_ROOT, env.get("PYTHONPATH")]))
+    env["ENGINE_SENTINEL_STREAM_SNAPSHOT"] = os.path.join(work_dir, "stream_state.npz")
+    log_file = open(os.path.join(work_dir, "server.log"), "wb")
+    return subprocess.Popen(command, cwd=work_dir, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+                            start_new_session=True)
+
+
+def wait_ready(url, process, timeout):
+    """
+    Polls GET /startup/stats until the server answers (any HTTP status).
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"The server exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(f"{url}/startup/stats", timeout=2).read()
+            return
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"The server at {url} was not ready after {timeout:.0f}s")
+
+
+def stop_server(process):
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+# --- Reporting ---
+
+def print_step(step):
+    print(f"rate {step['rate']:>7g}/s  ok {step['throughput_rps']:>8.1f}/s  errors {step['error_rate']:>6.2%}  "
+          f"p50 {step.get('p50_ms', float('nan')):>8.2f}  p95 {step.get('p95_ms', float('nan')):>8.2f}  "
+          f"p99 {step.get('p99_ms', float('nan')):>8.2f}  max {step.get('max_ms', float('nan')):>8.2f} ms", flush=True)
+    for kind, summary in step["endpoints"].items():
+        print(f"    {kind:<8}{summary['requests']:>8} req  errors {summary['error_rate']:>6.2%}  "
+              f"p50 {summary.get('p50_ms', float('nan')):>8.2f}  p99 {summary.get('p99_ms', float('nan')):>8.2f} ms")
+    if step["error_status"]:
+        print(f"    errors: {step['error_status']}")
+    if step["client_lag_p99_ms"] > 10:
+        print(f"    warning: p99 send lag {step['client_lag_p99_ms']:.1f} ms; the load generator is falling behind")
+
+
+def compare(previous, current):
+    """
+    Prints the change of each rate step against a saved run.
+    """
+    before = {step["rate"]: step for step in previous["steps"]}
+    print(f"\n{'rate':>8}{'metric':>16}{'before':>12}{'after':>12}{'change':>9}")
+    for step in current["steps"]:
+        reference = before.get(step["rate"])
+        if reference is None:
+            continue
+        for metric in ("throughput_rps", "error_rate", "p50_ms", "p95_ms", "p99_ms", "max_ms"):
+            old, new = reference.get(metric), step.get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old:>+9.1%}" if old else f"{'':>9}"
+            print(f"{step['rate']:>8g}{metric:>16}{old:>12.4g}{new:>12.4g}{change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=sorted(TARGETS), default="flask", help="Preset server and request mix.")
+    parser.add_argument("--app", default=None, help="module:attribute to serve instead of the preset's app.")
+    parser.add_argument("--server", choices=("gunicorn", "uvicorn"), default=None)
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--url", default=None, help="Load an already running server instead of starting one.")
+    parser.add_argument("--mix", default=None, help="Request kinds and weights, e.g. form=0.6,stream=0.3,batch=0.1.")
+    parser.add_argument("--rates", default="10,25,50", help="Arrival rates (requests/s), one step each.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per rate step.")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds at the first rate before measuring.")
+    parser.add_argument("--arrivals", choices=("poisson", "constant"), default="poisson")
+    parser.add_argument("--batch-rows", type=int, default=100)
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds before a request counts as failed.")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the run as JSON here.")
+    parser.add_argument("--compare", default=None, help="A saved run to compare against.")
+    args = parser.parse_args()
+
+    preset = TARGETS[args.target]
+    app = args.app or preset["app"]
+    server = args.server or preset["server"]
+    mix = parse_mix(args.mix or preset["mix"])
+    rates = [float(rate) for rate in args.rates.split(",") if rate]
+
+    work_dir = tempfile.mkdtemp(prefix="engine-sentinel-load-")
+    process = None
+    try:
+        if args.url:
+            url = args.url.rstrip("/")
+        else:
+            url = f"http://127.0.0.1:{free_port()}"
+            print(f"Starting {app} under {server} ({args.server_workers} worker(s)) at {url}", flush=True)
+            process = start_server(server, app, urllib.parse.urlsplit(url).port, args.server_workers, work_dir)
+        wait_ready(url, process, args.startup_timeout)
+
+        parts = urllib.parse.urlsplit(url)
+        readings, units, times = load_test_rows(args.data_dir)
+        factory = RequestFactory(parts.netloc, readings, units, times, args.batch_rows, args.seed)
+        steps = asyncio.run(run_load(parts.hostname, parts.port or 80, factory, mix, rates, args.duration,
+                                     args.warmup, args.arrivals, args.timeout, args.max_connections, args.seed))
+    except BaseException:
+        if process is not None and os.path.exists(os.path.join(work_dir, "server.log")):
+            with open(os.path.join(work_dir, "server.log"), errors="replace") as file_obj:
+                print("Server log (last lines):\n" + "".join(file_obj.readlines()[-20:]), file=sys.stderr)
+        raise
+    finally:
+        if process is not None:
+            stop_server(process)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    from benchmarks.suite import environment
+    run = {
+        "environment": environment(),
+        "config": {
+            "url": args.url, "app": None if args.url else app, "server": None if args.url else server,
+            "server_workers": None if args.url else args.server_workers, "mix": mix, "rates": rates,
+            "duration_s": args.duration, "arrivals": args.arrivals, "batch_rows": args.batch_rows,
+            "max_connections": args.max_connections, "seed": args.seed,
+        },
+        "steps": steps,
+    }
+    if args.output:
+        with open(args.output, "w") as file_obj:
+            json.dump(run, file_obj, indent=2)
+    if args.compare:
+        with open(args.compare) as file_obj:
+            compare(json.load(file_obj), run)
+
+
+if __name__ == "__main__":
+    main()
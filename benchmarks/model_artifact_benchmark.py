@@ -0,0 +1,112 @@
+"""
+Compares the native model artifact (booster.txt + metadata.json) with a dill
+pickle of the same model: size on disk, load time in a warm process, and
+import + load time in a fresh interpreter (what a process that is not forked
+from a preloaded gunicorn master pays). Both formats build a separate model
+in every process that loads them; forked workers share the master's copy.
+
+    python benchmarks/model_artifact_benchmark.py [--pickle artifacts/model.pkl] [--json out.json]
+
+Without --pickle, the baseline pickle is written from the artifact's booster
+with utils.save_object, the path the pipeline used before.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.engine_sentinel.model_artifact import load_model_artifact, load_model_metadata  # noqa: E402
+from src.engine_sentinel.utils import load_object, save_object  # noqa: E402
+
+COLD_LOAD_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from src.engine_sentinel.model_artifact import load_model
+load_model({path!r})
+print(time.perf_counter() - start)
+"""
+
+
+def path_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+    return os.path.getsize(path)
+
+
+def time_calls(function, path, repeats):
+    function(path)  # warm the page cache and imports
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(path)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def time_cold_loads(path, repeats):
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_LOAD_SCRIPT.format(root=PROJECT_ROOT, path=path)],
+            check=True, capture_output=True, text=True, cwd=PROJECT_ROOT,
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def run(artifact_path, pickle_path, repeats, cold_repeats):
+    rows = {
+        "native": {
+            "path": artifact_path,
+            "bytes": path_size(artifact_path),
+            "load_ms": time_calls(load_model_artifact, artifact_path, repeats) * 1000,
+            "cold_import_and_load_ms": time_cold_loads(artifact_path, cold_repeats) * 1000,
+            "metadata_only_ms": time_calls(load_model_metadata, artifact_path, repeats) * 1000,
+        },
+        "dill": {
+            "path": pickle_path,
+            "bytes": path_size(pickle_path),
+            "load_ms": time_calls(load_object, pickle_path, repeats) * 1000,
+            "cold_import_and_load_ms": time_cold_loads(pickle_path, cold_repeats) * 1000,
+            "metadata_only_ms": None,
+        },
+    }
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--artifact", default=os.path.join(PROJECT_ROOT, "artifacts", "model"))
+    parser.add_argument("--pickle", default=None, help="Existing dill pickle to compare against.")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--cold-repeats", type=int, default=5)
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_path = args.pickle
+        if pickle_path is None:
+            pickle_path = os.path.join(tmp_dir, "model.pkl")
+            save_object(pickle_path, load_model_artifact(args.artifact))
+        rows = run(args.artifact, pickle_path, args.repeats, args.cold_repeats)
+
+    print(f"{'format':<8}{'bytes':>10}{'load ms':>10}{'cold ms':>10}{'header ms':>11}")
+    for name, row in rows.items():
+        header = f"{row['metadata_only_ms']:.3f}" if row["metadata_only_ms"] is not None else "-"
+        print(f"{name:<8}{row['bytes']:>10}{row['load_ms']:>10.2f}{row['cold_import_and_load_ms']:>10.0f}{header:>11}")
+
+    if args.json:
+        with open(args.json, "w") as file_obj:
+            json.dump(rows, file_obj, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Reproducible performance suite for the pipeline and the serving path.
+
+Covers ingestion parse time per C-MAPSS file, transformation throughput,
+hyperparameter search wall time, operating-regime normalization throughput
+(on synthetic six-regime readings), single-row and batch predict latency and
+Flask endpoint throughput. Ingestion and transformation run on synthetic
+copies of train_FD001.txt scaled up 1x/10x/100x (units are replicated under
+new unit numbers). Results are written as JSON and, given a baseline, every
+metric is compared against it; the run fails when one got worse by more than
+the threshold.
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json --threshold 0.25
+    python benchmarks/suite.py --scales 1,10 --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.engine_sentinel.components.data_ingestion import DataIngestion, parse_cmapss_file  # noqa: E402
+from src.engine_sentinel.components.data_transformation import DataTransformation  # noqa: E402
+from src.engine_sentinel.regimes import RegimeIndex  # noqa: E402
+from src.engine_sentinel.search import SuccessiveHalvingSearch  # noqa: E402
+from src.engine_sentinel.utils import FEATURE_COLUMNS, ID_COLUMNS, LGBM_PARAM_GRID, TARGET_COLUMN, load_frame  # noqa: E402
+
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+SOURCE_FILE = os.path.join(DATA_DIR, "train_FD001.txt")
+# Synthetic data is kept between runs; it is derived from SOURCE_FILE only
+SCALED_DATA_DIR = os.path.join(PROJECT_ROOT, "artifacts", "benchmarks", "data")
+
+
+class Results:
+    """
+    Collects metrics as name -> {value, unit, better}.
+    """
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better="lower"):
+        self.metrics[name] = {"value": float(value), "unit": unit, "better": better}
+        print(f"  {name:<48}{value:>14.4g} {unit}", flush=True)
+
+
+def best_seconds(function, repeats):
+    """
+    Runs `function` once to warm caches, then returns the fastest of
+    `repeats` timed runs; the minimum is the estimate least affected by other
+    load on the machine.
+    """
+    function()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+# --- Synthetic data ---
+
+def scaled_source(factor):
+    """
+    Writes (once) a copy of train_FD001.txt with every unit replicated
+    `factor` times under new unit numbers, keeping the original text layout.
+    """
+    file_path = os.path.join(SCALED_DATA_DIR, f"{factor}x", "train_FD001.txt")
+    source_stat = os.stat(SOURCE_FILE)
+    if os.path.exists(file_path) and os.path.getmtime(file_path) >= source_stat.st_mtime:
+        return file_path
+
+    with open(SOURCE_FILE) as file_obj:
+        lines = [line.split(" ", 1) for line in file_obj if line.strip()]
+    n_units = max(int(unit) for unit, _ in lines)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = f"{file_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as file_obj:
+        for copy in range(factor):
+            offset = copy * n_units
+            file_obj.writelines(f"{int(unit) + offset} {rest}" for unit, rest in lines)
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+# --- Benchmarks ---
+
+def bench_ingestion(results, scales, work_dir, repeats):
+    print("Ingestion")
+    for file_name in sorted(os.listdir(DATA_DIR)):
+        if file_name.startswith(("train_FD", "test_FD")) and file_name.endswith(".txt"):
+            file_path = os.path.join(DATA_DIR, file_name)
+            seconds = best_seconds(lambda: parse_cmapss_file(file_path), repeats)
+            results.add(f"ingestion.parse.{file_name[:-4]}.seconds", seconds, "s")
+
+    raw_paths = {}
+    for factor in scales:
+        source = scaled_source(factor)
+        step = DataIngestion()
+        config = step.ingestion_config
+        config.data_dir = os.path.dirname(source)
+        config.subsets = ("FD001",)
+        config.raw_data_path = os.path.join(work_dir, f"raw_{factor}x")
+
+        def run():
+            # A fresh parse cache every time: the binary cache would skip the parse
+            config.cache_dir = tempfile.mkdtemp(dir=work_dir)
+            step.initiate_data_ingestion()
+
+        seconds = best_seconds(run, repeats)
+        n_rows = len(load_frame(config.raw_data_path, columns=["unit_number"]))
+        results.add(f"ingestion.{factor}x.seconds", seconds, "s")
+        results.add(f"ingestion.{factor}x.rows_per_second", n_rows / seconds, "rows/s", better="higher")
+        raw_paths[factor] = config.raw_data_path
+    return raw_paths
+
+
+def bench_transformation(results, raw_paths, work_dir, repeats):
+    print("Transformation")
+    transformed_paths = {}
+    for factor, raw_path in raw_paths.items():
+        step = DataTransformation()
+        config = step.data_transformation_config
+        config.transformed_data_path = os.path.join(work_dir, f"transformed_{factor}x")
+        config.feature_spec_path = os.path.join(work_dir, f"feature_spec_{factor}x.json")
+
+        seconds = best_seconds(lambda: step.initiate_data_transformation(raw_data_path=raw_path), repeats)
+        n_rows = len(load_frame(raw_path, columns=["unit_number"]))
+        results.add(f"transformation.{factor}x.seconds", seconds, "s")
+        results.add(f"transformation.{factor}x.rows_per_second", n_rows / seconds, "rows/s", better="higher")
+        transformed_paths[factor] = config.transformed_data_path
+    return transformed_paths
+
+
+def bench_search(results, transformed_paths, search_scales):
+    print("Hyperparameter search")
+    for factor in search_scales:
+        df = load_frame(transformed_paths[factor])
+        y = df[TARGET_COLUMN]
+        X = df.drop(columns=[TARGET_COLUMN] + [column for column in ID_COLUMNS if column in df.columns])
+        search = SuccessiveHalvingSearch(LGBM_PARAM_GRID)
+        started = time.perf_counter()
+        search.fit(X, y)
+        results.add(f"search.{factor}x.seconds", time.perf_counter() - started, "s")
+
+
+def six_regime_rows(n_rows, seed=0):
+    """
+    FD001 readings moved into six FD002/FD004-style flight conditions: each row
+    gets a condition's op settings (plus measurement noise) and its sensors a
+    per-condition gain and offset.
+    """
+    conditions = np.array([[0, 0, 100], [10, 0.25, 100], [20, 0.7, 100],
+                           [25, 0.62, 60], [35, 0.84, 100], [42, 0.84, 100]])
+    rng = np.random.default_rng(seed)
+    rows = parse_cmapss_file(SOURCE_FILE)[:, 2:]
+    rows = rows[rng.integers(0, len(rows), n_rows)]
+    regime = rng.integers(0, len(conditions), n_rows)
+    gain = rng.uniform(0.6, 1.4, (len(conditions), rows.shape[1] - 3))
+    offset = rng.uniform(-200, 200, (len(conditions), rows.shape[1] - 3))
+    rows[:, :3] = conditions[regime] + rng.normal(0, [0.003, 0.0003, 0], (n_rows, 3))
+    rows[:, 3:] = rows[:, 3:] * gain[regime] + offset[regime]
+    return rows.astype(np.float32)
+
+
+def bench_regimes(results, n_rows, repeats):
+    print("Operating-regime normalization")
+    index = RegimeIndex.fit(six_regime_rows(200_000, seed=1))
+    rows = six_regime_rows(n_rows)
+    for name, function in (("assign", index.assign), ("normalize", index.normalize)):
+        seconds = best_seconds(lambda: function(rows), repeats)
+        results.add(f"regimes.{name}.rows_per_second", n_rows / seconds, "rows/s", better="higher")
+
+
+def bench_predict(results, n_calls):
+    print("Prediction")
+    from src.engine_sentinel.pipeline.predict_pipeline import PredictionPipeline
+
+    pipeline = PredictionPipeline()
+    pipeline.warm_up()
+    rng = np.random.default_rng(0)
+    rows = parse_cmapss_file(SOURCE_FILE)[:, 2:].astype(np.float32)
+    single = rows[rng.integers(0, len(rows), n_calls)]
+
+    for row in single[:100]:
+        pipeline.predict_matrix(row[None, :])
+    timings = np.empty(n_calls)
+    for i, row in enumerate(single):
+        started = time.perf_counter()
+        pipeline.predict_matrix(row[None, :])
+        timings[i] = time.perf_counter() - started
+    results.add("predict.single_row.p50_us", np.percentile(timings, 50) * 1e6, "us")
+    results.add("predict.single_row.p99_us", np.percentile(timings, 99) * 1e6, "us")
+
+    batch = rows[:1000]
+    seconds = best_seconds(lambda: pipeline.predict_matrix(batch), 50)
+    results.add("predict.batch_1000.ms", seconds * 1e3, "ms")
+    results.add("predict.batch_1000.rows_per_second", len(batch) / seconds, "rows/s", better="higher")
+
+
+def bench_flask(results, n_requests):
+    print("Flask endpoints (in-process WSGI client)")
+    import application
+
+    client = application.app.test_client()
+    rows = parse_cmapss_file(SOURCE_FILE)[:, 2:]
+    form = {column: str(value) for column, value in zip(FEATURE_COLUMNS, rows[0])}
+    for _ in range(20):
+        client.post("/predictdata", data=form)
+    started = time.perf_counter()
+    for _ in range(n_requests):
+        response = client.post("/predictdata", data=form)
+    seconds = time.perf_counter() - started
+    if response.status_code != 200:
+        raise RuntimeError(f"/predictdata returned {response.status_code}")
+    results.add("flask.predictdata.requests_per_second", n_requests / seconds, "req/s", better="higher")
+
+    payload = {column: rows[:1000, i].tolist() for i, column in enumerate(FEATURE_COLUMNS)}
+    seconds = best_seconds(lambda: client.post("/predict/batch", json=payload).get_data(), 20)
+    results.add("flask.predict_batch_1000.rows_per_second", 1000 / seconds, "rows/s", better="higher")
+
+
+# --- Baseline comparison ---
+
+def compare(results, baseline, threshold):
+    """
+    Returns the metrics that got worse than the baseline by more than
+    `threshold` (a fraction), printing a comparison table.
+    """
+    regressions = []
+    print(f"\n{'metric':<48}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, metric in results.items():
+        reference = baseline.get(name)
+        if reference is None or reference["value"] == 0:
+            continue
+        change = (metric["value"] - reference["value"]) / reference["value"]
+        worse = change if metric["better"] == "lower" else -change
+        flag = "  REGRESSION" if worse > threshold else ""
+        print(f"{name:<48}{reference['value']:>12.4g}{metric['value']:>12.4g}{change:>+9.1%}{flag}")
+        if worse > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    import lightgbm
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "lightgbm": lightgbm.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1,10,100", help="Data scale factors for ingestion/transformation.")
+    parser.add_argument("--search-scales", default="1", help="Scale factors the search is timed on ('' to skip).")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per measurement (the fastest is kept).")
+    parser.add_argument("--regime-rows", type=int, default=2_000_000, help="Rows for the regime benchmark.")
+    parser.add_argument("--predict-calls", type=int, default=5000)
+    parser.add_argument("--flask-requests", type=int, default=1000)
+    parser.add_argument("--output", default=None, help="Write the results JSON here.")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown per metric before it counts as a regression (0.25 = 25%%).")
+    parser.add_argument("--save-baseline", default=None, help="Write the results as the new baseline.")
+    args = parser.parse_args()
+
+    scales = [int(factor) for factor in args.scales.split(",") if factor]
+    search_scales = [int(factor) for factor in args.search_scales.split(",") if factor]
+    scales = sorted(set(scales) | set(search_scales))
+
+    results = Results()
+    work_dir = tempfile.mkdtemp(prefix="engine-sentinel-bench-")
+    cwd = os.getcwd()
+    try:
+        # Components write relative paths (logs, caches); keep them out of the tree
+        os.chdir(work_dir)
+        raw_paths = bench_ingestion(results, scales, work_dir, args.repeats)
+        transformed_paths = bench_transformation(results, raw_paths, work_dir, args.repeats)
+        bench_search(results, transformed_paths, search_scales)
+        bench_regimes(results, args.regime_rows, args.repeats)
+        bench_predict(results, args.predict_calls)
+        bench_flask(results, args.flask_requests)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {"environment": environment(), "metrics": results.metrics}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as file_obj:
+                json.dump(report, file_obj, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file_obj:
+            baseline = json.load(file_obj)
+        if baseline["environment"].get("cpus") != report["environment"]["cpus"]:
+            print(f"Warning: the baseline was recorded with {baseline['environment'].get('cpus')} CPU(s).")
+        regressions = compare(results.metrics, baseline["metrics"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}: {regressions}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
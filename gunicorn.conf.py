@@ -0,0 +1,24 @@
+import os
+
+from src.engine_sentinel.pipeline.startup import get_startup_profile
+
+# Gunicorn settings for the Flask app: gunicorn -c gunicorn.conf.py application:app
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+
+# Import the app and load the model once in the master. Workers are forked
+# from it ready to serve and share the model's memory pages copy-on-write.
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app was loaded, before any worker is forked
+    get_startup_profile().freeze_for_fork()
+
+
+def post_fork(server, worker):
+    get_startup_profile().after_fork()
+
+
+def post_worker_init(worker):
+    get_startup_profile().mark_ready()
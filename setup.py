@@ -24,6 +24,11 @@ setuptools.setup(
     project_urls={
         "Bug Tracker": f"https://github.com/{AUTHOR_USER_NAME}/{REPO_NAME}/issues",
     },
-    package_dir={"": "src"},
-    packages=setuptools.find_packages(where="src")
+    # The modules import each other as src.engine_sentinel, so src is installed as a package
+    packages=setuptools.find_packages(include=["src", "src.*"]),
+    entry_points={
+        "console_scripts": [
+            "engine-sentinel-score=src.engine_sentinel.pipeline.fleet_scoring:main",
+        ],
+    },
 )
\ No newline at end of file
@@ -0,0 +1,253 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+from src.engine_sentinel.exception import CustomException
+
+# LightGBM treats |x| <= kZeroThreshold as zero for missing_type 'Zero'
+ZERO_THRESHOLD = 1e-35
+# Elements of the (rows x nodes x words) work array evaluated per chunk
+CHUNK_ELEMENTS = 1 << 21
+_WORD_BITS = 64
+_ALL_BITS = np.uint64(np.iinfo(np.uint64).max)
+
+
+class CompiledEnsemble:
+    """
+    A LightGBM regression ensemble compiled into flat NumPy arrays.
+
+    Every internal node of every tree is one entry of the node arrays
+    (feature, threshold, NaN direction). Leaves are numbered left to right
+    within their tree, and each node carries a bitmask of the leaves in its
+    left subtree, which a row can no longer reach once the node sends it
+    right. Scoring needs no tree walk: all node tests are evaluated in one
+    vectorized comparison, the masks of the nodes that went right are OR-ed
+    per tree, and the lowest leaf not eliminated is the exit leaf.
+    This removes pandas, sklearn and LightGBM call overhead from small batches.
+    """
+    _ARRAYS = ("feature", "threshold", "nan_left", "zero_missing", "left_leaves", "tree_starts",
+               "leaf_offsets", "leaf_values")
+
+    def __init__(self, feature, threshold, nan_left, zero_missing, left_leaves, tree_starts, leaf_offsets,
+                 leaf_values, bias, feature_names, source_sha256=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.nan_left = nan_left
+        self.zero_missing = zero_missing
+        self.left_leaves = left_leaves
+        self.tree_starts = tree_starts
+        self.leaf_offsets = leaf_offsets
+        self.leaf_values = leaf_values
+        self.bias = float(bias)
+        self.feature_names = list(feature_names)
+        self.source_sha256 = source_sha256
+        self._has_zero_missing = bool(zero_missing.any())
+        self._feature_index = feature.astype(np.intp)
+        self._single_word = left_leaves.shape[1] == 1
+        self._left_leaves_word = left_leaves[:, 0].copy() if self._single_word else None
+
+    @property
+    def n_trees(self):
+        return len(self.tree_starts)
+
+    # --- Compilation ---
+
+    @classmethod
+    def from_booster(cls, booster, source_sha256=None):
+        """
+        Compiles a fitted LGBMRegressor or lightgbm.Booster.
+        """
+        try:
+            booster = getattr(booster, "booster_", booster)
+            dump = booster.dump_model()
+            if dump.get("num_tree_per_iteration", 1) != 1:
+                raise ValueError("Only single-output (regression) ensembles can be compiled.")
+
+            feature, threshold, nan_left, zero_missing, tree_starts = [], [], [], [], []
+            tree_leaf_counts, leaf_offsets, leaf_values = [], [], []
+            bias = 0.0
+            tree_spans = []
+
+            for tree in dump["tree_info"]:
+                root = tree["tree_structure"]
+                if "leaf_value" in root:
+                    # A tree without splits adds a constant
+                    bias += root["leaf_value"]
+                    continue
+
+                tree_starts.append(len(feature))
+                leaf_offsets.append(len(leaf_values))
+                spans = []
+
+                def visit(node):
+                    """Numbers leaves left to right; returns the (first, last) leaf under `node`."""
+                    if "leaf_value" in node:
+                        leaf_values.append(node["leaf_value"])
+                        index = len(leaf_values) - 1 - leaf_offsets[-1]
+                        return index, index
+                    if node["decision_type"] != "<=":
+                        raise ValueError("Categorical splits are not supported by the compiled evaluator.")
+                    position = len(feature)
+                    feature.append(node["split_feature"])
+                    threshold.append(node["threshold"])
+                    missing = node["missing_type"]
+                    default_left = bool(node["default_left"])
+                    zero_missing.append(missing == "Zero")
+                    # NaN follows the default direction for 'NaN' and 'Zero'; for 'None' it is read as 0
+                    nan_left.append(default_left if missing in ("NaN", "Zero") else 0.0 <= node["threshold"])
+                    spans.append(None)
+                    left = visit(node["left_child"])
+                    right = visit(node["right_child"])
+                    spans[position - tree_starts[-1]] = left
+                    return left[0], right[1]
+
+                visit(root)
+                tree_spans.append(spans)
+                tree_leaf_counts.append(len(leaf_values) - leaf_offsets[-1])
+
+            n_words = max(1, -(-max(tree_leaf_counts, default=1) // _WORD_BITS))
+            left_leaves = np.zeros((len(feature), n_words), dtype=np.uint64)
+            row = 0
+            for spans in tree_spans:
+                for first, last in spans:
+                    for leaf in range(first, last + 1):
+                        left_leaves[row, leaf // _WORD_BITS] |= np.uint64(1 << (leaf % _WORD_BITS))
+                    row += 1
+
+            return cls(
+                feature=np.asarray(feature, dtype=np.int32),
+                threshold=np.asarray(threshold, dtype=np.float64),
+                nan_left=np.asarray(nan_left, dtype=bool),
+                zero_missing=np.asarray(zero_missing, dtype=bool),
+                left_leaves=left_leaves,
+                tree_starts=np.asarray(tree_starts, dtype=np.int64),
+                leaf_offsets=np.asarray(leaf_offsets, dtype=np.int64),
+                leaf_values=np.asarray(leaf_values, dtype=np.float64),
+                bias=bias,
+                feature_names=dump["feature_names"],
+                source_sha256=source_sha256,
+            )
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # --- Evaluation ---
+
+    def predict(self, X):
+        """
+        Scores a float32/float64 vector (one row) or matrix in training column order.
+
+        Returns:
+            np.ndarray: One prediction per row.
+        """
+        X = np.asarray(X)
+        if X.ndim == 1 or len(X) == 1:
+            return np.array([self.predict_row(X.reshape(-1))])
+        n_rows = len(X)
+        out = np.full(n_rows, self.bias, dtype=np.float64)
+        if self.n_trees == 0 or n_rows == 0:
+            return out
+
+        chunk = max(1, CHUNK_ELEMENTS // self.left_leaves.size)
+        for start in range(0, n_rows, chunk):
+            out[start:start + chunk] += self._score(X[start:start + chunk])
+        return out
+
+    def predict_row(self, row):
+        """
+        Scores one row (1-D array) and returns a float. This is the lowest
+        latency path: every array stays one-dimensional.
+        """
+        if self.n_trees == 0:
+            return self.bias
+        go_right = self._go_right(np.asarray(row, dtype=np.float64).take(self._feature_index))
+        if self._single_word:
+            cleared = np.bitwise_or.reduceat(self._left_leaves_word * go_right, self.tree_starts)
+            leaf = _lowest_zero_bit(cleared)
+        else:
+            cleared = np.bitwise_or.reduceat(self.left_leaves * go_right[:, None], self.tree_starts, axis=0)
+            word = np.argmax(cleared != _ALL_BITS, axis=1)
+            leaf = word * _WORD_BITS + _lowest_zero_bit(cleared[np.arange(len(word)), word])
+        return self.bias + float(self.leaf_values[self.leaf_offsets + leaf].sum())
+
+    def _score(self, X):
+        go_right = self._go_right(np.asarray(X, dtype=np.float64).take(self._feature_index, axis=1))
+        # Leaves eliminated in each tree: OR of the left-subtree bits of every node that went right
+        cleared = np.bitwise_or.reduceat(self.left_leaves * go_right[:, :, None], self.tree_starts, axis=1)
+        if self._single_word:
+            leaf = _lowest_zero_bit(cleared[:, :, 0])
+        else:
+            word = np.argmax(cleared != _ALL_BITS, axis=2)
+            cleared = np.take_along_axis(cleared, word[:, :, None], axis=2)[:, :, 0]
+            leaf = word * _WORD_BITS + _lowest_zero_bit(cleared)
+        return self.leaf_values[self.leaf_offsets + leaf].sum(axis=1)
+
+    def _go_right(self, x):
+        """
+        Node test outcomes for node-aligned feature values `x` (LightGBM
+        compares in double precision).
+        """
+        go_right = x > self.threshold
+        if np.isnan(x.sum()):
+            go_right = np.where(np.isnan(x), ~self.nan_left, go_right)
+        if self._has_zero_missing:
+            go_right = np.where(self.zero_missing & (np.abs(x) <= ZERO_THRESHOLD), ~self.nan_left, go_right)
+        return go_right
+
+    # --- Persistence ---
+
+    def save(self, file_path):
+        """
+        Saves the arrays and metadata to one .npz file.
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            meta = {"bias": self.bias, "feature_names": self.feature_names, "source_sha256": self.source_sha256}
+            tmp_path = f"{file_path}.tmp-{os.getpid()}.npz"
+            np.savez(tmp_path, meta=np.array(json.dumps(meta)),
+                     **{name: getattr(self, name) for name in self._ARRAYS})
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def load(cls, file_path):
+        try:
+            with np.load(file_path) as data:
+                meta = json.loads(str(data["meta"]))
+                arrays = {name: data[name] for name in cls._ARRAYS}
+            return cls(**arrays, **meta)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def _lowest_zero_bit(cleared):
+    """
+    Index of the lowest zero bit of each uint64: the exit leaf, since leaves
+    are numbered left to right and only eliminated leaves have their bit set.
+    """
+    lowest = ~cleared & (cleared + np.uint64(1))
+    return np.log2(lowest.astype(np.float64)).astype(np.intp)
+
+
+def check_parity(compiled, model, X, tolerance=1e-6):
+    """
+    Compares the compiled evaluator with `model.predict` on the rows of X
+    (a DataFrame or matrix in training column order).
+
+    Returns:
+        float: The largest absolute difference.
+
+    Raises:
+        ValueError: If any prediction differs by more than `tolerance`.
+    """
+    expected = model.predict(X)
+    if hasattr(X, "columns"):
+        X = X[compiled.feature_names].to_numpy()
+    actual = compiled.predict(X)
+    max_error = float(np.max(np.abs(actual - expected))) if len(expected) else 0.0
+    if max_error > tolerance:
+        raise ValueError(f"Compiled model disagrees with model.predict by up to {max_error:.3g}")
+    return max_error
@@ -1,68 +1,202 @@
+import io
 import os
 import sys
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
 
 from src.engine_sentinel.exception import CustomException
 from src.engine_sentinel.logger import logger
+from src.engine_sentinel.metrics import instrument_stage
+from src.engine_sentinel.utils import compact_dtype, save_columnar, export_csv, RAW_COLUMNS
+
+# Number of numeric columns in every C-MAPSS train/test file
+N_RAW_COLUMNS = len(RAW_COLUMNS)
 
 @dataclass
 class DataIngestionConfig:
     """
     Configuration class for the data ingestion component.
     Defines paths for raw, train, and test data artifacts.
+    The raw data is stored as a columnar artifact; set `export_csv` to also
+    write the human-readable CSV copy.
+    `subsets` lists the C-MAPSS subsets to ingest from `data_dir`; subsets
+    whose file is missing are skipped with a warning.
     """
-    raw_data_path: str = os.path.join('artifacts', "raw_data.csv")
+    raw_data_path: str = os.path.join('artifacts', "raw_data")
+    export_csv: bool = False
+    raw_data_csv_path: str = os.path.join('artifacts', "raw_data.csv")
     # We aren't creating a train/test split here, but this is good practice
     train_data_path: str = os.path.join('artifacts', "train.csv")
     test_data_path: str = os.path.join('artifacts', "test.csv")
+    data_dir: str = 'data'
+    subsets: tuple = ("FD001", "FD002", "FD003", "FD004")
+    file_pattern: str = "train_{subset}.txt"
+    cache_dir: str = os.path.join('artifacts', 'cache', 'ingestion')
+    max_workers: int = None
+
+def subset_id(subset: str) -> int:
+    """
+    Maps a subset name such as 'FD003' to its numeric id (3).
+    """
+    return int(subset[2:])
+
+def parse_cmapss_file(file_path) -> np.ndarray:
+    """
+    Parses one C-MAPSS text file (a path or a binary buffer) into a float64
+    array of shape (n_rows, 26).
+
+    The files are space separated with two trailing blanks on every line; only
+    the first 26 columns are materialised and NaN detection is skipped, since
+    the layout is fixed and fully numeric.
+    """
+    df = pd.read_csv(
+        file_path, sep=' ', header=None, usecols=range(N_RAW_COLUMNS),
+        dtype=np.float64, na_filter=False, engine='c',
+    )
+    return df.to_numpy()
+
+def read_appended_rows(file_path: str, offset: int):
+    """
+    Parses the complete lines appended to `file_path` after byte `offset`.
+    A partial last line (a write in progress) is left for the next call.
+
+    Returns:
+        tuple: (table of shape (n_new_rows, 26), byte offset after the last complete line)
+    """
+    with open(file_path, "rb") as file_obj:
+        file_obj.seek(offset)
+        data = file_obj.read()
+    end = data.rfind(b"\n") + 1
+    if not data[:end].strip():
+        return np.empty((0, N_RAW_COLUMNS)), offset + end
+    return parse_cmapss_file(io.BytesIO(data[:end])), offset + end
+
+def iter_cmapss_chunks(file_path: str, chunk_bytes: int = 8 << 20):
+    """
+    Parses a C-MAPSS-layout file `chunk_bytes` at a time, so files of any size
+    are read in bounded memory. Each block is cut after its last complete line;
+    the remainder is carried into the next block.
+
+    Yields:
+        np.ndarray: Tables of shape (n_rows, 26).
+    """
+    carry = b""
+    with open(file_path, "rb") as file_obj:
+        while True:
+            block = file_obj.read(chunk_bytes)
+            data = carry + block
+            end = len(data) if not block else data.rfind(b"\n") + 1
+            carry = data[end:]
+            if data[:end].strip():
+                yield parse_cmapss_file(io.BytesIO(data[:end]))
+            if not block:
+                break
+
+def cached_table_path(file_path: str, cache_dir: str) -> str:
+    """
+    Returns the binary cache location for a source file, keyed on its
+    absolute path, size and mtime. Any edit to the source yields a new key.
+    """
+    stat = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(cache_dir, f"{name}-{digest}.npy")
+
+def load_cmapss_table(file_path: str, cache_dir: str) -> str:
+    """
+    Parses `file_path` unless a cached binary copy exists, and returns the
+    path of that cache file. Runs in a worker process during ingestion.
+    """
+    cache_path = cached_table_path(file_path, cache_dir)
+    if not os.path.exists(cache_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        table = parse_cmapss_file(file_path)
+        tmp_path = f"{cache_path}.tmp-{os.getpid()}.npy"
+        np.save(tmp_path, table)
+        os.replace(tmp_path, cache_path)
+    return cache_path
+
+def table_to_frame(table: np.ndarray) -> pd.DataFrame:
+    """
+    Names the 26 raw columns. Readings become float32 and the unit and cycle
+    columns the smallest integer type that holds them, halving the frame.
+    """
+    ids = table[:, :2].astype(np.int64)
+    data = {
+        'unit_number': ids[:, 0].astype(compact_dtype(ids[:, 0])),
+        'time_in_cycles': ids[:, 1].astype(compact_dtype(ids[:, 1])),
+    }
+    readings = table[:, 2:].astype(np.float32)
+    for j, column in enumerate(RAW_COLUMNS[2:]):
+        data[column] = readings[:, j]
+    return pd.DataFrame(data, copy=False)
 
 class DataIngestion:
     """
     This class handles reading the raw data from the source,
-    assigning column names, and saving it as a clean CSV file.
+    assigning column names, and saving it as a columnar artifact.
     """
     def __init__(self):
         self.ingestion_config = DataIngestionConfig()
 
+    @instrument_stage("data_ingestion")
     def initiate_data_ingestion(self):
         """
         Main method to perform data ingestion.
+        Every configured subset is parsed in parallel (or served from the
+        binary cache) and the tables are stacked with a 'subset_id' column.
         """
         logger.info("Entered the data ingestion method or component")
         try:
-            # Define column names based on the dataset documentation
-            column_names = ['unit_number', 'time_in_cycles', 'op_setting_1', 'op_setting_2', 'op_setting_3'] + \
-                           [f'sensor_{i}' for i in range(1, 22)]
-
-            # --- This logic is directly from your notebook ---
-            # Load the training data from the data folder
-            df = pd.read_csv('data/train_FD001.txt', sep=' ', header=None)
-            
-            # Drop the extra empty columns
-            df.drop(columns=[26, 27], inplace=True)
-
-            # Assign the correct column names
-            df.columns = column_names
-            # --- End of notebook logic ---
-            
+            config = self.ingestion_config
+
+            sources = []
+            for subset in config.subsets:
+                file_path = os.path.join(config.data_dir, config.file_pattern.format(subset=subset))
+                if os.path.exists(file_path):
+                    sources.append((subset, file_path))
+                else:
+                    logger.warning(f"Skipping subset {subset}: {file_path} not found")
+            if not sources:
+                raise FileNotFoundError(f"None of the subsets {config.subsets} were found in {config.data_dir}")
+
+            file_paths = [file_path for _, file_path in sources]
+            cache_dirs = [config.cache_dir] * len(sources)
+            if len(sources) == 1:
+                cache_paths = [load_cmapss_table(file_paths[0], config.cache_dir)]
+            else:
+                max_workers = min(len(sources), config.max_workers or os.cpu_count() or 1)
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    cache_paths = list(executor.map(load_cmapss_table, file_paths, cache_dirs))
+            logger.info(f"Parsed {len(sources)} subset(s): {[subset for subset, _ in sources]}")
+
+            frames = []
+            for (subset, _), cache_path in zip(sources, cache_paths):
+                frame = table_to_frame(np.load(cache_path))
+                frame.insert(0, 'subset_id', np.int8(subset_id(subset)))
+                frames.append(frame)
+            df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
             logger.info("Read the dataset as dataframe")
 
-            # Create the 'artifacts' directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.ingestion_config.raw_data_path), exist_ok=True)
+            # Save the raw data with correct headers as compact binary columns
+            save_columnar(config.raw_data_path, df)
+            logger.info(f"Raw data saved to: {config.raw_data_path}")
+
+            if config.export_csv:
+                export_csv(df, config.raw_data_csv_path)
 
-            # Save the raw data with correct headers
-            df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)
-            logger.info(f"Raw data saved to: {self.ingestion_config.raw_data_path}")
-            
             # For this project, we can consider the raw data as our "training" set for now
             # In a more complex project, we would also create a test split here.
-            
+
             logger.info("Ingestion of the data is completed")
 
-            return self.ingestion_config.raw_data_path
+            return config.raw_data_path
 
         except Exception as e:
             raise CustomException(e, sys)
-
-
@@ -1,29 +1,103 @@
 import sys
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 
 import numpy as np 
 import pandas as pd
 
 from src.engine_sentinel.exception import CustomException
 from src.engine_sentinel.logger import logger
+from src.engine_sentinel.metrics import instrument_stage
+from src.engine_sentinel.drift import DriftReference, DriftReferenceConfig
+from src.engine_sentinel.features import RollingFeatureConfig, RollingFeatureEngine, segment_bounds
+from src.engine_sentinel.regimes import RegimeIndex, RegimeIndexConfig
+from src.engine_sentinel.schema import FeatureSchema, FeatureSchemaConfig
+from src.engine_sentinel.utils import load_frame, save_columnar, export_csv, raw_feature_matrix, FEATURE_COLUMNS, OP_SETTING_COLUMNS, SENSOR_COLUMNS, UNIT_KEY_COLUMNS, TARGET_COLUMN
 
 @dataclass
 class DataTransformationConfig:
     """
     Configuration class for the data transformation component.
-    Defines the file path for the output transformed data.
+    Defines the file path for the output transformed data (a columnar artifact)
+    and the optional CSV export, plus the rolling feature definition that is
+    saved to `feature_spec_path` for reuse at serving time.
+    Constant, near-zero-variance and duplicate raw columns are pruned
+    according to `feature_schema` before the rolling features are computed
+    (op settings on their raw values, sensors after regime normalization);
+    the kept columns and the compact dtypes are saved to `feature_schema_path`.
+    Set `prune_features` to False to keep every column.
+    On multi-condition data (FD002/FD004) the sensors are normalized per
+    operating regime before the rolling features; the regime index is saved
+    to `regime_index_path` (with a single regime it is saved inactive).
+    The distribution of the kept raw readings is saved to
+    `drift_reference_path`, for the serving-side drift monitor.
     """
-    transformed_data_path: str = os.path.join('artifacts', "transformed_data.csv")
+    transformed_data_path: str = os.path.join('artifacts', "transformed_data")
+    export_csv: bool = False
+    transformed_data_csv_path: str = os.path.join('artifacts', "transformed_data.csv")
+    feature_spec_path: str = os.path.join('artifacts', "feature_spec.json")
+    rolling_features: RollingFeatureConfig = field(default_factory=RollingFeatureConfig)
+    feature_schema_path: str = os.path.join('artifacts', "feature_schema.json")
+    feature_schema: FeatureSchemaConfig = field(default_factory=FeatureSchemaConfig)
+    prune_features: bool = True
+    regime_index_path: str = os.path.join('artifacts', "regime_index.npz")
+    regime_index: RegimeIndexConfig = field(default_factory=RegimeIndexConfig)
+    regime_normalization: bool = True
+    drift_reference_path: str = os.path.join('artifacts', "drift_reference.npz")
+    drift_reference: DriftReferenceConfig = field(default_factory=DriftReferenceConfig)
+
+def transform_units(df, engine, schema=None, regimes=None):
+    """
+    Labels and featurizes complete run-to-failure histories: sorts the rows
+    by (subset, unit, time), adds the RUL target and the rolling features, and
+    drops the raw columns the schema pruned. Shared by the full transformation
+    and incremental training, so both build identical columns.
+
+    Args:
+        df (pd.DataFrame): Raw rows of whole units.
+        engine (RollingFeatureEngine): The rolling feature definition.
+        schema (FeatureSchema): Optional; its pruned columns are dropped.
+        regimes (RegimeIndex): Optional; its sensors are replaced by their
+            per-regime z-scores.
+
+    Returns:
+        pd.DataFrame: The transformed rows.
+    """
+    # Sort once by (subset, unit, time); every later step works on this order
+    unit_keys = [column for column in UNIT_KEY_COLUMNS if column in df.columns]
+    sort_keys = [df['time_in_cycles'].to_numpy()] + [df[column].to_numpy() for column in reversed(unit_keys)]
+    order = np.lexsort(sort_keys)
+    if not np.array_equal(order, np.arange(len(df))):
+        df = df.iloc[order].reset_index(drop=True)
+    times = df['time_in_cycles'].to_numpy()
+    segment_start, segment_end = segment_bounds(*[df[column].to_numpy() for column in unit_keys])
+
+    # RUL: cycles left until the last (failure) cycle of each engine
+    df[TARGET_COLUMN] = times[segment_end] - times
+
+    if schema is not None:
+        dropped = [column for column in schema.dropped if column in df.columns]
+        if dropped:
+            df = df.drop(columns=dropped)
+
+    if regimes is not None and regimes.active:
+        normalized = regimes.normalize(raw_feature_matrix(df))
+        for column in regimes.sensors:
+            df[column] = normalized[:, FEATURE_COLUMNS.index(column)]
+
+    # Rolling features over the same sorted array, without per-unit loops
+    features = engine.compute(df[list(engine.config.sensors)].to_numpy(), segment_start, times)
+    return pd.concat([df, pd.DataFrame(features, columns=engine.feature_names())], axis=1)
 
 class DataTransformation:
     """
-    This class handles the feature engineering part of our pipeline,
-    specifically calculating the Remaining Useful Life (RUL).
+    This class handles the feature engineering part of our pipeline:
+    the Remaining Useful Life (RUL) label and the per-unit rolling features.
     """
     def __init__(self):
         self.data_transformation_config = DataTransformationConfig()
 
+    @instrument_stage("data_transformation")
     def initiate_data_transformation(self, raw_data_path):
         """
         Main method to perform data transformation.
@@ -33,34 +107,67 @@ class DataTransformation:
         """
         try:
             # Load the raw data
-            df = pd.read_csv(raw_data_path)
+            df = load_frame(raw_data_path)
             logger.info("Raw data file loaded successfully for transformation.")
 
-            # --- RUL Calculation Logic (from our notebook) ---
-            logger.info("Starting RUL calculation.")
-            
-            # 1. Find the maximum (last) cycle for each engine
-            max_cycles_df = df.groupby('unit_number')['time_in_cycles'].max().reset_index()
-            max_cycles_df.columns = ['unit_number', 'max_cycles']
-            
-            # 2. Merge this 'max_cycles' information back into the original dataframe
-            df = pd.merge(df, max_cycles_df, on='unit_number', how='left')
-            
-            # 3. Calculate the RUL for each row
-            df['RUL'] = df['max_cycles'] - df['time_in_cycles']
-            
-            # 4. Drop the temporary 'max_cycles' column
-            df.drop(columns=['max_cycles'], inplace=True)
-            
-            logger.info("RUL calculation complete.")
+            config = self.data_transformation_config
+
+            feature_columns = [column for column in FEATURE_COLUMNS if column in df.columns]
+            setting_columns = [column for column in OP_SETTING_COLUMNS if column in feature_columns]
+            raw = raw_feature_matrix(df)
+
+            # 1. Operating regimes of the kept op settings; inactive for single-condition data.
+            # The settings are pruned on their raw values, as they locate the regime
+            if config.prune_features and setting_columns:
+                settings = FeatureSchema.fit(df[setting_columns].to_numpy(), setting_columns, config.feature_schema)
+                setting_columns = settings.input_columns
+            regime_columns = setting_columns + [column for column in SENSOR_COLUMNS if column in feature_columns]
+            regimes = RegimeIndex.fit(raw if config.regime_normalization else raw[:0], regime_columns,
+                                      config.regime_index)
+
+            # 2. Prune constant and redundant readings; their rolling features are never computed.
+            # Sensors are judged on their per-regime z-scores: across several regimes a reading
+            # that only follows the flight condition is not constant in raw units
+            if config.prune_features:
+                values = regimes.normalize(raw)[:, [FEATURE_COLUMNS.index(column) for column in feature_columns]]
+                schema = FeatureSchema.fit(values, feature_columns, config.feature_schema)
+                del values
+            else:
+                schema = FeatureSchema(feature_columns)
+            if schema.dropped:
+                logger.info(f"Pruning {len(schema.dropped)} raw column(s): {schema.dropped}")
+            rolling_config = replace(config.rolling_features, sensors=schema.prune_sensors(config.rolling_features.sensors))
+            if not set(regimes.sensors) <= set(schema.input_columns):
+                # Same settings, so the same regimes; only the kept sensors are normalized
+                regimes = RegimeIndex.fit(raw if config.regime_normalization else raw[:0], schema.input_columns,
+                                          config.regime_index)
+            regimes.save(config.regime_index_path)
+            if regimes.active:
+                logger.info(f"Normalizing {len(regimes.sensors)} sensors across {regimes.n_regimes} operating regimes")
+
+            # 3. Distribution of the kept raw readings, which serving compares live inputs with
+            DriftReference.fit(raw, schema.input_columns, config.drift_reference).save(config.drift_reference_path)
+            del raw
+
+            # 4. RUL label and rolling features
+            engine = RollingFeatureEngine(rolling_config)
+            df = transform_units(df, engine, schema, regimes)
+            engine.save(config.feature_spec_path)
+            logger.info(f"Computed {len(engine.feature_names())} rolling features; definition saved to {config.feature_spec_path}")
+
+            # Compact dtypes in memory too, and record them next to the kept columns
+            df = schema.record_dtypes(df)
+            schema.save(config.feature_schema_path)
 
             # Save the new, transformed dataframe
-            os.makedirs(os.path.dirname(self.data_transformation_config.transformed_data_path), exist_ok=True)
-            df.to_csv(self.data_transformation_config.transformed_data_path, index=False, header=True)
+            save_columnar(config.transformed_data_path, df)
             
-            logger.info(f"Transformed data saved to: {self.data_transformation_config.transformed_data_path}")
+            logger.info(f"Transformed data saved to: {config.transformed_data_path}")
+
+            if config.export_csv:
+                export_csv(df, config.transformed_data_csv_path)
 
-            return self.data_transformation_config.transformed_data_path
+            return config.transformed_data_path
 
         except Exception as e:
             raise CustomException(e, sys)
@@ -0,0 +1,343 @@
+import os
+import sys
+import json
+import hashlib
+import shutil
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.engine_sentinel.compiled_model import CompiledEnsemble, check_parity
+from src.engine_sentinel.components.data_ingestion import parse_cmapss_file, read_appended_rows, subset_id, table_to_frame
+from src.engine_sentinel.components.data_transformation import transform_units
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.features import RollingFeatureEngine
+from src.engine_sentinel.logger import logger
+from src.engine_sentinel.metrics import instrument_stage
+from src.engine_sentinel.model_artifact import booster_sha256, load_model_artifact, load_model_metadata, save_model_artifact
+from src.engine_sentinel.regimes import RegimeIndex
+from src.engine_sentinel.schema import FeatureSchema
+from src.engine_sentinel.utils import content_sha256, load_frame, save_columnar, ID_COLUMNS, TARGET_COLUMN
+
+# Bytes before the watermark offset whose hash detects a rewritten (not appended) file
+TAIL_BYTES = 4096
+
+# Booster parameters that must not be carried over into continued training
+_DROPPED_PARAMS = ("n_estimators", "num_iterations", "num_iteration", "n_iter", "num_tree", "num_trees",
+                   "num_round", "num_rounds", "num_boost_round", "importance_type", "class_weight", "n_jobs",
+                   "num_threads", "early_stopping_round", "early_stopping_rounds", "metric")
+
+@dataclass
+class IncrementalTrainerConfig:
+    """
+    Configuration for incremental (warm-start) training.
+    The state file holds the ingestion watermark (byte offset, tail hash and
+    each unit's last cycle, per source file), the data segments and the drift
+    baseline. Each update boosts `rounds` more trees from the saved model on
+    the new rows plus a replay sample of the history (`replay_ratio` times the
+    new rows, at most `max_replay_rows`), binned with the bin boundaries of a
+    saved reference sample, so its cost follows the size of the delta.
+    A full re-search is requested when the model's RMSE on the new rows (before
+    updating) exceeds the running baseline by more than `drift_threshold`, or
+    after `max_incremental_rounds` added rounds. RMSE over a few units is
+    noisy, so keep the threshold loose for small batches.
+    """
+    state_path: str = os.path.join('artifacts', 'incremental', 'state.json')
+    segments_dir: str = os.path.join('artifacts', 'incremental', 'segments')
+    reference_dataset_path: str = os.path.join('artifacts', 'incremental', 'reference.bin')
+    reference_rows: int = 50000
+    rounds: int = 50
+    max_incremental_rounds: int = 500
+    replay_ratio: float = 1.0
+    max_replay_rows: int = 200000
+    drift_threshold: float = 0.5
+    baseline_smoothing: float = 0.3
+    random_state: int = 42
+
+class FullRetrainRequired(Exception):
+    """
+    Raised when the new data cannot be added incrementally: the caller runs
+    the full pipeline (with hyperparameter search) instead.
+    """
+
+def _tail_sha256(file_path, offset):
+    with open(file_path, "rb") as file_obj:
+        file_obj.seek(max(0, offset - TAIL_BYTES))
+        return hashlib.sha256(file_obj.read(offset - max(0, offset - TAIL_BYTES))).hexdigest()
+
+def file_watermark(file_path, subset, table=None):
+    """
+    Watermark of a fully ingested source file: its size, the hash of its
+    last bytes and the last cycle of every unit in it.
+    """
+    table = parse_cmapss_file(file_path) if table is None else table
+    offset = os.path.getsize(file_path)
+    units = {}
+    for unit, cycle in table[:, :2].astype(np.int64):
+        key = f"{subset}:{unit}"
+        units[key] = max(units.get(key, 0), int(cycle))
+    return {"offset": offset, "tail_sha256": _tail_sha256(file_path, offset), "units": units}
+
+def booster_train_params(params):
+    """
+    Converts saved model parameters (LGBMRegressor.get_params() or a
+    booster's own) into lightgbm.train parameters for continued boosting.
+    """
+    converted = {key: value for key, value in params.items() if key not in _DROPPED_PARAMS and value is not None}
+    if "random_state" in converted:
+        converted["seed"] = converted.pop("random_state")
+    converted.setdefault("objective", "regression")
+    converted["verbosity"] = -1
+    return converted
+
+class IncrementalTrainer:
+    """
+    Adds newly arrived run-to-failure units to the trained model without
+    re-reading the history or re-running the hyperparameter search.
+    """
+    def __init__(self, model_dir, feature_spec_path, feature_schema_path, compiled_model_path,
+                 config: IncrementalTrainerConfig = None, regime_index_path=None):
+        self.model_dir = model_dir
+        self.feature_spec_path = feature_spec_path
+        self.feature_schema_path = feature_schema_path
+        self.regime_index_path = regime_index_path
+        self.compiled_model_path = compiled_model_path
+        self.config = config or IncrementalTrainerConfig()
+
+    # --- State ---
+
+    def load_state(self):
+        if not os.path.exists(self.config.state_path):
+            return None
+        with open(self.config.state_path) as file_obj:
+            return json.load(file_obj)
+
+    def save_state(self, state):
+        os.makedirs(os.path.dirname(self.config.state_path), exist_ok=True)
+        tmp_path = f"{self.config.state_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as file_obj:
+            json.dump(state, file_obj, indent=2)
+        os.replace(tmp_path, self.config.state_path)
+
+    def reset(self):
+        """
+        Forgets the incremental state, e.g. after a full retrain.
+        """
+        for path in (self.config.state_path, self.config.reference_dataset_path):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(self.config.segments_dir, ignore_errors=True)
+
+    def bootstrap(self, sources, transformed_data_path):
+        """
+        Starts incremental tracking from a fully trained model: records the
+        watermark of the source files it was trained on and saves the
+        reference sample whose bins later batches reuse.
+
+        Args:
+            sources (list): (subset, file path) of the ingested source files.
+            transformed_data_path (str): The transformed data the model was trained on.
+        """
+        try:
+            import lightgbm as lgb
+
+            metadata = load_model_metadata(self.model_dir)
+            if metadata.get("training_data_sha256") not in (None, content_sha256(transformed_data_path)):
+                raise FullRetrainRequired(f"{self.model_dir} was not trained on {transformed_data_path}")
+
+            df = load_frame(transformed_data_path)
+            rng = np.random.default_rng(self.config.random_state)
+            n_reference = min(len(df), self.config.reference_rows)
+            rows = np.sort(rng.choice(len(df), n_reference, replace=False))
+            X, y = self._split_xy(df.iloc[rows], metadata["feature_names"])
+            params = booster_train_params(metadata["params"])
+            os.makedirs(os.path.dirname(self.config.reference_dataset_path), exist_ok=True)
+            if os.path.exists(self.config.reference_dataset_path):
+                os.remove(self.config.reference_dataset_path)
+            reference = lgb.Dataset(X, y, params={"verbosity": -1, **params}, free_raw_data=False)
+            reference.save_binary(self.config.reference_dataset_path)
+
+            state = {
+                "watermarks": {path: {"subset": subset, **file_watermark(path, subset)} for subset, path in sources},
+                "segments": [{"path": transformed_data_path, "n_rows": int(len(df))}],
+                "train_params": params,
+                "incremental_rounds": 0,
+                "baseline_rmse": None,
+                "updates": 0,
+            }
+            self.save_state(state)
+            logger.info(f"Incremental training bootstrapped from {self.model_dir} ({len(sources)} source file(s))")
+            return state
+
+        except FullRetrainRequired:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # --- Delta ---
+
+    def read_delta(self, state, sources):
+        """
+        Reads the rows appended to the source files since the watermark.
+
+        Returns:
+            tuple: (raw delta DataFrame or None, updated watermarks)
+
+        Raises:
+            FullRetrainRequired: If a file was rewritten or a known unit got new cycles.
+        """
+        watermarks = json.loads(json.dumps(state["watermarks"]))
+        frames = []
+        for subset, path in sources:
+            mark = watermarks.get(path)
+            if mark is None:
+                # A new source file: all of it is new
+                mark = watermarks[path] = {"subset": subset, "offset": 0, "tail_sha256": None, "units": {}}
+            size = os.path.getsize(path)
+            if size < mark["offset"] or (mark["offset"] and _tail_sha256(path, mark["offset"]) != mark["tail_sha256"]):
+                raise FullRetrainRequired(f"{path} was rewritten since it was last ingested")
+            if size == mark["offset"]:
+                continue
+
+            table, offset = read_appended_rows(path, mark["offset"])
+            if len(table):
+                pairs = table[:, :2].astype(np.int64)
+                extended = sorted({f"{subset}:{unit}" for unit, _ in pairs} & set(mark["units"]))
+                if extended:
+                    # Earlier rows of these units were labelled with the wrong failure cycle
+                    raise FullRetrainRequired(f"{path} has new cycles for already trained unit(s) {extended[:5]}")
+                for unit, cycle in pairs:
+                    key = f"{subset}:{unit}"
+                    mark["units"][key] = max(mark["units"].get(key, 0), int(cycle))
+                frame = table_to_frame(table)
+                frame.insert(0, 'subset_id', np.int8(subset_id(subset)))
+                frames.append(frame)
+            mark["offset"] = offset
+            mark["tail_sha256"] = _tail_sha256(path, offset)
+
+        if not frames:
+            return None, watermarks
+        return (pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]), watermarks
+
+    def _split_xy(self, df, feature_names):
+        X = df.drop(columns=[TARGET_COLUMN] + [column for column in ID_COLUMNS if column in df.columns])
+        return X[feature_names], df[TARGET_COLUMN].to_numpy(dtype=np.float64)
+
+    def replay_sample(self, state, n_rows, feature_names, rng):
+        """
+        Draws about `n_rows` rows from the data the model has seen, across
+        all segments, reading only the sampled rows of the memory-mapped columns.
+        """
+        sizes = np.array([segment["n_rows"] for segment in state["segments"]], dtype=np.float64)
+        if n_rows <= 0 or sizes.sum() == 0:
+            return None
+        counts = rng.multinomial(n_rows, sizes / sizes.sum())
+        frames = []
+        for segment, count in zip(state["segments"], counts):
+            if count:
+                rows = np.sort(rng.choice(segment["n_rows"], min(count, segment["n_rows"]), replace=False))
+                frames.append(load_frame(segment["path"]).iloc[rows])
+        return self._split_xy(pd.concat(frames, ignore_index=True), feature_names)
+
+    # --- Update ---
+
+    @instrument_stage("incremental_training")
+    def initiate_incremental_training(self, sources):
+        """
+        Adds the units appended to the source files since the last run.
+
+        Args:
+            sources (list): (subset, file path) of the source files.
+
+        Returns:
+            dict: Update report (status 'up_to_date' or 'updated', rows, rounds, RMSE).
+
+        Raises:
+            FullRetrainRequired: When the update has to be a full retrain instead.
+        """
+        try:
+            import lightgbm as lgb
+
+            config = self.config
+            state = self.load_state()
+            if state is None:
+                raise FullRetrainRequired("No incremental state; bootstrap from a full training run first")
+
+            raw, watermarks = self.read_delta(state, sources)
+            if raw is None:
+                logger.info("Incremental training: no new rows since the watermark")
+                return {"status": "up_to_date", "new_rows": 0}
+
+            schema = FeatureSchema.load(self.feature_schema_path)
+            engine = RollingFeatureEngine.load(self.feature_spec_path)
+            # New units are normalized with the regimes of the original training data
+            regime_path = self.regime_index_path
+            regimes = RegimeIndex.load(regime_path) if regime_path and os.path.exists(regime_path) else None
+            delta = transform_units(raw, engine, schema, regimes)
+            delta = delta.astype({column: dtype for column, dtype in schema.dtypes.items() if column in delta.columns})
+            metadata = load_model_metadata(self.model_dir)
+            feature_names = metadata["feature_names"]
+            X_delta, y_delta = self._split_xy(delta, feature_names)
+
+            # Drift: how well the current model does on units it has never seen
+            booster = load_model_artifact(self.model_dir)
+            rmse = float(np.sqrt(np.mean((booster.predict(X_delta) - y_delta) ** 2)))
+            baseline = state["baseline_rmse"]
+            logger.info(f"Incremental training: {len(delta)} new rows, model RMSE on them {rmse:.2f} (baseline {baseline})")
+            if baseline is not None and rmse > baseline * (1.0 + config.drift_threshold):
+                raise FullRetrainRequired(f"Validation drift: RMSE {rmse:.2f} on new units vs baseline {baseline:.2f}")
+            if state["incremental_rounds"] + config.rounds > config.max_incremental_rounds:
+                raise FullRetrainRequired(f"{state['incremental_rounds']} rounds added since the last search")
+
+            # Continue boosting on the delta plus a replay sample of the history
+            rng = np.random.default_rng(config.random_state + state["updates"] + 1)
+            n_replay = min(int(len(delta) * config.replay_ratio), config.max_replay_rows)
+            replay = self.replay_sample(state, n_replay, feature_names, rng)
+            if replay is not None:
+                X_train = pd.concat([X_delta, replay[0]], ignore_index=True)
+                y_train = np.concatenate([y_delta, replay[1]])
+            else:
+                X_train, y_train = X_delta, y_delta
+            dataset_params = {"verbosity": -1, **state["train_params"]}
+            reference = lgb.Dataset(config.reference_dataset_path, params=dataset_params)
+            train_set = lgb.Dataset(X_train, y_train, reference=reference, params=dataset_params, free_raw_data=False)
+            updated = lgb.train(
+                state["train_params"], train_set, num_boost_round=config.rounds,
+                init_model=booster, keep_training_booster=False,
+            )
+
+            # Persist: compiled export, model, delta segment, then the watermark. The parity
+            # check runs before anything is written, so a failed export leaves the served
+            # model in place; until the model is swapped in, the new export does not match
+            # it and serving falls back to the booster.
+            compiled = CompiledEnsemble.from_booster(updated, source_sha256=booster_sha256(updated))
+            check_parity(compiled, updated, X_delta)
+            compiled.save(self.compiled_model_path)
+            save_model_artifact(
+                self.model_dir, updated, feature_dtypes=dict(zip(feature_names, metadata["feature_dtypes"])),
+                training_data_sha256=metadata.get("training_data_sha256"), feature_schema=metadata.get("feature_schema"),
+            )
+
+            segment_path = os.path.join(config.segments_dir, f"{state['updates'] + 1:06d}")
+            save_columnar(segment_path, delta)
+
+            state["watermarks"] = watermarks
+            state["segments"].append({"path": segment_path, "n_rows": int(len(delta))})
+            state["incremental_rounds"] += config.rounds
+            state["updates"] += 1
+            smoothing = config.baseline_smoothing
+            state["baseline_rmse"] = rmse if baseline is None else (1 - smoothing) * baseline + smoothing * rmse
+            self.save_state(state)
+
+            report = {
+                "status": "updated", "new_rows": int(len(delta)), "replay_rows": int(len(X_train) - len(delta)),
+                "rounds": config.rounds, "num_trees": updated.num_trees(), "rmse_before": rmse,
+            }
+            logger.info(f"Incremental training: {report}")
+            return report
+
+        except FullRetrainRequired:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -1,77 +1,246 @@
 import os
 import sys
-import mlflow
-import mlflow.sklearn
-from urllib.parse import urlparse
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import r2_score
-from mlflow.models.signature import infer_signature  # <-- NEW IMPORT
+import numpy as np
 
+from src.engine_sentinel.components.data_ingestion import load_cmapss_table
 from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.features import RollingFeatureEngine
 from src.engine_sentinel.logger import logger
-from src.engine_sentinel.utils import load_object
+from src.engine_sentinel.metrics import instrument_stage
+from src.engine_sentinel.model_artifact import load_model, load_model_metadata
+from src.engine_sentinel.regimes import RegimeIndex
+from src.engine_sentinel.tracking import get_tracker
+from src.engine_sentinel.utils import content_sha256, file_sha256, FEATURE_COLUMNS
+
+@dataclass
+class ModelEvaluationConfig:
+    """
+    Configuration class for the model evaluation component.
+    The model is scored on the official C-MAPSS test sets: for every subset,
+    the last recorded cycle of each engine in `test_pattern` is compared with
+    the true RUL in `rul_pattern`. Subsets without both files are skipped.
+    Test readings are normalized with the regime index at `regime_index_path`
+    when it is active, like the training data.
+    Results are cached in `cache_dir` per (model, feature spec, regime index,
+    subset files).
+    """
+    data_dir: str = 'data'
+    subsets: tuple = ("FD001", "FD002", "FD003", "FD004")
+    test_pattern: str = "test_{subset}.txt"
+    rul_pattern: str = "RUL_{subset}.txt"
+    feature_spec_path: str = os.path.join('artifacts', "feature_spec.json")
+    regime_index_path: str = os.path.join('artifacts', "regime_index.npz")
+    # Parsed test files share the binary cache of the ingestion stage
+    parse_cache_dir: str = os.path.join('artifacts', 'cache', 'ingestion')
+    cache_dir: str = os.path.join('artifacts', 'cache', 'evaluation')
+    max_workers: int = None
+
+def last_cycle_index(units):
+    """
+    Returns the index of the last row of every unit, for rows sorted so that
+    each unit's cycles are contiguous and in time order.
+    """
+    units = np.asarray(units)
+    is_last = np.ones(len(units), dtype=bool)
+    is_last[:-1] = units[1:] != units[:-1]
+    return np.flatnonzero(is_last)
+
+def nasa_score(y_true, y_pred):
+    """
+    Asymmetric scoring function of the PHM08 challenge (Saxena et al., 2008):
+    late predictions (d > 0) are penalised more than early ones.
+    s = sum(exp(-d/13) - 1) for d < 0, sum(exp(d/10) - 1) for d >= 0,
+    with d = predicted - true RUL.
+    """
+    d = np.asarray(y_pred, dtype=np.float64) - np.asarray(y_true, dtype=np.float64)
+    return float(np.sum(np.where(d < 0, np.exp(-d / 13.0), np.exp(d / 10.0)) - 1.0))
+
+def model_sha256(model_path):
+    """
+    Content hash of the model: the booster hash recorded in a native
+    artifact's header, or the file hash of a legacy pickle.
+    """
+    if model_path.endswith(".pkl"):
+        return file_sha256(model_path)
+    return load_model_metadata(model_path)["booster_sha256"]
+
+def build_test_matrix(model, engine, table, regimes=None, feature_spec_path=None):
+    """
+    Builds the model input for the last cycle of each unit in a parsed test
+    table. Sensors are normalized per regime (with an active `regimes`
+    index), then rolling features are computed over each unit's full history.
+    `feature_spec_path` names the spec `engine` was loaded from, for errors.
+    """
+    try:
+        table = table[np.lexsort((table[:, 1], table[:, 0]))]
+        units, times = table[:, 0], table[:, 1]
+        raw = table[:, 2:].astype(np.float32)
+        if regimes is not None:
+            raw = regimes.normalize(raw)
+        last = last_cycle_index(units)
+
+        booster = getattr(model, "booster_", model)
+        names = list(booster.feature_name())
+        if names == FEATURE_COLUMNS:
+            return raw[last], units[last]
+        if engine is None:
+            raise FileNotFoundError(
+                f"The model uses rolling features, but their feature spec "
+                f"({feature_spec_path or 'feature_spec.json'}) was not found"
+            )
+
+        sensor_index = [FEATURE_COLUMNS.index(sensor) for sensor in engine.config.sensors]
+        rolling = engine.transform_sorted(raw[:, sensor_index], units, times)
+        available = {name: i for i, name in enumerate(FEATURE_COLUMNS + engine.feature_names())}
+        order = np.array([available[name] for name in names])
+        return np.ascontiguousarray(np.hstack([raw[last], rolling[last]])[:, order], dtype=np.float32), units[last]
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def score_test_subset(model_path, feature_spec_path, test_path, rul_path, parse_cache_dir, regime_index_path=None):
+    """
+    Scores one subset's official test set. Runs in a worker process.
+
+    Returns:
+        dict: n_units, rmse, mae and nasa_score.
+    """
+    model = load_model(model_path)
+    engine = RollingFeatureEngine.load(feature_spec_path) if os.path.exists(feature_spec_path) else None
+    regimes = RegimeIndex.load(regime_index_path) if regime_index_path and os.path.exists(regime_index_path) else None
+    table = np.load(load_cmapss_table(test_path, parse_cache_dir))
+    matrix, units = build_test_matrix(model, engine, table, regimes, feature_spec_path=feature_spec_path)
+
+    y_true = np.loadtxt(rul_path, ndmin=1)
+    if len(y_true) != len(units):
+        raise ValueError(f"{rul_path} has {len(y_true)} labels for {len(units)} engines in {test_path}")
+    y_pred = getattr(model, "booster_", model).predict(matrix)
+    error = y_pred - y_true
+    return {
+        "n_units": int(len(units)),
+        "rmse": float(np.sqrt(np.mean(error ** 2))),
+        "mae": float(np.mean(np.abs(error))),
+        "nasa_score": nasa_score(y_true, y_pred),
+    }
 
 class ModelEvaluation:
     """
-    This class handles the evaluation of the trained model against the test set
-    and logs the performance metrics using MLflow.
+    This class evaluates the trained model on the official C-MAPSS test sets
+    (RMSE and the NASA score on each engine's last cycle) and records the
+    metrics with the offline experiment tracker.
     """
-    def initiate_model_evaluation(self, transformed_data_path: str, trained_model_path: str):
+    def __init__(self):
+        self.model_evaluation_config = ModelEvaluationConfig()
+
+    def subset_files(self):
+        """
+        Returns (subset, test file, RUL file) for every configured subset
+        whose test and RUL files both exist.
         """
-        Loads the test data and trained model, calculates metrics, and logs them.
-        
+        config = self.model_evaluation_config
+        sources = []
+        for subset in config.subsets:
+            test_path = os.path.join(config.data_dir, config.test_pattern.format(subset=subset))
+            rul_path = os.path.join(config.data_dir, config.rul_pattern.format(subset=subset))
+            if os.path.exists(test_path) and os.path.exists(rul_path):
+                sources.append((subset, test_path, rul_path))
+            else:
+                logger.warning(f"Skipping evaluation on {subset}: {test_path} or {rul_path} not found")
+        return sources
+
+    def _cache_path(self, model_hash, spec_hash, regime_hash, subset, test_path, rul_path):
+        key = "|".join([model_hash, spec_hash, regime_hash, file_sha256(test_path), file_sha256(rul_path)])
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.model_evaluation_config.cache_dir, f"{subset}-{digest}.json")
+
+    @instrument_stage("model_evaluation")
+    def initiate_model_evaluation(self, trained_model_path: str):
+        """
+        Scores the model on every available test subset, in parallel. Subsets
+        already scored for the same model and feature definition are read
+        from the cache.
+
         Args:
-            transformed_data_path (str): Path to the transformed data file.
-            trained_model_path (str): Path to the saved, trained model file (.pkl).
+            trained_model_path (str): Path to the saved model artifact directory.
+
+        Returns:
+            dict: Subset name -> {n_units, rmse, mae, nasa_score}.
         """
         try:
             logger.info("--- Model Evaluation Component Started ---")
-            
-            df = pd.read_csv(transformed_data_path)
-            y = df['RUL']
-            X = df.drop(columns=['RUL', 'unit_number', 'time_in_cycles'])
-            _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-            model = load_object(file_path=trained_model_path)
-            logger.info("Trained model loaded successfully.")
-
-            mlflow.set_registry_uri("https://dagshub.com/DHRUVBSTHAKUR/EngineSentinel.mlflow")
-            tracking_url_type_store = urlparse(mlflow.get_tracking_uri()).scheme
-
-            with mlflow.start_run():
-                logger.info("Making predictions on the test set.")
-                predicted_rul = model.predict(X_test)
-                
-                r2 = r2_score(y_test, predicted_rul)
-                logger.info(f"Final R² score on test data: {r2:.2f}")
-
-                mlflow.log_metric("r2_score", r2)
-
-                # --- FIX IS HERE: Add signature and input example ---
-                input_example = X_test.head(1)
-                signature = infer_signature(input_example, predicted_rul[:1])
-                # --- END OF FIX ---
-
-                if tracking_url_type_store != "file":
-                    mlflow.sklearn.log_model(
-                        sk_model=model, 
-                        artifact_path="model", 
-                        signature=signature, # <-- NEW
-                        input_example=input_example, # <-- NEW
-                        registered_model_name="LGBMRegressor"
-                    )
+            config = self.model_evaluation_config
+
+            sources = self.subset_files()
+            if not sources:
+                raise FileNotFoundError(f"No test/RUL file pairs for {config.subsets} in {config.data_dir}")
+
+            model_hash = model_sha256(trained_model_path)
+            spec_path = config.feature_spec_path
+            spec_hash = content_sha256(spec_path) if os.path.exists(spec_path) else "none"
+            regime_path = config.regime_index_path
+            regime_hash = file_sha256(regime_path) if os.path.exists(regime_path) else "none"
+
+            results, missing = {}, []
+            for subset, test_path, rul_path in sources:
+                cache_path = self._cache_path(model_hash, spec_hash, regime_hash, subset, test_path, rul_path)
+                if os.path.exists(cache_path):
+                    with open(cache_path) as file_obj:
+                        results[subset] = json.load(file_obj)
+                else:
+                    missing.append((subset, test_path, rul_path, cache_path))
+            logger.info(f"Evaluation cache: {len(results)} hit(s), {len(missing)} subset(s) to score")
+
+            if missing:
+                args = [
+                    [trained_model_path] * len(missing), [spec_path] * len(missing),
+                    [test_path for _, test_path, _, _ in missing], [rul_path for _, _, rul_path, _ in missing],
+                    [config.parse_cache_dir] * len(missing), [regime_path] * len(missing),
+                ]
+                if len(missing) == 1:
+                    scores = [score_test_subset(*[column[0] for column in args])]
                 else:
-                    mlflow.sklearn.log_model(
-                        sk_model=model, 
-                        artifact_path="model",
-                        signature=signature, # <-- NEW
-                        input_example=input_example # <-- NEW
-                    )
+                    max_workers = min(len(missing), config.max_workers or os.cpu_count() or 1)
+                    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                        scores = list(executor.map(score_test_subset, *args))
+
+                os.makedirs(config.cache_dir, exist_ok=True)
+                for (subset, _, _, cache_path), score in zip(missing, scores):
+                    results[subset] = score
+                    tmp_path = f"{cache_path}.tmp-{os.getpid()}"
+                    with open(tmp_path, "w") as file_obj:
+                        json.dump(score, file_obj, indent=2)
+                    os.replace(tmp_path, cache_path)
+
+            for subset, score in sorted(results.items()):
+                logger.info(
+                    f"{subset}: RMSE {score['rmse']:.2f}, NASA score {score['nasa_score']:.1f} "
+                    f"over {score['n_units']} engines"
+                )
+
+            # Recorded by the tracker's background writer; nothing here waits on MLflow
+            # or the network. The model is logged as a reference to the artifact directory
+            # (native booster + metadata) instead of being serialised again.
+            metadata = load_model_metadata(trained_model_path)
+            with get_tracker().start_run(run_name="model_evaluation") as run:
+                run.log_params(metadata["params"])
+                run.set_tags({
+                    "booster_sha256": metadata["booster_sha256"],
+                    "training_data_sha256": metadata["training_data_sha256"],
+                    "lightgbm_version": metadata["lightgbm_version"],
+                })
+                run.log_metrics({
+                    f"{subset}_{name}": value
+                    for subset, score in results.items() for name, value in score.items() if name != "n_units"
+                })
+                run.log_artifact(trained_model_path, artifact_path="model")
 
             logger.info("--- Model Evaluation Component Completed ---")
+            return results
 
         except Exception as e:
             raise CustomException(e, sys)
-
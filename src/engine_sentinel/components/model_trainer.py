@@ -1,23 +1,42 @@
 import os
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import pandas as pd
+from joblib import parallel_config
 from lightgbm import LGBMRegressor
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV, ParameterGrid
 from sklearn.metrics import r2_score
 
+from src.engine_sentinel.compiled_model import CompiledEnsemble, check_parity
 from src.engine_sentinel.exception import CustomException
 from src.engine_sentinel.logger import logger
-from src.engine_sentinel.utils import save_object, LGBM_PARAM_GRID # <-- UPDATED IMPORT
+from src.engine_sentinel.metrics import instrument_stage
+from src.engine_sentinel.model_artifact import save_model_artifact
+from src.engine_sentinel.scheduler import CpuBudgetConfig, CpuScheduler
+from src.engine_sentinel.schema import FeatureSchema
+from src.engine_sentinel.search import HalvingSearchConfig, SuccessiveHalvingSearch
+from src.engine_sentinel.utils import load_frame, content_sha256, file_sha256, LGBM_PARAM_GRID, ID_COLUMNS, TARGET_COLUMN
 
 @dataclass
 class ModelTrainerConfig:
     """
     Configuration for the model training component.
-    Specifies the save path for the trained model artifact.
+    Specifies the save paths for the trained model (a native LightGBM model
+    artifact directory) and its compiled (flat-array) export, and the search
+    strategy: 'halving' (successive halving with early stopping) or 'grid'
+    (exhaustive GridSearchCV), and how the search shares the CPUs between
+    parallel fits and LightGBM threads (`cpu_budget`).
+    The feature schema written by DataTransformation (`feature_schema_path`)
+    is stored in the model metadata, when present.
     """
-    trained_model_file_path: str = os.path.join("artifacts", "model.pkl")
+    trained_model_file_path: str = os.path.join("artifacts", "model")
+    feature_schema_path: str = os.path.join("artifacts", "feature_schema.json")
+    compiled_model_file_path: str = os.path.join("artifacts", "compiled_model.npz")
+    search_strategy: str = "halving"
+    halving_search: HalvingSearchConfig = field(default_factory=HalvingSearchConfig)
+    cpu_budget: CpuBudgetConfig = field(default_factory=CpuBudgetConfig)
+    cv: int = 3
 
 class ModelTrainer:
     """
@@ -26,6 +45,7 @@ class ModelTrainer:
     def __init__(self):
         self.model_trainer_config = ModelTrainerConfig()
 
+    @instrument_stage("model_trainer")
     def initiate_model_trainer(self, transformed_data_path: str):
         """
         Orchestrates the model training and tuning process.
@@ -35,12 +55,12 @@ class ModelTrainer:
         """
         try:
             logger.info("--- Model Trainer Component Started ---")
-            df = pd.read_csv(transformed_data_path)
+            df = load_frame(transformed_data_path)
             logger.info(f"Loaded transformed data from {transformed_data_path}")
 
             logger.info("Separating features (X) and target (y)")
-            y = df['RUL']
-            X = df.drop(columns=['RUL', 'unit_number', 'time_in_cycles'])
+            y = df[TARGET_COLUMN]
+            X = df.drop(columns=[TARGET_COLUMN] + [column for column in ID_COLUMNS if column in df.columns])
 
             logger.info("Splitting data into training and testing sets")
             X_train, X_test, y_train, y_test = train_test_split(
@@ -48,31 +68,51 @@ class ModelTrainer:
             )
 
             # --- HYPERPARAMETER TUNING SETUP ---
-            lgbm = LGBMRegressor(random_state=42, n_jobs=-1)
-
             # The parameter grid is now imported from utils.py
             param_grid = LGBM_PARAM_GRID
 
-            # Create the GridSearchCV object
-            # cv=3 means 3-fold cross-validation
-            grid_search = GridSearchCV(
-                estimator=lgbm,
-                param_grid=param_grid,
-                cv=3,
-                scoring='r2',
-                verbose=1,
-                n_jobs=-1
-            )
-            
-            logger.info("Starting Hyperparameter Tuning (Grid Search)...")
-            # This will train the model multiple times to find the best settings
-            grid_search.fit(X_train, y_train)
+            config = self.model_trainer_config
+            scheduler = CpuScheduler(config.cpu_budget)
+            logger.info(f"Starting Hyperparameter Tuning ({config.search_strategy} search)...")
+
+            if config.search_strategy == "halving":
+                # Candidates get more boosting rounds only while they stay among the best
+                search = SuccessiveHalvingSearch(param_grid, config.halving_search, scheduler=scheduler)
+                search.fit(X_train, y_train)
+                best_lgbm = search.best_estimator_
+                candidate_times = [(result["params"], result["fit_seconds"]) for result in search.cv_results_]
+            else:
+                n_candidates = len(ParameterGrid(param_grid))
+                outer, inner = scheduler.plan(n_candidates * config.cv)
+                logger.info(f"Grid search: {outer} parallel fit(s) x {inner} LightGBM thread(s)")
+                lgbm = LGBMRegressor(random_state=42, n_jobs=inner)
+
+                # Create the GridSearchCV object
+                # cv=3 means 3-fold cross-validation
+                search = GridSearchCV(
+                    estimator=lgbm,
+                    param_grid=param_grid,
+                    cv=config.cv,
+                    scoring='r2',
+                    verbose=1,
+                    n_jobs=outer,
+                    refit=False
+                )
+                # Threads rather than processes: LightGBM releases the GIL and
+                # every fit is capped at `inner` threads
+                with scheduler.measure("Grid search"), parallel_config(backend="threading"), scheduler.limit(inner):
+                    search.fit(X_train, y_train)
+                # The winner is refit with the whole core budget
+                best_lgbm = LGBMRegressor(random_state=42, n_jobs=scheduler.cores, **search.best_params_)
+                best_lgbm.fit(X_train, y_train)
+                results = search.cv_results_
+                candidate_times = list(zip(results["params"], results["mean_fit_time"] * config.cv))
+
             logger.info("Hyperparameter Tuning complete.")
+            for params, seconds in candidate_times:
+                logger.info(f"Candidate {params}: {seconds:.2f}s fit time")
 
-            # Get the best model found by the grid search
-            best_lgbm = grid_search.best_estimator_
-            
-            logger.info(f"Best parameters found: {grid_search.best_params_}")
+            logger.info(f"Best parameters found: {search.best_params_}")
             
             # --- END OF HYPERPARAMETER TUNING ---
 
@@ -82,12 +122,26 @@ class ModelTrainer:
             logger.info(f"Tuned model evaluated. R² Score on test set: {score:.2f}")
 
             logger.info(f"Saving the best trained model to: {self.model_trainer_config.trained_model_file_path}")
-            save_object(
-                file_path=self.model_trainer_config.trained_model_file_path,
-                obj=best_lgbm  # Save the best model
+            schema_path = self.model_trainer_config.feature_schema_path
+            feature_schema = FeatureSchema.load(schema_path).to_dict() if os.path.exists(schema_path) else None
+            booster_path = save_model_artifact(
+                self.model_trainer_config.trained_model_file_path,
+                best_lgbm,  # Save the best model
+                feature_dtypes=X_train.dtypes.astype(str).to_dict(),
+                training_data_sha256=content_sha256(transformed_data_path),
+                feature_schema=feature_schema,
             )
             
-            logger.info("Trained model object saved successfully")
+            logger.info("Trained model artifact saved successfully")
+
+            # Flat-array export for low-latency scoring, checked against model.predict
+            compiled = CompiledEnsemble.from_booster(best_lgbm, source_sha256=file_sha256(booster_path))
+            max_error = check_parity(compiled, best_lgbm, X_test)
+            compiled.save(self.model_trainer_config.compiled_model_file_path)
+            logger.info(
+                f"Compiled model ({compiled.n_trees} trees) saved to "
+                f"{self.model_trainer_config.compiled_model_file_path}; max deviation from model.predict {max_error:.2e}"
+            )
             
             return self.model_trainer_config.trained_model_file_path
 
@@ -0,0 +1,364 @@
+import json
+import os
+import sys
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+# The drift reference is fitted on the raw training readings during
+# transformation and saved as one .npz file:
+#   columns     - monitored raw columns, in FEATURE_COLUMNS order
+#   edges       - (n_columns, n_bins - 1) interior quantile edges of each column
+#   fractions   - (n_columns, n_bins) share of the training rows in each bin
+#   low, high   - training min and max of each column
+#   mean, std   - training mean and standard deviation of each column
+# Live readings are counted in the same bins, so the monitor's memory is fixed
+# by the number of columns and bins, whatever the traffic.
+DRIFT_REFERENCE_FORMAT_VERSION = 1
+# Rows binned per chunk, so the (rows, columns, edges) comparison stays small
+CHUNK_ROWS = 1 << 14
+
+
+@dataclass
+class DriftReferenceConfig:
+    """
+    How the training reference is built: every column is cut into `n_bins`
+    equal-frequency bins. Quantiles are taken on at most `sample_rows` rows
+    (a fixed-seed sample); the range and moments use every row.
+    """
+    n_bins: int = 10
+    sample_rows: int = 1_000_000
+    seed: int = 0
+
+
+@dataclass
+class DriftMonitorConfig:
+    """
+    Serving-side drift rules.
+    A reading is out of range when it lies more than `range_margin` times the
+    training range (at least `min_margin` relative to its magnitude) outside
+    the training min/max. PSI compares the last one to two windows of
+    `window_rows` rows with the reference; it is reported once `min_rows`
+    rows were seen, and a column counts as drifted above `psi_alert`
+    (`psi_warning` for a warning).
+    Batches smaller than `buffer_rows` are staged and summarized
+    `buffer_rows` at a time, so a single-row request only pays for its
+    range check and a copy.
+    """
+    range_margin: float = 0.05
+    min_margin: float = 1e-4
+    buffer_rows: int = 256
+    window_rows: int = 10000
+    min_rows: int = 500
+    psi_warning: float = 0.1
+    psi_alert: float = 0.25
+    quantiles: tuple = (0.05, 0.5, 0.95)
+
+
+def _bin_counts(values, edges):
+    """
+    Bin of each finite value against each column's interior edges, counted
+    per column. NaN (e.g. a column the feature schema pruned) is skipped.
+
+    Returns:
+        np.ndarray: (n_columns, n_bins) int64 counts.
+    """
+    n_columns, n_bins = edges.shape[0], edges.shape[1] + 1
+    counts = np.zeros(n_columns * n_bins, dtype=np.int64)
+    offset = np.arange(n_columns) * n_bins
+    for start in range(0, len(values), CHUNK_ROWS):
+        chunk = values[start:start + CHUNK_ROWS]
+        bins = (chunk[:, :, None] > edges[None]).sum(axis=2) + offset
+        counts += np.bincount(bins[np.isfinite(chunk)], minlength=len(counts))
+    return counts.reshape(n_columns, n_bins)
+
+
+def population_stability_index(expected, actual, floor=1e-4):
+    """
+    PSI of each row of `actual` bin fractions against `expected`:
+    sum((a - e) * ln(a / e)), with empty bins floored at `floor`.
+    """
+    expected = np.maximum(expected, floor)
+    actual = np.maximum(actual, floor)
+    return ((actual - expected) * np.log(actual / expected)).sum(axis=-1)
+
+
+class DriftReference:
+    """
+    Training-time distribution of each raw column: equal-frequency bin edges
+    and fractions, range and moments.
+    """
+    def __init__(self, columns, edges, fractions, low, high, mean, std, n_rows):
+        self.columns = list(columns)
+        self.edges = np.asarray(edges, dtype=np.float32)
+        self.fractions = np.asarray(fractions, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float32)
+        self.high = np.asarray(high, dtype=np.float32)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = np.asarray(std, dtype=np.float64)
+        self.n_rows = int(n_rows)
+        self.column_index = np.array([FEATURE_COLUMNS.index(name) for name in self.columns], dtype=np.intp)
+
+    @property
+    def n_bins(self):
+        return self.fractions.shape[1]
+
+    @classmethod
+    def fit(cls, raw, columns=None, config: DriftReferenceConfig = None):
+        """
+        Builds the reference from the raw training readings.
+
+        Args:
+            raw (np.ndarray): (n_rows, 24) readings in FEATURE_COLUMNS order.
+            columns (list): Columns to monitor; defaults to every column
+                without missing values.
+            config (DriftReferenceConfig): Binning rules.
+
+        Returns:
+            DriftReference: The fitted reference.
+        """
+        try:
+            config = config or DriftReferenceConfig()
+            raw = np.asarray(raw, dtype=np.float32)
+            if columns is None:
+                columns = [name for j, name in enumerate(FEATURE_COLUMNS) if np.isfinite(raw[:, j]).all()]
+            columns = [name for name in FEATURE_COLUMNS if name in set(columns)]
+            if not len(raw) or not columns:
+                raise ValueError("A drift reference needs at least one row and one column")
+            values = raw[:, [FEATURE_COLUMNS.index(name) for name in columns]]
+
+            sample = values
+            if len(values) > config.sample_rows:
+                rng = np.random.default_rng(config.seed)
+                sample = values[np.sort(rng.choice(len(values), config.sample_rows, replace=False))]
+            levels = np.arange(1, config.n_bins) / config.n_bins
+            edges = np.quantile(sample, levels, axis=0).T.astype(np.float32)
+            counts = _bin_counts(sample, edges)
+            fractions = counts / counts.sum(axis=1, keepdims=True)
+
+            as_float = values.astype(np.float64)
+            return cls(columns, edges, fractions, values.min(axis=0), values.max(axis=0),
+                       as_float.mean(axis=0), as_float.std(axis=0), len(values))
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # --- Persistence ---
+
+    def save(self, file_path):
+        """
+        Saves the reference to one .npz file.
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            meta = {"format_version": DRIFT_REFERENCE_FORMAT_VERSION, "columns": self.columns, "n_rows": self.n_rows}
+            tmp_path = f"{file_path}.tmp-{os.getpid()}.npz"
+            np.savez(tmp_path, meta=np.array(json.dumps(meta)), edges=self.edges, fractions=self.fractions,
+                     low=self.low, high=self.high, mean=self.mean, std=self.std)
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def load(cls, file_path):
+        try:
+            with np.load(file_path) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("format_version") != DRIFT_REFERENCE_FORMAT_VERSION:
+                    raise ValueError(f"Unsupported drift reference format: {meta.get('format_version')}")
+                return cls(meta["columns"], data["edges"], data["fractions"], data["low"], data["high"],
+                           data["mean"], data["std"], meta["n_rows"])
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+class DriftMonitor:
+    """
+    Constant-memory summary of the live readings, compared with a DriftReference.
+
+    Each observed row is counted in the reference's bins (a fixed-edge
+    quantile sketch) and added to running sums centred on the training mean,
+    min/max and out-of-range counters; nothing is kept per row beyond a
+    fixed staging buffer for small batches. Bin counts go
+    to a current window that becomes the previous one after `window_rows`
+    rows, so PSI follows recent traffic. State is per process: under gunicorn
+    each worker reports the traffic it served.
+    """
+    def __init__(self, reference: DriftReference, config: DriftMonitorConfig = None):
+        self.reference = reference
+        self.config = config or DriftMonitorConfig()
+        n_columns = len(reference.columns)
+        span = (reference.high - reference.low).astype(np.float64)
+        magnitude = np.maximum(np.abs(reference.low), np.abs(reference.high)).astype(np.float64)
+        margin = np.maximum(self.config.range_margin * span, self.config.min_margin * np.maximum(magnitude, 1.0))
+        self.lower = (reference.low - margin).astype(np.float32)
+        self.upper = (reference.high + margin).astype(np.float32)
+        self._centre = reference.mean.astype(np.float32)
+        self._lock = threading.Lock()
+        self.rows = 0
+        self._buffer = np.empty((self.config.buffer_rows, n_columns), dtype=np.float32)
+        self._buffered = 0
+        self._window = [np.zeros((n_columns, reference.n_bins), dtype=np.int64) for _ in range(2)]
+        self._window_rows = 0
+        self._count = np.zeros(n_columns, dtype=np.int64)
+        self._sum = np.zeros(n_columns)
+        self._sum_sq = np.zeros(n_columns)
+        self._min = np.full(n_columns, np.inf)
+        self._max = np.full(n_columns, -np.inf)
+        self._below = np.zeros(n_columns, dtype=np.int64)
+        self._above = np.zeros(n_columns, dtype=np.int64)
+
+    @property
+    def columns(self):
+        return self.reference.columns
+
+    def observe(self, raw):
+        """
+        Adds a batch of readings to the summary.
+
+        Args:
+            raw (np.ndarray): (n_rows, 24) raw readings in FEATURE_COLUMNS order.
+
+        Returns:
+            np.ndarray: (n_rows, n_columns) bool mask of the out-of-range
+                readings, in `columns` order.
+        """
+        values = np.asarray(raw, dtype=np.float32)[:, self.reference.column_index]
+        mask = (values < self.lower) | (values > self.upper)
+        n_rows = len(values)
+        with self._lock:
+            if n_rows >= len(self._buffer):
+                self._fold(values)
+                return mask
+            if self._buffered + n_rows > len(self._buffer):
+                self._flush()
+            self._buffer[self._buffered:self._buffered + n_rows] = values
+            self._buffered += n_rows
+            if self._buffered == len(self._buffer):
+                self._flush()
+        return mask
+
+    def _flush(self):
+        # Caller holds the lock
+        if self._buffered:
+            self._fold(self._buffer[:self._buffered])
+            self._buffered = 0
+
+    def _fold(self, values):
+        """
+        Adds rows to the bin counts, moments, extremes and out-of-range
+        counters. Caller holds the lock.
+        """
+        finite = np.isfinite(values)
+        centred = np.where(finite, values - self._centre, 0.0).astype(np.float64)
+        self.rows += len(values)
+        self._window[0] += _bin_counts(values, self.reference.edges)
+        self._window_rows += len(values)
+        if self._window_rows >= self.config.window_rows:
+            self._window = [np.zeros_like(self._window[0]), self._window[0]]
+            self._window_rows = 0
+        self._count += finite.sum(axis=0)
+        self._sum += centred.sum(axis=0)
+        self._sum_sq += (centred * centred).sum(axis=0)
+        np.fmin(self._min, np.fmin.reduce(values, axis=0), out=self._min)
+        np.fmax(self._max, np.fmax.reduce(values, axis=0), out=self._max)
+        self._below += (values < self.lower).sum(axis=0)
+        self._above += (values > self.upper).sum(axis=0)
+
+    def flagged(self, mask):
+        """
+        Maps an `observe` mask to {row: [out-of-range columns]} for the rows
+        with at least one; in-range rows are left out.
+        """
+        if not mask.any():
+            return {}
+        return {int(row): [self.columns[j] for j in np.flatnonzero(mask[row])]
+                for row in np.flatnonzero(mask.any(axis=1))}
+
+    def psi(self):
+        """
+        PSI of each column over the current and previous windows, or None
+        before `min_rows` rows were seen.
+        """
+        with self._lock:
+            self._flush()
+            counts = self._window[0] + self._window[1]
+        totals = counts.sum(axis=1, keepdims=True)
+        if totals.max(initial=0) < self.config.min_rows:
+            return None
+        fractions = counts / np.maximum(totals, 1)
+        psi = population_stability_index(self.reference.fractions, fractions)
+        return np.where(totals[:, 0] >= self.config.min_rows, psi, np.nan)
+
+    def quantiles(self, counts, low, high):
+        """
+        Estimates the configured quantiles of each column from its bin counts,
+        interpolating linearly inside the bins. The outer bins are bounded by
+        the smaller/larger of the training and live min/max.
+        """
+        edges = np.column_stack([low, self.reference.edges, high]).astype(np.float64)
+        cumulative = np.cumsum(counts, axis=1) / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+        cumulative = np.column_stack([np.zeros(len(counts)), cumulative])
+        estimates = np.empty((len(counts), len(self.config.quantiles)))
+        for j in range(len(counts)):
+            estimates[j] = np.interp(self.config.quantiles, cumulative[j], edges[j])
+        return estimates
+
+    def report(self):
+        """
+        Per-column summary: PSI and its status, live vs training moments and
+        quantiles, and out-of-range counts.
+        """
+        reference = self.reference
+        psi = self.psi()
+        with self._lock:
+            self._flush()
+            counts = self._window[0] + self._window[1]
+            count = self._count.copy()
+            mean_offset = self._sum / np.maximum(count, 1)
+            variance = np.maximum(self._sum_sq / np.maximum(count, 1) - mean_offset ** 2, 0.0)
+            live_min, live_max = self._min.copy(), self._max.copy()
+            below, above = self._below.copy(), self._above.copy()
+            rows = self.rows
+        live_mean = reference.mean + mean_offset
+        seen = count > 0
+        bounds_low = np.where(seen, np.fmin(live_min, reference.low), reference.low)
+        bounds_high = np.where(seen, np.fmax(live_max, reference.high), reference.high)
+        live_quantiles = self.quantiles(counts, bounds_low, bounds_high)
+
+        def status(value):
+            if value is None or np.isnan(value):
+                return "insufficient_data"
+            if value >= self.config.psi_alert:
+                return "drift"
+            return "warning" if value >= self.config.psi_warning else "stable"
+
+        columns = {}
+        for j, name in enumerate(reference.columns):
+            value = None if psi is None or np.isnan(psi[j]) else round(float(psi[j]), 6)
+            columns[name] = {
+                "psi": value,
+                "status": status(value),
+                "rows": int(count[j]),
+                "mean": float(live_mean[j]) if seen[j] else None,
+                "std": float(np.sqrt(variance[j])) if seen[j] else None,
+                "min": float(live_min[j]) if seen[j] else None,
+                "max": float(live_max[j]) if seen[j] else None,
+                "quantiles": dict(zip(map(str, self.config.quantiles), live_quantiles[j].tolist())) if seen[j] else None,
+                "reference": {"mean": float(reference.mean[j]), "std": float(reference.std[j]),
+                              "min": float(reference.low[j]), "max": float(reference.high[j])},
+                "out_of_range": {"below": int(below[j]), "above": int(above[j])},
+            }
+        scores = [column["psi"] for column in columns.values() if column["psi"] is not None]
+        return {
+            "enabled": True,
+            "rows": rows,
+            "window_rows": self.config.window_rows,
+            "max_psi": max(scores) if scores else None,
+            "drifted": [name for name, column in columns.items() if column["status"] == "drift"],
+            "columns": columns,
+        }
@@ -0,0 +1,278 @@
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+# scipy is imported where the rolling filters run, so importing this module
+# stays cheap. Serving processes load it anyway with lightgbm (see utils.py).
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.utils import SENSOR_COLUMNS
+
+ROLLING_STATISTICS = ("mean", "std", "min", "max", "slope")
+
+
+@dataclass
+class RollingFeatureConfig:
+    """
+    Definition of the per-unit temporal features.
+    The same definition is saved next to the model and reused at serving time,
+    so training and inference always compute identical columns.
+
+    Definitions (over the trailing window of each unit's history, shortened at
+    the start of a unit):
+        mean / min / max  -- plain window statistics
+        std               -- population standard deviation (0 for one cycle)
+        slope             -- least-squares slope against time_in_cycles (0 for one cycle)
+        ewma_{span}       -- exponentially weighted mean, alpha = 2 / (span + 1),
+                             started at the unit's first cycle (pandas adjust=False)
+    """
+    sensors: tuple = tuple(SENSOR_COLUMNS)
+    windows: tuple = (5, 20)
+    statistics: tuple = ROLLING_STATISTICS
+    ewma_spans: tuple = (10,)
+    n_jobs: int = None
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(**{key: tuple(value) if isinstance(value, list) else value for key, value in values.items()})
+
+
+def segment_bounds(*keys):
+    """
+    Given key arrays sorted so that each unit's rows are contiguous, returns
+    (segment_start, segment_end): for every row, the index of the first and
+    last row of its unit.
+    """
+    n_rows = len(keys[0])
+    boundary = np.ones(n_rows, dtype=bool)
+    if n_rows > 1:
+        boundary[1:] = False
+        for key in keys:
+            key = np.asarray(key)
+            boundary[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:] - 1, n_rows - 1)
+    segment_id = np.cumsum(boundary) - 1
+    return starts[segment_id], ends[segment_id]
+
+
+class RollingFeatureEngine:
+    """
+    Vectorized rolling-window feature engine.
+
+    Works on one sorted (unit, time) array for the whole fleet: window sums come
+    from prefix sums, min/max from O(n) running filters, and EWMA from a single
+    linear filter pass, each corrected at unit boundaries. There is no per-unit
+    Python loop; sensors are split across threads, which numpy/scipy run
+    without holding the GIL.
+    """
+    def __init__(self, config: RollingFeatureConfig = None):
+        self.config = config or RollingFeatureConfig()
+
+    # --- Persistence ---
+
+    def save(self, file_path):
+        try:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            with open(file_path, "w") as file_obj:
+                json.dump(asdict(self.config), file_obj, indent=2)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def load(cls, file_path):
+        try:
+            with open(file_path) as file_obj:
+                return cls(RollingFeatureConfig.from_dict(json.load(file_obj)))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # --- Feature layout ---
+
+    def sensor_feature_names(self, sensor):
+        names = [f"{sensor}_{stat}_{window}" for window in self.config.windows for stat in self.config.statistics]
+        names += [f"{sensor}_ewma_{span}" for span in self.config.ewma_spans]
+        return names
+
+    def feature_names(self):
+        """
+        Names of the generated columns, grouped by sensor.
+        """
+        return [name for sensor in self.config.sensors for name in self.sensor_feature_names(sensor)]
+
+    # --- Computation ---
+
+    def compute(self, values, segment_start, times):
+        """
+        Computes every feature for a sorted fleet array.
+
+        Args:
+            values (np.ndarray): (n_rows, n_sensors) readings, in `config.sensors` order.
+            segment_start (np.ndarray): index of the first row of each row's unit.
+            times (np.ndarray): time_in_cycles of each row.
+
+        Returns:
+            np.ndarray: float32 matrix of shape (n_rows, len(feature_names())).
+        """
+        try:
+            # Column-major input so every sensor is a contiguous vector
+            values = np.asfortranarray(values, dtype=np.float64)
+            segment_start = np.asarray(segment_start, dtype=np.int64)
+            n_rows, n_sensors = values.shape
+            per_sensor = len(self.sensor_feature_names("x"))
+            # Column-major output: every feature is written as one contiguous column
+            out = np.empty((n_rows, n_sensors * per_sensor), dtype=np.float32, order="F")
+            if n_rows == 0 or n_sensors == 0:
+                return out
+
+            # Time relative to the unit's first cycle keeps the slope sums small
+            times = np.asarray(times, dtype=np.float64)
+            local_t = times - times[segment_start]
+            t_prefix = _prefix_sum(local_t)
+            tt_prefix = _prefix_sum(local_t * local_t)
+            rows = np.arange(n_rows)
+
+            # Window bounds do not depend on the sensor, so they are shared by all of them
+            shared = {"segment_start": segment_start, "local_t": local_t, "windows": {}}
+            for window in self.config.windows:
+                low = np.maximum(rows - window + 1, segment_start)
+                s_t = t_prefix[1:] - t_prefix[low]
+                count = (rows - low + 1).astype(np.float64)
+                # Rows whose window is cut short by the start of their unit
+                head = np.flatnonzero(rows - segment_start < window - 1)
+                first_valid = (window - 1) - (head - segment_start[head])
+                shared["windows"][window] = {
+                    "low": low,
+                    "count": count,
+                    "head": head,
+                    "head_mask": np.arange(window)[None, :] < first_valid[:, None],
+                    "s_t": s_t,
+                    "slope_denom": count * (tt_prefix[1:] - tt_prefix[low]) - s_t * s_t,
+                }
+            shared["is_start"] = segment_start == rows
+
+            n_jobs = self.config.n_jobs or os.cpu_count() or 1
+            sensor_groups = [group for group in np.array_split(np.arange(n_sensors), n_jobs) if len(group)]
+
+            def run(group):
+                for j in group:
+                    self._sensor_features(values[:, j], shared, out[:, j * per_sensor:(j + 1) * per_sensor])
+
+            if len(sensor_groups) == 1:
+                run(sensor_groups[0])
+            else:
+                with ThreadPoolExecutor(max_workers=len(sensor_groups)) as executor:
+                    list(executor.map(run, sensor_groups))
+            return out
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _sensor_features(self, x, shared, out):
+        segment_start = shared["segment_start"]
+        n_rows = len(x)
+
+        # Centre before summing so prefix sums do not lose precision on large readings
+        centre = x.mean()
+        xc = x - centre
+        x_prefix = _prefix_sum(xc)
+        xx_prefix = _prefix_sum(xc * xc)
+        tx_prefix = _prefix_sum(shared["local_t"] * xc)
+
+        k = 0
+        for window in self.config.windows:
+            bounds = shared["windows"][window]
+            low, count = bounds["low"], bounds["count"]
+            s_x = x_prefix[1:] - x_prefix[low]
+            mean_c = s_x / count
+
+            var = (xx_prefix[1:] - xx_prefix[low]) / count - mean_c * mean_c
+            # A unit's first cycle is flat by definition; its prefix-sum variance is only
+            # rounding noise, which can exceed the tolerance for values near zero (z-scores)
+            flat = is_flat_window(var, mean_c + centre) | (count == 1)
+
+            for stat in self.config.statistics:
+                if stat == "mean":
+                    out[:, k] = mean_c + centre
+                elif stat == "std":
+                    out[:, k] = np.where(flat, 0.0, np.sqrt(np.maximum(var, 0.0)))
+                elif stat == "slope":
+                    s_tx = tx_prefix[1:] - tx_prefix[low]
+                    numer = count * s_tx - bounds["s_t"] * s_x
+                    denom = bounds["slope_denom"]
+                    slope = np.divide(numer, denom, out=np.zeros(n_rows), where=denom > 1e-12)
+                    out[:, k] = np.where(flat, 0.0, slope)
+                elif stat in ("min", "max"):
+                    out[:, k] = _rolling_extreme(x, window, bounds["head"], bounds["head_mask"], stat)
+                else:
+                    raise ValueError(f"Unknown rolling statistic: {stat}")
+                k += 1
+
+        for span in self.config.ewma_spans:
+            out[:, k] = _segmented_ewma(x, 2.0 / (span + 1.0), shared["is_start"], segment_start)
+            k += 1
+
+    def transform_sorted(self, values, units, times):
+        """
+        Convenience wrapper: derives unit boundaries from `units` (already sorted
+        by unit then time) and computes the features.
+        """
+        segment_start, _ = segment_bounds(units)
+        return self.compute(values, segment_start, times)
+
+
+def is_flat_window(var, mean):
+    """
+    True where a window is constant up to float32 resolution. Such windows get an
+    exact 0 std and slope, so rounding noise (which differs between the batch and
+    streaming paths) never reaches the model.
+    """
+    tolerance = 1e-6 * (np.abs(mean) + 1e-3)
+    return var <= tolerance * tolerance
+
+
+def _prefix_sum(values):
+    prefix = np.empty(len(values) + 1, dtype=np.float64)
+    prefix[0] = 0.0
+    np.cumsum(values, out=prefix[1:])
+    return prefix
+
+
+def _rolling_extreme(x, window, head, head_mask, stat):
+    """
+    Trailing-window min/max per unit. A running O(n) filter handles the whole
+    array; the `head` rows, closer than `window` to their unit start, are then
+    recomputed from a masked window so values never leak across units.
+    """
+    if window == 1:
+        return x.copy()
+    from scipy.ndimage import maximum_filter1d, minimum_filter1d
+    running = minimum_filter1d if stat == "min" else maximum_filter1d
+    reduce = np.min if stat == "min" else np.max
+    fill = np.inf if stat == "min" else -np.inf
+
+    result = running(x, size=window, origin=(window - 1) // 2, mode="nearest")
+    if len(head):
+        padded = np.concatenate([np.full(window - 1, fill), x])
+        windows = sliding_window_view(padded, window)[head]
+        result[head] = reduce(np.where(head_mask, fill, windows), axis=1)
+    return result
+
+
+def _segmented_ewma(x, alpha, is_start, segment_start):
+    """
+    EWMA restarted at every unit. One lfilter pass runs over the whole array;
+    the carry-over from the previous unit decays geometrically and is
+    subtracted in closed form.
+    """
+    from scipy.signal import lfilter
+    decay = 1.0 - alpha
+    y = lfilter([alpha], [1.0, -decay], x)
+    offset = np.zeros_like(x)
+    offset[is_start] = y[is_start] - x[is_start]
+    distance = np.arange(len(x)) - segment_start
+    return y - offset[segment_start] * np.power(decay, distance)
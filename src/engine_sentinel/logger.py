@@ -1,25 +1,194 @@
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 
-# Define the log file name with a timestamp
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+LOG_FORMAT = "[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s"
 
-# Create the logs directory path
-logs_dir = os.path.join(os.getcwd(), "logs")
-os.makedirs(logs_dir, exist_ok=True)
+# Create a logger instance that other modules can import.
+# Importing this module has no side effects: nothing is written until an entry
+# point (training pipeline, web app) calls configure_logging().
+logger = logging.getLogger("EngineSentinelLogger")
 
-# Define the full log file path
-LOG_FILE_PATH = os.path.join(logs_dir, LOG_FILE)
+# Per-request messages (one per prediction) go through this child logger,
+# which is rate limited so busy workers do not flood the log
+request_logger = logger.getChild("requests")
 
-# Configure the logging system
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
+# Path of the log file once logging is configured
+LOG_FILE_PATH = None
+
+_queue_handler = None
+_listener = None
+_listener_started = False
+
+
+@dataclass
+class LoggingConfig:
+    """
+    Configuration for the application's logging.
+    The calling (request) thread renders each message and hands the record to
+    a background thread through a queue, which formats and writes it, so the
+    calling thread never touches the disk.
+    `json_lines` writes one JSON object per record instead of the text format.
+    Messages on `request_logger` are limited to `request_rate` per second
+    with bursts of up to `request_burst`; the number of dropped messages is
+    reported on the next one that gets through.
+    """
+    logs_dir: str = None
+    level: int = logging.INFO
+    json_lines: bool = field(default_factory=lambda: os.environ.get("ENGINE_SENTINEL_LOG_JSON", "") == "1")
+    request_rate: float = 10.0
+    request_burst: int = 20
+
+
+class _DeferredFileHandler(logging.FileHandler):
+    """
+    File handler that creates the logs directory and the file on the first
+    record instead of at construction, so idle processes leave no empty logs.
+    """
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class _MessageQueueHandler(QueueHandler):
+    """
+    Queue handler that renders the message and any traceback in the calling
+    thread, so arguments are logged as they were when the call was made, and
+    leaves the line layout (timestamp, text or JSON) to the listener. The
+    stock handler does the same but merges the traceback into the message.
+    """
+    _exception_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self._exception_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket: lets through `rate` records per second on average and
+    `burst` at once. Dropped records are counted, and the count is attached
+    to the next record that passes as `record.suppressed`.
+    """
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1.0:
+                self._suppressed += 1
+                return False
+            self._tokens -= 1.0
+            record.suppressed, self._suppressed = self._suppressed, 0
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats each record as one JSON object per line.
+    """
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        if getattr(record, "suppressed", 0):
+            text += f" [{record.suppressed} similar messages suppressed]"
+        return text
+
+
+def configure_logging(config: LoggingConfig = None):
+    """
+    Sends log records to a timestamped file under `config.logs_dir` (default:
+    ./logs). Records are queued by the calling thread and written by a
+    background listener thread. Safe to call more than once; only the first
+    call configures logging.
+
+    Returns:
+        str: The log file path.
+    """
+    global LOG_FILE_PATH, _queue_handler
+    if LOG_FILE_PATH is not None:
+        return LOG_FILE_PATH
+
+    config = config or LoggingConfig()
+    logs_dir = config.logs_dir or os.path.join(os.getcwd(), "logs")
+    log_file = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+    LOG_FILE_PATH = os.path.join(logs_dir, log_file)
+
+    file_handler = _DeferredFileHandler(LOG_FILE_PATH, delay=True)
+    file_handler.setFormatter(JsonLinesFormatter() if config.json_lines else _TextFormatter(LOG_FORMAT))
+
+    _queue_handler = _MessageQueueHandler(queue.SimpleQueue())
+    logging.basicConfig(level=config.level, handlers=[_queue_handler])
+    request_logger.addFilter(RateLimitFilter(config.request_rate, config.request_burst))
+
+    _start_listener([file_handler])
+    atexit.register(_stop_listener)
+    return LOG_FILE_PATH
+
+
+def _start_listener(handlers):
+    global _listener, _listener_started
+    _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _listener_started = True
+
+
+def _stop_listener():
+    # Drains the queue, so records logged just before exit are still written
+    global _listener_started
+    if _listener is not None and _listener_started:
+        _listener_started = False
+        _listener.stop()
+
+
+def _after_fork():
+    # The listener thread does not survive fork: a forked worker (e.g. under a
+    # preloading gunicorn master) gets its own queue and a new listener. The
+    # inherited listener is dropped; its thread only exists in the parent.
+    if _listener is not None:
+        _queue_handler.queue = queue.SimpleQueue()
+        _start_listener(_listener.handlers)
 
-# --- THE FIX IS HERE ---
-# Create a logger instance that other modules can import
-logger = logging.getLogger("EngineSentinelLogger")
 
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,392 @@
+import functools
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from src.engine_sentinel.logger import logger
+
+# Request latencies (seconds): 100us .. 10s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+# Pipeline stage durations (seconds): 10ms .. 1h
+STAGE_BUCKETS = (0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, *label_values):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0.0) + amount
+
+    def render(self):
+        lines = self._header()
+        for values, total in sorted(self._series.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, values)} {_number(total)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._series[label_values] = value
+
+    def render(self):
+        lines = self._header()
+        for values, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, values)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram. `observe` is a bisect and three increments, cheap
+    enough for every request.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            snapshot = sorted((values, ([*counts], total, n)) for values, (counts, total, n) in self._series.items())
+        for values, (counts, total, n) in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, values)} {n}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics rendered in the Prometheus text format.
+    Collectors are callables run at scrape time that return extra exposition
+    lines (e.g. model registry counters that live elsewhere).
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labels, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=()):
+        return self._get_or_create(Gauge, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labels, buckets=buckets)
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in [_process_metrics] + self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector {collector} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, file_path):
+        """
+        Writes the metrics to a file, e.g. for a node exporter textfile
+        collector after a batch (training) run.
+        """
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        tmp_path = f"{file_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as file_obj:
+            file_obj.write(self.render())
+        os.replace(tmp_path, file_path)
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics():
+    """
+    Returns the process-wide metrics registry.
+    """
+    return _registry
+
+
+# --- Pipeline stages ---
+
+_stage_peaks = []
+
+
+def _cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _peak_rss_bytes():
+    """
+    Peak resident set size since the last reset (VmHWM), or since the process
+    started where it cannot be reset.
+    """
+    try:
+        with open("/proc/self/status") as file_obj:
+            for line in file_obj:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as file_obj:
+            file_obj.write("5")
+    except OSError:
+        pass
+
+
+@contextmanager
+def measure_stage(stage: str):
+    """
+    Measures a pipeline stage: wall time, CPU time of the process and its
+    reaped children, peak RSS and, when tracemalloc is tracing (e.g. with
+    PYTHONTRACEMALLOC=1), the peak of Python allocations. Yields a dict that
+    is filled in on exit; the values are also recorded as metrics and logged.
+    Stages may nest: an outer stage's peaks include its inner stages.
+    """
+    report = {"stage": stage}
+    tracing = tracemalloc.is_tracing()
+    _stage_peaks.append([0, 0])
+    _reset_peak_rss()
+    if tracing:
+        tracemalloc.reset_peak()
+    cpu_before = _cpu_seconds()
+    started = time.perf_counter()
+    try:
+        yield report
+    finally:
+        wall = time.perf_counter() - started
+        cpu = _cpu_seconds() - cpu_before
+        inner_rss, inner_traced = _stage_peaks.pop()
+        peak_rss = max(_peak_rss_bytes(), inner_rss)
+        peak_traced = max(tracemalloc.get_traced_memory()[1], inner_traced) if tracing else None
+        if _stage_peaks:
+            _stage_peaks[-1][0] = max(_stage_peaks[-1][0], peak_rss)
+            _stage_peaks[-1][1] = max(_stage_peaks[-1][1], peak_traced or 0)
+        report.update(wall_seconds=wall, cpu_seconds=cpu, peak_rss_bytes=peak_rss, peak_traced_bytes=peak_traced)
+        record_stage(report)
+
+        message = f"Stage '{stage}': {wall:.2f}s wall, {cpu:.2f}s CPU, peak RSS {peak_rss / 2 ** 20:.0f} MiB"
+        if tracing:
+            message += f", peak traced {peak_traced / 2 ** 20:.0f} MiB"
+        logger.info(message)
+
+
+def record_stage(report):
+    """
+    Records a stage report (as yielded by `measure_stage`, or any dict with
+    'stage', 'wall_seconds' and 'cpu_seconds') as metrics.
+    """
+    metrics = get_metrics()
+    stage = report["stage"]
+    metrics.histogram("engine_sentinel_stage_seconds", "Wall time of pipeline stages.",
+                      ("stage",), STAGE_BUCKETS).observe(report["wall_seconds"], stage)
+    metrics.counter("engine_sentinel_stage_cpu_seconds_total", "CPU time spent in pipeline stages.",
+                    ("stage",)).inc(report["cpu_seconds"], stage)
+    if report.get("peak_rss_bytes") is not None:
+        metrics.gauge("engine_sentinel_stage_peak_rss_bytes", "Peak resident memory during the last run of a stage.",
+                      ("stage",)).set(report["peak_rss_bytes"], stage)
+    if report.get("peak_traced_bytes") is not None:
+        metrics.gauge("engine_sentinel_stage_peak_traced_bytes",
+                      "Peak Python allocations (tracemalloc) during the last run of a stage.",
+                      ("stage",)).set(report["peak_traced_bytes"], stage)
+
+
+def instrument_stage(stage: str):
+    """
+    Decorator form of `measure_stage`, e.g. for the components' initiate_* methods.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure_stage(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed(name: str, documentation: str, buckets=LATENCY_BUCKETS):
+    """
+    Decorator that records a function's latency in histogram `name`.
+    Only wall time is taken, so it is cheap enough for the serving path.
+    """
+    def decorator(function):
+        histogram = get_metrics().histogram(name, documentation, buckets=buckets)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+# --- Serving ---
+
+def observe_request(endpoint: str, status: int, seconds: float):
+    """
+    Records one served request.
+    """
+    metrics = get_metrics()
+    metrics.histogram("engine_sentinel_request_seconds", "Request latency by endpoint.",
+                      ("endpoint",)).observe(seconds, endpoint)
+    metrics.counter("engine_sentinel_requests_total", "Requests by endpoint and status code.",
+                    ("endpoint", "status")).inc(1, endpoint, str(status))
+
+
+def model_registry_collector(registry):
+    """
+    Returns a collector exposing the model registry's load/reload counters.
+    """
+    def collect():
+        stats = registry.stats()
+        series = {
+            "loads": ("counter", "engine_sentinel_model_loads_total", "Model loads from disk."),
+            "reloads": ("counter", "engine_sentinel_model_reloads_total", "Model hot swaps."),
+            "failed_reloads": ("counter", "engine_sentinel_model_failed_reloads_total", "Failed model reloads."),
+            "version": ("gauge", "engine_sentinel_model_version", "Version of the model in service."),
+            "last_load_seconds": ("gauge", "engine_sentinel_model_last_load_seconds", "Duration of the last load."),
+        }
+        lines = []
+        for key, (kind, name, documentation) in series.items():
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            for path, counters in stats["models"].items():
+                lines.append(f"{name}{_label_text(('path',), (os.path.basename(path),))} {_number(counters.get(key, 0))}")
+        return lines
+    return collect
+
+
+def drift_monitor_collector(get_monitor):
+    """
+    Returns a collector exposing the input drift monitor's PSI and
+    out-of-range counts per raw column. `get_monitor` returns the current
+    monitor, or None when there is no drift reference.
+    """
+    def collect():
+        monitor = get_monitor()
+        if monitor is None:
+            return []
+        report = monitor.report()
+        lines = [
+            "# HELP engine_sentinel_input_rows_total Raw input rows seen by the drift monitor.",
+            "# TYPE engine_sentinel_input_rows_total counter",
+            f"engine_sentinel_input_rows_total {report['rows']}",
+            "# HELP engine_sentinel_input_psi Population stability index of each raw input column.",
+            "# TYPE engine_sentinel_input_psi gauge",
+        ]
+        for column, summary in report["columns"].items():
+            if summary["psi"] is not None:
+                lines.append(f"engine_sentinel_input_psi{_label_text(('column',), (column,))} {_number(summary['psi'])}")
+        lines += [
+            "# HELP engine_sentinel_input_out_of_range_total Raw input values outside the training range.",
+            "# TYPE engine_sentinel_input_out_of_range_total counter",
+        ]
+        for column, summary in report["columns"].items():
+            for side, count in summary["out_of_range"].items():
+                labels = _label_text(("column", "side"), (column, side))
+                lines.append(f"engine_sentinel_input_out_of_range_total{labels} {count}")
+        return lines
+    return collect
+
+
+def _process_metrics():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    rss = None
+    try:
+        with open("/proc/self/statm") as file_obj:
+            rss = int(file_obj.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    lines = [
+        "# HELP process_cpu_seconds_total Total user and system CPU time spent in seconds.",
+        "# TYPE process_cpu_seconds_total counter",
+        f"process_cpu_seconds_total {usage.ru_utime + usage.ru_stime!r}",
+    ]
+    if rss is not None:
+        lines += [
+            "# HELP process_resident_memory_bytes Resident memory size in bytes.",
+            "# TYPE process_resident_memory_bytes gauge",
+            f"process_resident_memory_bytes {rss}",
+        ]
+    return lines
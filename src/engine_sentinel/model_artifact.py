@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.utils import file_sha256, load_object
+
+# A model artifact is a directory holding LightGBM's own text model format plus
+# a small JSON header, instead of a dill pickle of the sklearn wrapper:
+#   booster.txt    - Booster.model_to_string(), readable by any LightGBM version
+#   metadata.json  - feature order and dtypes, training data hash, parameters
+#                    and the feature schema (kept and pruned raw columns)
+# The header can be read without loading (or importing) LightGBM.
+BOOSTER_FILE = "booster.txt"
+METADATA_FILE = "metadata.json"
+MODEL_ARTIFACT_FORMAT_VERSION = 1
+
+
+def save_model_artifact(dir_path, model, feature_dtypes=None, training_data_sha256=None, feature_schema=None):
+    """
+    Saves a fitted LGBMRegressor or lightgbm.Booster as a model artifact
+    directory. The directory is written next to its final location and swapped
+    in with a rename, so readers never see a partial artifact.
+
+    Args:
+        dir_path (str): Artifact directory, e.g. artifacts/model.
+        model: The fitted model.
+        feature_dtypes (dict): Optional feature name -> dtype of the training matrix.
+        training_data_sha256 (str): Optional content hash of the training data.
+        feature_schema (dict): Optional FeatureSchema.to_dict() of the training data.
+
+    Returns:
+        str: Path of the booster file inside the artifact.
+    """
+    try:
+        import lightgbm
+
+        booster = getattr(model, "booster_", model)
+        parent_dir = os.path.dirname(dir_path) or "."
+        os.makedirs(parent_dir, exist_ok=True)
+        tmp_path = f"{dir_path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        booster_path = os.path.join(tmp_path, BOOSTER_FILE)
+        with open(booster_path, "wb") as file_obj:
+            file_obj.write(_booster_bytes(booster))
+
+        feature_names = list(booster.feature_name())
+        feature_dtypes = feature_dtypes or {}
+        metadata = {
+            "format_version": MODEL_ARTIFACT_FORMAT_VERSION,
+            "lightgbm_version": lightgbm.__version__,
+            "booster_sha256": file_sha256(booster_path),
+            "feature_names": feature_names,
+            "feature_dtypes": [str(feature_dtypes.get(name, "float32")) for name in feature_names],
+            "num_trees": booster.num_trees(),
+            "best_iteration": booster.best_iteration,
+            "params": model.get_params() if hasattr(model, "get_params") else booster.params,
+            "training_data_sha256": training_data_sha256,
+            "feature_schema": feature_schema,
+        }
+        with open(os.path.join(tmp_path, METADATA_FILE), "w") as file_obj:
+            json.dump(metadata, file_obj, indent=2, default=str)
+
+        old_path = f"{dir_path}.old-{os.getpid()}"
+        if os.path.exists(dir_path):
+            os.replace(dir_path, old_path)
+        os.replace(tmp_path, dir_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return os.path.join(dir_path, BOOSTER_FILE)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def _booster_bytes(booster):
+    return booster.model_to_string().encode("utf-8")
+
+
+def booster_sha256(model):
+    """
+    SHA-256 of the booster file `save_model_artifact` writes for a model, known
+    before the artifact is saved (e.g. for a compiled export written first).
+    """
+    return hashlib.sha256(_booster_bytes(getattr(model, "booster_", model))).hexdigest()
+
+
+def _artifact_paths(path):
+    """
+    Accepts the artifact directory or the booster file inside it.
+    """
+    if os.path.isdir(path):
+        return os.path.join(path, BOOSTER_FILE), os.path.join(path, METADATA_FILE)
+    return path, os.path.join(os.path.dirname(path), METADATA_FILE)
+
+
+def load_model_metadata(path):
+    """
+    Reads the JSON header of a model artifact without loading the model.
+    """
+    try:
+        _, metadata_path = _artifact_paths(path)
+        with open(metadata_path) as file_obj:
+            metadata = json.load(file_obj)
+        if metadata.get("format_version") != MODEL_ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported model artifact format: {metadata.get('format_version')}")
+        return metadata
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_model_artifact(path):
+    """
+    Loads the lightgbm.Booster of a model artifact (directory or booster file)
+    and checks it against the feature order recorded in the header.
+    Every call builds a new Booster in the calling process; the gunicorn
+    master loads it once (preload_app) and its forked workers share it.
+    """
+    try:
+        import lightgbm
+
+        booster_path, _ = _artifact_paths(path)
+        metadata = load_model_metadata(path)
+        with open(booster_path) as file_obj:
+            booster = lightgbm.Booster(model_str=file_obj.read())
+        if booster.feature_name() != metadata["feature_names"]:
+            raise ValueError(f"Model in {booster_path} does not match the feature order in its metadata.")
+        return booster
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_model(path):
+    """
+    Loads a model from a native artifact, or from a legacy dill pickle (.pkl).
+    """
+    if path.endswith(".pkl"):
+        return load_object(path)
+    return load_model_artifact(path)
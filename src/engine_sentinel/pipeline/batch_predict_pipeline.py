@@ -0,0 +1,219 @@
+import json
+import sys
+
+import numpy as np
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.logger import request_logger
+from src.engine_sentinel.pipeline.predict_pipeline import FEATURE_INDEX, PredictionPipeline, SnapshotScoringError
+from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+# Optional column that is echoed back next to each prediction
+ID_COLUMN = 'unit_number'
+# Optional cycle of each row, which orders a unit's history
+TIME_COLUMN = 'time_in_cycles'
+
+
+class BatchSchemaError(ValueError):
+    """
+    Raised when a batch payload does not match the expected feature schema.
+    """
+
+
+class BatchPredictionPipeline:
+    """
+    Scores whole fleets in one call.
+
+    Payloads (columnar JSON, CSV or NDJSON) are validated once against the raw
+    columns the served model needs (the feature schema's kept columns; pruned
+    ones may be left out), converted into a single contiguous float32 matrix
+    and scored with one vectorized `predict` call. Optional 'unit_number' and
+    'time_in_cycles' columns give each row its engine history, for models with
+    rolling features. Results are yielded back in fixed-size chunks so large
+    responses can be streamed.
+    """
+    def __init__(self, prediction_pipeline: PredictionPipeline = None, chunk_size: int = 4096):
+        self.prediction_pipeline = prediction_pipeline or PredictionPipeline()
+        self.chunk_size = chunk_size
+
+    # --- Parsers: each returns (matrix, ids, times) ---
+
+    def parse_columnar_json(self, payload):
+        """
+        Parses a columnar JSON body: {"op_setting_1": [...], ..., "sensor_21": [...]}.
+        Optional "unit_number" and "time_in_cycles" lists are returned as row
+        ids and cycles.
+        """
+        if not isinstance(payload, dict):
+            raise BatchSchemaError("Columnar JSON body must be an object mapping column names to lists.")
+        columns = self._validate_columns(payload.keys())
+        for column in columns:
+            if not isinstance(payload[column], list):
+                raise BatchSchemaError(f"Column '{column}' must be a list of values.")
+
+        n_rows = len(payload[columns[0]])
+        matrix = np.full((n_rows, len(FEATURE_COLUMNS)), np.nan, dtype=np.float32)
+        for column in columns:
+            values = payload[column]
+            if len(values) != n_rows:
+                raise BatchSchemaError(f"Column '{column}' has {len(values)} values, expected {n_rows}.")
+            try:
+                matrix[:, FEATURE_INDEX[column]] = values
+            except (TypeError, ValueError):
+                raise BatchSchemaError(f"Column '{column}' contains non-numeric values.")
+
+        ids, times = payload.get(ID_COLUMN), payload.get(TIME_COLUMN)
+        for column, values in ((ID_COLUMN, ids), (TIME_COLUMN, times)):
+            if values is not None and not isinstance(values, list):
+                raise BatchSchemaError(f"Column '{column}' must be a list of values.")
+            if values is not None and len(values) != n_rows:
+                raise BatchSchemaError(f"Column '{column}' has {len(values)} values, expected {n_rows}.")
+        return matrix, ids, self._parse_times(times)
+
+    def parse_csv(self, stream):
+        """
+        Parses a CSV upload (text or binary stream) whose header names at least
+        the needed feature columns. Only the needed columns are parsed, straight to float32.
+        """
+        import pandas as pd
+        wanted = set(FEATURE_COLUMNS) | {ID_COLUMN, TIME_COLUMN}
+        try:
+            df = pd.read_csv(
+                stream, usecols=lambda column: column in wanted,
+                dtype={column: np.float32 for column in FEATURE_COLUMNS},
+            )
+        except ValueError as e:
+            raise BatchSchemaError(f"CSV could not be parsed as numeric features: {e}")
+        columns = self._validate_columns(df.columns)
+
+        matrix = np.full((len(df), len(FEATURE_COLUMNS)), np.nan, dtype=np.float32)
+        for column in columns:
+            matrix[:, FEATURE_INDEX[column]] = df[column].to_numpy(dtype=np.float32)
+        ids = df[ID_COLUMN].tolist() if ID_COLUMN in df.columns else None
+        times = self._parse_times(df[TIME_COLUMN].tolist()) if TIME_COLUMN in df.columns else None
+        return matrix, ids, times
+
+    def parse_ndjson(self, lines):
+        """
+        Parses newline-delimited JSON records, one engine row per line.
+        `lines` may be any iterable (e.g. a request stream), so rows are consumed
+        as they arrive into a growing float32 buffer.
+        """
+        capacity = 1024
+        matrix = np.full((capacity, len(FEATURE_COLUMNS)), np.nan, dtype=np.float32)
+        ids, times = [], []
+        columns = index = None
+        has_ids = has_times = False
+        n_rows = 0
+
+        for line_number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise BatchSchemaError(f"Line {line_number} is not valid JSON: {e}")
+            if not isinstance(record, dict):
+                raise BatchSchemaError(f"Line {line_number} must be a JSON object mapping column names to values.")
+            if columns is None:
+                # The first record fixes the schema for the whole stream
+                columns = self._validate_columns(record.keys())
+                index = [FEATURE_INDEX[column] for column in columns]
+                has_ids, has_times = ID_COLUMN in record, TIME_COLUMN in record
+
+            if n_rows == capacity:
+                grown = np.full((2 * capacity, len(FEATURE_COLUMNS)), np.nan, dtype=np.float32)
+                grown[:capacity] = matrix
+                matrix, capacity = grown, 2 * capacity
+            try:
+                matrix[n_rows, index] = [record[column] for column in columns]
+            except (KeyError, TypeError, ValueError):
+                raise BatchSchemaError(f"Line {line_number} is missing a feature or has a non-numeric value.")
+            if has_ids:
+                ids.append(record.get(ID_COLUMN))
+            if has_times:
+                times.append(record.get(TIME_COLUMN))
+            n_rows += 1
+
+        return (np.ascontiguousarray(matrix[:n_rows]), (ids if has_ids else None),
+                (self._parse_times(times) if has_times else None))
+
+    # --- Scoring ---
+
+    def predict(self, matrix, ids=None, times=None):
+        """
+        Scores the full matrix in a single vectorized call.
+
+        Args:
+            matrix (np.ndarray): (n_rows, 24) raw readings from one of the parsers.
+            ids (list): Optional unit id of each row; rows of one unit are
+                scored as that engine's history.
+            times (np.ndarray): Optional cycle of each row (row order otherwise).
+
+        Returns:
+            np.ndarray: The predicted RUL values, one per row.
+        """
+        try:
+            if len(matrix) == 0:
+                return np.empty(0, dtype=np.float64)
+            # Rows without an id cannot be placed in a history
+            units = None if ids is None or any(unit is None for unit in ids) else np.asarray(ids)
+            preds = self.prediction_pipeline.predict_matrix(matrix, units, times if units is not None else None)
+            request_logger.info("Batch prediction successful for %d rows.", len(matrix))
+            return preds
+
+        except SnapshotScoringError:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def iter_ndjson(self, preds, ids=None):
+        """
+        Yields predictions as NDJSON text, `chunk_size` rows per chunk.
+        """
+        for start in range(0, len(preds), self.chunk_size):
+            stop = min(start + self.chunk_size, len(preds))
+            if ids is None:
+                lines = [f'{{"row": {i}, "RUL": {preds[i]:.4f}}}' for i in range(start, stop)]
+            else:
+                lines = [
+                    f'{{"row": {i}, "{ID_COLUMN}": {json.dumps(ids[i])}, "RUL": {preds[i]:.4f}}}'
+                    for i in range(start, stop)
+                ]
+            yield "\n".join(lines) + "\n"
+
+    def iter_csv(self, preds, ids=None):
+        """
+        Yields predictions as CSV text (with a header), `chunk_size` rows per chunk.
+        """
+        yield "row,RUL\n" if ids is None else f"row,{ID_COLUMN},RUL\n"
+        for start in range(0, len(preds), self.chunk_size):
+            stop = min(start + self.chunk_size, len(preds))
+            if ids is None:
+                lines = [f"{i},{preds[i]:.4f}" for i in range(start, stop)]
+            else:
+                lines = [f"{i},{ids[i]},{preds[i]:.4f}" for i in range(start, stop)]
+            yield "\n".join(lines) + "\n"
+
+    def _validate_columns(self, columns):
+        """
+        Checks that the columns the model needs are present and returns the
+        feature columns to read (the needed ones plus any pruned ones sent anyway).
+        """
+        present = set(columns)
+        missing = [column for column in self.prediction_pipeline.input_columns() if column not in present]
+        if missing:
+            raise BatchSchemaError(f"Missing required feature columns: {missing}")
+        return [column for column in FEATURE_COLUMNS if column in present]
+
+    @staticmethod
+    def _parse_times(values):
+        if values is None:
+            return None
+        try:
+            return np.asarray(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise BatchSchemaError(f"Column '{TIME_COLUMN}' contains non-numeric values.")
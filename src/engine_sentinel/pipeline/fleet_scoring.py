@@ -0,0 +1,370 @@
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.engine_sentinel.components.data_ingestion import iter_cmapss_chunks
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.features import RollingFeatureConfig
+from src.engine_sentinel.logger import logger
+from src.engine_sentinel.metrics import measure_stage
+from src.engine_sentinel.model_artifact import BOOSTER_FILE
+from src.engine_sentinel.pipeline.model_registry import PROJECT_ROOT
+from src.engine_sentinel.pipeline.predict_pipeline import PredictionPipeline, model_feature_names
+from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+# Results are written as CSV, one row per unit and input file:
+#   source          - input file name
+#   unit_number     - unit id as it appears in the file
+#   time_in_cycles  - latest cycle seen for the unit
+#   RUL             - predicted remaining useful life at that cycle
+RESULT_HEADER = "source,unit_number,time_in_cycles,RUL\n"
+
+
+@dataclass
+class FleetScoringConfig:
+    """
+    Configuration for scoring telemetry files in the test_FD00x.txt layout.
+    Files are read `chunk_bytes` at a time. Units are scored in batches of
+    `batch_units` across `max_workers` processes (in-process with one), with
+    at most `max_pending` batches per worker in flight.
+    """
+    chunk_bytes: int = 8 << 20
+    batch_units: int = 1024
+    max_workers: int = None
+    max_pending: int = 2
+
+
+class UnitTailStore:
+    """
+    The state needed to score each unit at its latest cycle, and nothing more:
+    the last `depth` readings of the rolling sensors with their cycle times,
+    the latest raw row and the EWMA values at that row.
+
+    A whole chunk is folded in at once: its rows are grouped by unit, each
+    unit's tail is the last `depth` rows of (old tail + new rows), and its
+    EWMA continues from the stored value, all with array operations. Memory
+    is fixed per unit, so it does not grow with the number of cycles read.
+    Cycles of a unit must arrive in time order across chunks.
+    """
+    def __init__(self, config: RollingFeatureConfig = None, capacity: int = 1024):
+        self.config = config
+        self.sensor_index = np.array(
+            [FEATURE_COLUMNS.index(sensor) for sensor in config.sensors] if config else [], dtype=np.intp
+        )
+        self.depth = max(config.windows) if config and config.windows else 1
+        self.alphas = np.array([2.0 / (span + 1.0) for span in config.ewma_spans] if config else [])
+        self.units = []
+        self._slots = {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        n_sensors, n_spans = len(self.sensor_index), len(self.alphas)
+        old = len(self.length) if hasattr(self, "length") else 0
+        arrays = {
+            "last_raw": np.zeros((capacity, len(FEATURE_COLUMNS)), dtype=np.float32),
+            "last_time": np.zeros(capacity),
+            "tail": np.zeros((capacity, self.depth, n_sensors), dtype=np.float32),
+            "tail_time": np.zeros((capacity, self.depth)),
+            "length": np.zeros(capacity, dtype=np.int64),
+            "ewma": np.zeros((capacity, n_spans, n_sensors)),
+        }
+        for name, array in arrays.items():
+            if old:
+                array[:old] = getattr(self, name)
+            setattr(self, name, array)
+
+    def __len__(self):
+        return len(self.units)
+
+    def _slots_for(self, units):
+        slots = np.empty(len(units), dtype=np.intp)
+        for i, unit in enumerate(units.tolist()):
+            slot = self._slots.get(unit)
+            if slot is None:
+                slot = self._slots[unit] = len(self.units)
+                self.units.append(unit)
+            slots[i] = slot
+        if len(self.units) > len(self.length):
+            self._allocate(max(len(self.units), 2 * len(self.length)))
+        return slots
+
+    def update(self, units, times, raw):
+        """
+        Folds one chunk of readings into the store.
+
+        Args:
+            units (np.ndarray): Unit id of each row.
+            times (np.ndarray): time_in_cycles of each row.
+            raw (np.ndarray): (n_rows, 24) readings in FEATURE_COLUMNS order.
+
+        Returns:
+            int: Rows that were older than their unit's latest stored cycle.
+        """
+        order = np.lexsort((times, units))
+        units, times, raw = units[order], np.asarray(times, dtype=np.float64)[order], raw[order]
+        starts = np.flatnonzero(np.r_[True, units[1:] != units[:-1]])
+        counts = np.diff(np.r_[starts, len(units)])
+        ends = starts + counts - 1
+        slots = self._slots_for(units[starts])
+        old_length = self.length[slots]
+        late = int(np.sum((old_length > 0) & (times[starts] <= self.last_time[slots])))
+
+        if len(self.sensor_index):
+            values = raw[:, self.sensor_index]
+            self._update_ewma(slots, values.astype(np.float64), starts, counts, old_length)
+            self._update_tail(slots, values, times, starts, counts, old_length)
+        self.length[slots] = np.minimum(old_length + counts, self.depth)
+        self.last_raw[slots] = raw[ends]
+        self.last_time[slots] = times[ends]
+        return late
+
+    def _update_tail(self, slots, values, times, starts, counts, old_length):
+        # Keep the last `depth` rows of (old tail + new rows), stored right-aligned.
+        # `back` counts rows from the newest: the first `count` come from the chunk.
+        keep = np.minimum(old_length + counts, self.depth)
+        group = np.repeat(np.arange(len(slots)), keep)
+        back = np.arange(len(group)) - np.repeat(np.cumsum(keep) - keep, keep)
+        from_chunk = back < counts[group]
+        chunk_row = starts[group] + counts[group] - 1 - back
+        tail_pos = self.depth - 1 - (back - counts[group])
+
+        old_values = self.tail[slots[group], np.clip(tail_pos, 0, self.depth - 1)]
+        old_times = self.tail_time[slots[group], np.clip(tail_pos, 0, self.depth - 1)]
+        row = np.clip(chunk_row, 0, len(values) - 1)
+        new_values = np.where(from_chunk[:, None], values[row], old_values)
+        new_times = np.where(from_chunk, times[row], old_times)
+        self.tail[slots[group], self.depth - 1 - back] = new_values
+        self.tail_time[slots[group], self.depth - 1 - back] = new_times
+
+    def _update_ewma(self, slots, values, starts, counts, old_length):
+        from scipy.signal import lfilter
+        continuing = old_length > 0
+        ends = starts + counts - 1
+        for j, alpha in enumerate(self.alphas):
+            decay = 1.0 - alpha
+            # One filter pass over the chunk; each unit's true EWMA differs from it by
+            # (initial value - carry-in from the previous unit) * decay^k, removed in closed form
+            filtered = lfilter([alpha], [1.0, -decay], values, axis=0)
+            carry_in = np.zeros_like(values[starts])
+            carry_in[starts > 0] = filtered[starts[starts > 0] - 1]
+            # New units start at their first reading: an initial value x0 gives y0 = x0
+            initial = np.where(continuing[:, None], self.ewma[slots, j], values[starts])
+            self.ewma[slots, j] = filtered[ends] + (initial - carry_in) * np.power(decay, counts)[:, None]
+
+    def batch(self, start, stop):
+        """
+        Returns the arrays of slots [start, stop) for `score_unit_batch`.
+        """
+        return (self.last_raw[start:stop], self.tail[start:stop], self.tail_time[start:stop],
+                self.length[start:stop], self.ewma[start:stop])
+
+
+def tail_features(engine, tail, tail_time, length, ewma):
+    """
+    Rolling features of each unit at its latest cycle, from its stored tail.
+    Window statistics only reach back `max(windows)` cycles, so the tail
+    gives them exactly; the EWMA columns are replaced by the values carried
+    over the unit's whole history.
+    """
+    depth = tail.shape[1]
+    valid = np.arange(depth)[None, :] >= depth - length[:, None]
+    ends = np.cumsum(length) - 1
+    segment_start = np.repeat(ends - length + 1, length)
+    features = engine.compute(tail[valid], segment_start, tail_time[valid])[ends]
+
+    config = engine.config
+    per_sensor = len(engine.sensor_feature_names("x"))
+    first_ewma = len(config.windows) * len(config.statistics)
+    for i in range(len(config.sensors)):
+        for j in range(len(config.ewma_spans)):
+            features[:, i * per_sensor + first_ewma + j] = ewma[:, j, i]
+    return features
+
+
+# One pipeline per worker process, loaded by the pool initializer
+_worker_pipeline = None
+
+
+def _init_worker(pipeline_kwargs=None, pipeline=None):
+    global _worker_pipeline
+    _worker_pipeline = pipeline if pipeline is not None else PredictionPipeline(**pipeline_kwargs)
+    _worker_pipeline.warm_up()
+
+
+def score_unit_batch(last_raw, tail, tail_time, length, ewma):
+    """
+    Scores a batch of units at their latest cycle. Runs in a worker process.
+
+    Returns:
+        np.ndarray: Predicted RUL per unit.
+    """
+    pipeline = _worker_pipeline
+    model = pipeline.registry.get(pipeline.model_path)
+    if model_feature_names(model) == FEATURE_COLUMNS:
+        return pipeline.score(np.ascontiguousarray(last_raw), model)
+    engine = pipeline.feature_engine()
+    rolling = tail_features(engine, tail, tail_time, length, ewma)
+    return pipeline.score(pipeline.assemble_model_input(last_raw, rolling, model, engine), model)
+
+
+class FleetScoringPipeline:
+    """
+    Scores every unit of large telemetry files at its latest cycle, in memory
+    bounded by the chunk size and the number of units (not the number of
+    cycles). Readings are normalized per regime as they are read and folded
+    into a UnitTailStore; at the end of each file its units are scored in
+    vectorized batches across a process pool, and results are written as
+    each batch comes back.
+    """
+    def __init__(self, prediction_pipeline: PredictionPipeline = None, config: FleetScoringConfig = None):
+        self.prediction_pipeline = prediction_pipeline or PredictionPipeline()
+        self.config = config or FleetScoringConfig()
+
+    def _pipeline_kwargs(self):
+        pipeline = self.prediction_pipeline
+        return {
+            "model_path": pipeline.model_path, "feature_spec_path": pipeline.feature_spec_path,
+            "compiled_model_path": pipeline.compiled_model_path, "compiled_max_rows": pipeline.compiled_max_rows,
+            "feature_schema_path": pipeline.feature_schema_path, "regime_index_path": pipeline.regime_index_path,
+        }
+
+    def read_units(self, file_path):
+        """
+        Streams one file into a UnitTailStore.
+
+        Returns:
+            tuple: (store, rows read)
+        """
+        pipeline = self.prediction_pipeline
+        model = pipeline.registry.get(pipeline.model_path)
+        rolling = model_feature_names(model) != FEATURE_COLUMNS
+        store = UnitTailStore(pipeline.feature_engine().config if rolling else None)
+        n_rows, late = 0, 0
+        for table in iter_cmapss_chunks(file_path, self.config.chunk_bytes):
+            raw = pipeline.normalize_regimes(table[:, 2:].astype(np.float32))
+            late += store.update(table[:, 0].astype(np.int64), table[:, 1], raw)
+            n_rows += len(table)
+        if late:
+            logger.warning(f"{file_path}: {late} unit(s) had cycles out of time order across chunks")
+        return store, n_rows
+
+    def run(self, input_paths, output):
+        """
+        Scores every unit of each input file and writes the results.
+
+        Args:
+            input_paths (list): Files in the test_FD00x.txt layout.
+            output: Writable text stream for the result CSV.
+
+        Returns:
+            dict: rows, units, seconds, rows_per_second, units_per_second, peak_rss_bytes.
+        """
+        try:
+            config = self.config
+            max_workers = config.max_workers or os.cpu_count() or 1
+            n_rows = n_units = 0
+            output.write(RESULT_HEADER)
+
+            with measure_stage("fleet_scoring") as report:
+                if max_workers > 1:
+                    executor = ProcessPoolExecutor(max_workers, initializer=_init_worker,
+                                                   initargs=(self._pipeline_kwargs(),))
+                else:
+                    _init_worker(pipeline=self.prediction_pipeline)
+                    executor = None
+                try:
+                    for file_path in input_paths:
+                        store, rows = self.read_units(file_path)
+                        n_rows += rows
+                        n_units += len(store)
+                        self._score_store(store, os.path.basename(file_path), executor, max_workers, output)
+                        logger.info(f"Scored {len(store)} units from {rows} rows of {file_path}")
+                finally:
+                    if executor is not None:
+                        executor.shutdown()
+
+            seconds = report["wall_seconds"]
+            return {
+                "rows": n_rows,
+                "units": n_units,
+                "seconds": seconds,
+                "rows_per_second": n_rows / seconds if seconds else 0.0,
+                "units_per_second": n_units / seconds if seconds else 0.0,
+                "peak_rss_bytes": report["peak_rss_bytes"],
+            }
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _score_store(self, store, source, executor, max_workers, output):
+        pending = deque()
+
+        def write(start, stop, preds):
+            lines = [
+                f"{source},{unit},{time_in_cycles:g},{pred:.4f}"
+                for unit, time_in_cycles, pred in zip(store.units[start:stop], store.last_time[start:stop], preds)
+            ]
+            output.write("\n".join(lines) + "\n")
+
+        for start in range(0, len(store), self.config.batch_units):
+            stop = min(start + self.config.batch_units, len(store))
+            if executor is None:
+                write(start, stop, score_unit_batch(*store.batch(start, stop)))
+                continue
+            pending.append((start, stop, executor.submit(score_unit_batch, *store.batch(start, stop))))
+            # Bounded in-flight batches; results are written in unit order as they complete
+            while len(pending) >= max_workers * self.config.max_pending:
+                start_done, stop_done, future = pending.popleft()
+                write(start_done, stop_done, future.result())
+        while pending:
+            start_done, stop_done, future = pending.popleft()
+            write(start_done, stop_done, future.result())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score every unit of C-MAPSS-layout telemetry files at its latest cycle."
+    )
+    parser.add_argument("inputs", nargs="+", help="Files in the test_FD00x.txt layout.")
+    parser.add_argument("-o", "--output", default="-", help="Result CSV path ('-' for stdout).")
+    parser.add_argument("--artifacts-dir", default=os.path.join(PROJECT_ROOT, "artifacts"),
+                        help="Directory with the trained model and its feature artifacts.")
+    parser.add_argument("--chunk-mb", type=float, default=8, help="Bytes read per chunk, in MiB.")
+    parser.add_argument("--batch-units", type=int, default=1024, help="Units scored per batch.")
+    parser.add_argument("--workers", type=int, default=None, help="Scoring processes (default: CPU count).")
+    args = parser.parse_args(argv)
+
+    config = FleetScoringConfig(chunk_bytes=max(1, int(args.chunk_mb * 2 ** 20)), batch_units=args.batch_units,
+                                max_workers=args.workers)
+    artifacts = args.artifacts_dir
+    prediction_pipeline = PredictionPipeline(
+        model_path=os.path.join(artifacts, "model", BOOSTER_FILE),
+        feature_spec_path=os.path.join(artifacts, "feature_spec.json"),
+        compiled_model_path=os.path.join(artifacts, "compiled_model.npz"),
+        feature_schema_path=os.path.join(artifacts, "feature_schema.json"),
+        regime_index_path=os.path.join(artifacts, "regime_index.npz"),
+    )
+    pipeline = FleetScoringPipeline(prediction_pipeline, config)
+    pipeline.prediction_pipeline.warm_up()
+    if args.output == "-":
+        stats = pipeline.run(args.inputs, sys.stdout)
+    else:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as file_obj:
+            stats = pipeline.run(args.inputs, file_obj)
+
+    summary = (
+        f"Scored {stats['units']} units from {stats['rows']} rows in {stats['seconds']:.2f}s: "
+        f"{stats['rows_per_second']:,.0f} rows/s, {stats['units_per_second']:,.0f} units/s, "
+        f"peak RSS {stats['peak_rss_bytes'] / 2 ** 20:.0f} MiB"
+    )
+    print(summary, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.logger import logger
+from src.engine_sentinel.pipeline.model_registry import ModelRegistry, ModelRegistryConfig
+from src.engine_sentinel.pipeline.predict_pipeline import PredictionPipeline
+from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+# Shared buffers, created by the pool and attached by every worker:
+#   inputs  - (capacity_rows, 24) float32 raw readings in FEATURE_COLUMNS order
+#   keys    - (capacity_rows, 2) float64 unit id and time_in_cycles of each row
+#   outputs - (capacity_rows,) float64 predictions
+# Tasks and replies only carry row ranges (and the model version to score
+# with), so no feature data is pickled.
+
+
+@dataclass
+class InferencePoolConfig:
+    """
+    Configuration for the shared-memory inference pool.
+    `n_workers` processes (default: one per CPU) each score with
+    `threads_per_worker` LightGBM threads. Inputs are split into slices of at
+    most `slice_rows` rows (at least one per worker); inputs larger than
+    `capacity_rows` are scored `capacity_rows` at a time. Inputs smaller than
+    `min_parallel_rows` are scored in the calling process.
+    Workers are started with `start_method`; 'spawn' keeps LightGBM's OpenMP
+    runtime out of forked children.
+    """
+    n_workers: int = None
+    threads_per_worker: int = 1
+    capacity_rows: int = 1 << 20
+    slice_rows: int = 1 << 17
+    min_parallel_rows: int = 20000
+    start_method: str = "spawn"
+    start_timeout: float = 120.0
+    task_timeout: float = 600.0
+
+
+def _attach(name, shape, dtype):
+    """
+    Maps an existing shared memory block as an array. Workers share the pool
+    owner's resource tracker, so attaching does not take ownership of the block.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _worker_main(pipeline_kwargs, buffers, capacity_rows, threads, tasks, replies):
+    """
+    Worker loop: loads the model once, then scores row ranges of the shared
+    input buffer into the shared output buffer until it receives None. Each
+    task names the model version (sha256) the pool owner serves; a worker
+    holding another version reloads its artifacts first.
+    """
+    blocks = []
+    try:
+        in_block, inputs = _attach(buffers["inputs"], (capacity_rows, len(FEATURE_COLUMNS)), np.float32)
+        key_block, keys = _attach(buffers["keys"], (capacity_rows, 2), np.float64)
+        out_block, outputs = _attach(buffers["outputs"], (capacity_rows,), np.float64)
+        blocks = [in_block, key_block, out_block]
+
+        # Workers follow the version named in each task instead of watching the files
+        registry = ModelRegistry(ModelRegistryConfig(watch_interval=0))
+        pipeline = PredictionPipeline(registry=registry, **pipeline_kwargs)
+        pipeline.warm_up()
+        replies.put(("ready", os.getpid(), None))
+    except Exception as e:
+        replies.put(("failed", os.getpid(), repr(e)))
+        return
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            start, stop, with_keys, model_sha256 = task
+            try:
+                if registry.loaded_sha256(pipeline.model_path) != model_sha256:
+                    registry.reload()
+                units = keys[start:stop, 0] if with_keys else None
+                times = keys[start:stop, 1] if with_keys else None
+                model = pipeline.registry.get(pipeline.model_path)
+                model_input = pipeline.build_model_input(inputs[start:stop], units, times, model=model)
+                outputs[start:stop] = pipeline.score(model_input, model, num_threads=threads)
+                replies.put(("done", start, None))
+            except Exception as e:
+                replies.put(("error", start, repr(e)))
+    finally:
+        del inputs, keys, outputs
+        for block in blocks:
+            block.close()
+
+
+class InferencePool:
+    """
+    A persistent pool of scoring processes around PredictionPipeline.
+
+    Each worker loads the model and feature artifacts once at start-up and
+    maps the pool's shared memory buffers. `predict` writes the input into
+    the shared float32 buffer, hands out row ranges, and the workers write
+    their predictions straight into the shared output array, so the only
+    data crossing process boundaries are (start, stop) pairs.
+    With unit ids, rows are grouped by unit and slices are cut at unit
+    boundaries, so each worker sees whole histories for the rolling features.
+    Workers score with the model version the owner's registry serves (the one
+    small inputs are scored with in-process), reloading when it changes; see
+    `reload`.
+    """
+    def __init__(self, prediction_pipeline: PredictionPipeline = None, config: InferencePoolConfig = None):
+        self.prediction_pipeline = prediction_pipeline or PredictionPipeline()
+        self.config = config or InferencePoolConfig()
+        self.n_workers = self.config.n_workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._blocks = {}
+        self._workers = []
+        self._tasks = None
+        self._replies = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """
+        Creates the shared buffers and starts the workers; returns once every
+        worker has loaded the model.
+        """
+        try:
+            if self._workers:
+                return self
+            config = self.config
+            rows = config.capacity_rows
+            sizes = {"inputs": rows * len(FEATURE_COLUMNS) * 4, "keys": rows * 2 * 8, "outputs": rows * 8}
+            self._blocks = {name: shared_memory.SharedMemory(create=True, size=size) for name, size in sizes.items()}
+            self.inputs = np.ndarray((rows, len(FEATURE_COLUMNS)), dtype=np.float32, buffer=self._blocks["inputs"].buf)
+            self.keys = np.ndarray((rows, 2), dtype=np.float64, buffer=self._blocks["keys"].buf)
+            self.outputs = np.ndarray((rows,), dtype=np.float64, buffer=self._blocks["outputs"].buf)
+
+            context = multiprocessing.get_context(config.start_method)
+            self._tasks, self._replies = context.Queue(), context.Queue()
+            pipeline = self.prediction_pipeline
+            pipeline_kwargs = {
+                "model_path": pipeline.model_path, "feature_spec_path": pipeline.feature_spec_path,
+                "compiled_model_path": pipeline.compiled_model_path, "compiled_max_rows": pipeline.compiled_max_rows,
+                "feature_schema_path": pipeline.feature_schema_path, "regime_index_path": pipeline.regime_index_path,
+            }
+            buffers = {name: block.name for name, block in self._blocks.items()}
+            for _ in range(self.n_workers):
+                worker = context.Process(
+                    target=_worker_main, daemon=True,
+                    args=(pipeline_kwargs, buffers, rows, config.threads_per_worker, self._tasks, self._replies),
+                )
+                worker.start()
+                self._workers.append(worker)
+
+            for _ in range(self.n_workers):
+                status, pid, error = self._reply(config.start_timeout)
+                if status != "ready":
+                    raise RuntimeError(f"Inference worker {pid} failed to start: {error}")
+            logger.info(f"Inference pool ready: {self.n_workers} worker(s), {rows} rows of shared buffer")
+            return self
+
+        except Exception as e:
+            self.close()
+            raise CustomException(e, sys)
+
+    def close(self):
+        """
+        Stops the workers and releases the shared buffers.
+        """
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+        self.inputs = self.keys = self.outputs = None
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self._blocks = {}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def reload(self):
+        """
+        Checks the model and its companion artifacts for changes and reloads
+        them in the pool owner's registry. Workers pick up the new version with
+        their next task. The owner's registry watcher (when enabled) does the
+        same on its own.
+
+        Returns:
+            bool: True if an artifact was swapped.
+        """
+        return self.prediction_pipeline.registry.reload()
+
+    def _reply(self, timeout):
+        # Wait in short steps so a crashed worker is noticed instead of waiting out the timeout
+        waited = 0.0
+        while True:
+            try:
+                return self._replies.get(timeout=1.0)
+            except queue.Empty:
+                waited += 1.0
+                dead = [worker.pid for worker in self._workers if not worker.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Inference worker(s) {dead} exited")
+                if waited >= timeout:
+                    raise TimeoutError(f"No reply from the inference workers in {timeout:.0f}s")
+
+    # --- Scoring ---
+
+    def predict(self, matrix, units=None, times=None):
+        """
+        Scores a (n_rows, 24) raw matrix across the workers.
+
+        Args:
+            matrix (np.ndarray): Raw readings in FEATURE_COLUMNS order.
+            units, times (np.ndarray): Optional unit ids and cycles of each row,
+                as for PredictionPipeline.predict_matrix.
+
+        Returns:
+            np.ndarray: The predicted RUL values, one per row.
+        """
+        try:
+            matrix = np.asarray(matrix, dtype=np.float32)
+            n_rows = len(matrix)
+            if n_rows < self.config.min_parallel_rows or not self._workers:
+                return self.prediction_pipeline.predict_matrix(matrix, units, times)
+
+            model_sha256 = self.prediction_pipeline.registry.sha256(self.prediction_pipeline.model_path)
+            if units is None:
+                return self._predict_rows(matrix, model_sha256)
+            units = np.asarray(units)
+            times = np.arange(n_rows) if times is None else np.asarray(times)
+            # Whole units per block and slice: rows sorted by (unit, time), cut at unit starts
+            order = np.lexsort((times, units))
+            sorted_units = units[order]
+            unit_starts = np.flatnonzero(np.r_[True, sorted_units[1:] != sorted_units[:-1]])
+            preds = np.empty(n_rows, dtype=np.float64)
+            block_start = 0
+            while block_start < n_rows:
+                limit = block_start + self.config.capacity_rows
+                block_stop = n_rows if limit >= n_rows else int(unit_starts[np.searchsorted(unit_starts, limit, "right") - 1])
+                if block_stop <= block_start:
+                    raise ValueError(f"A unit has more rows than the pool capacity ({self.config.capacity_rows})")
+                rows = order[block_start:block_stop]
+                starts = unit_starts[(unit_starts >= block_start) & (unit_starts < block_stop)] - block_start
+                preds[rows] = self._predict_block(matrix[rows], np.column_stack([units[rows], times[rows]]), starts,
+                                                  model_sha256)
+                block_start = block_stop
+            return preds
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _predict_rows(self, matrix, model_sha256):
+        preds = np.empty(len(matrix), dtype=np.float64)
+        for start in range(0, len(matrix), self.config.capacity_rows):
+            block = matrix[start:start + self.config.capacity_rows]
+            preds[start:start + len(block)] = self._predict_block(block, None, np.arange(len(block)), model_sha256)
+        return preds
+
+    def _predict_block(self, matrix, keys, cut_points, model_sha256):
+        """
+        Scores up to capacity_rows rows. Slices start at rows of `cut_points`
+        (every row, or each unit's first row), about `slice_rows` apart.
+        """
+        n_rows = len(matrix)
+        slice_rows = min(self.config.slice_rows, -(-n_rows // self.n_workers))
+        targets = np.arange(0, n_rows, slice_rows)
+        # cut_points[0] is 0, so the first slice starts at row 0
+        first = np.searchsorted(cut_points, targets).clip(max=len(cut_points) - 1)
+        bounds = np.unique(np.r_[cut_points[first], n_rows])
+
+        with self._lock:
+            self.inputs[:n_rows] = matrix
+            if keys is not None:
+                self.keys[:n_rows] = keys
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                self._tasks.put((int(start), int(stop), keys is not None, model_sha256))
+            errors = []
+            for _ in range(len(bounds) - 1):
+                status, start, error = self._reply(self.config.task_timeout)
+                if status == "error":
+                    errors.append(f"rows from {start}: {error}")
+            if errors:
+                raise RuntimeError(f"Inference workers failed on {len(errors)} slice(s): {errors[0]}")
+            return self.outputs[:n_rows].copy()
+
+    def stats(self):
+        return {
+            "workers": self.n_workers,
+            "alive": sum(worker.is_alive() for worker in self._workers),
+            "capacity_rows": self.config.capacity_rows,
+            "shared_bytes": sum(block.size for block in self._blocks.values()),
+        }
@@ -0,0 +1,182 @@
+import asyncio
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.logger import logger
+
+
+@dataclass
+class MicroBatcherConfig:
+    """
+    Configuration for coalescing concurrent single-row requests.
+    A batch is dispatched once it holds `max_batch_size` rows or its oldest
+    request has waited `max_wait_ms`. The wait is adaptive: when requests
+    arrive further apart than `max_wait_ms` on average, a lone request is
+    dispatched at once instead of waiting for companions that will not come.
+    Up to `workers` batches are scored at the same time; while they all run,
+    new requests keep queueing, so batches grow with load. `stats_window`
+    bounds the number of recent delays kept for the percentile report.
+    """
+    max_batch_size: int = 64
+    max_wait_ms: float = 2.0
+    workers: int = 1
+    stats_window: int = 10000
+
+
+class MicroBatcher:
+    """
+    Collects rows submitted by concurrent callers into micro-batches and scores
+    each batch with one vectorized call on a worker thread. Every caller awaits
+    its own result. Must be used from a single asyncio event loop.
+    """
+    def __init__(self, score, n_features: int, config: MicroBatcherConfig = None):
+        """
+        Args:
+            score (callable): Maps a float32 (n_rows, n_features) matrix to n_rows predictions.
+            n_features (int): Width of every submitted row.
+        """
+        self.score = score
+        self.n_features = n_features
+        self.config = config or MicroBatcherConfig()
+        self._queue = None
+        self._slots = None
+        self._executor = None
+        self._dispatcher = None
+        # The event loop only keeps weak references to tasks, so running batches are held here
+        self._batches = set()
+        self._batch_sizes = np.zeros(self.config.max_batch_size + 1, dtype=np.int64)
+        self._queue_delays = deque(maxlen=self.config.stats_window)
+        self._score_seconds = deque(maxlen=self.config.stats_window)
+        # Smoothed gap between consecutive requests, in seconds
+        self._arrival_gap = float("inf")
+        self._last_arrival = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.config.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.config.workers, thread_name_prefix="micro-batch")
+        self._dispatcher = asyncio.create_task(self._dispatch_forever())
+
+    async def stop(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self._dispatcher = self._executor = None
+
+    async def submit(self, row):
+        """
+        Queues one row and returns its prediction once its batch has been scored.
+        """
+        future = asyncio.get_running_loop().create_future()
+        now = time.perf_counter()
+        if self._last_arrival is not None:
+            gap = now - self._last_arrival
+            self._arrival_gap = gap if self._arrival_gap == float("inf") else 0.8 * self._arrival_gap + 0.2 * gap
+        self._last_arrival = now
+        self._queue.put_nowait((row, future, now))
+        return await future
+
+    # --- Dispatch loop ---
+
+    async def _dispatch_forever(self):
+        config = self.config
+        max_wait = config.max_wait_ms / 1000.0
+        while True:
+            first = await self._queue.get()
+            # Requests keep arriving while every worker is busy
+            await self._slots.acquire()
+            batch = [first]
+            deadline = first[2] + max_wait
+            while len(batch) < config.max_batch_size:
+                if self._queue.empty():
+                    if self._arrival_gap > max_wait:
+                        # Light load: the next request is unlikely to arrive in time
+                        break
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self._queue.get_nowait())
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch):
+        try:
+            dispatched = time.perf_counter()
+            matrix = np.empty((len(batch), self.n_features), dtype=np.float32)
+            for i, (row, _, enqueued) in enumerate(batch):
+                matrix[i] = row
+                self._queue_delays.append(dispatched - enqueued)
+            self._batch_sizes[len(batch)] += 1
+
+            loop = asyncio.get_running_loop()
+            try:
+                preds = await loop.run_in_executor(self._executor, self.score, matrix)
+            except Exception as e:
+                logger.error(f"Micro-batch of {len(batch)} rows failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            self._score_seconds.append(time.perf_counter() - dispatched)
+            for (_, future, _), pred in zip(batch, preds):
+                # The caller may have gone away (e.g. a cancelled request)
+                if not future.done():
+                    future.set_result(float(pred))
+        finally:
+            self._slots.release()
+
+    # --- Reporting ---
+
+    def stats(self):
+        """
+        Returns batch-size distribution and queueing delay / scoring time
+        percentiles (milliseconds) for the recent window.
+        """
+        try:
+            sizes = self._batch_sizes
+            n_batches = int(sizes.sum())
+            n_rows = int((sizes * np.arange(len(sizes))).sum())
+            return {
+                "batches": n_batches,
+                "requests": n_rows,
+                "mean_batch_size": n_rows / n_batches if n_batches else 0.0,
+                "mean_arrival_gap_ms": self._arrival_gap * 1000.0 if n_rows > 1 else None,
+                "batch_size_histogram": {str(size): int(count) for size, count in enumerate(sizes) if count},
+                "queue_delay_ms": _percentiles(self._queue_delays),
+                "score_ms": _percentiles(self._score_seconds),
+                "pending": self._queue.qsize() if self._queue is not None else 0,
+                "config": {
+                    "max_batch_size": self.config.max_batch_size,
+                    "max_wait_ms": self.config.max_wait_ms,
+                    "workers": self.config.workers,
+                },
+            }
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def _percentiles(seconds):
+    if not seconds:
+        return {}
+    values = np.fromiter(seconds, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "max": float(values.max())}
@@ -0,0 +1,259 @@
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.logger import logger
+from src.engine_sentinel.model_artifact import BOOSTER_FILE, load_model
+from src.engine_sentinel.utils import file_sha256
+
+# The project root is the directory that contains src/engine_sentinel/pipeline
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+DEFAULT_MODEL_PATH = os.path.join(PROJECT_ROOT, 'artifacts', 'model', BOOSTER_FILE)
+
+
+@dataclass
+class ModelRegistryConfig:
+    """
+    Configuration for the model registry.
+    `watch_interval` is the number of seconds between background checks of the
+    model artifacts on disk. Set it to 0 to disable the watcher and only
+    reload when `reload()` is called explicitly.
+    """
+    watch_interval: float = 5.0
+
+
+class _LoadedModel:
+    """
+    Immutable snapshot of one loaded model and the file state it was loaded from.
+    The registry swaps whole snapshots, so readers never see a half-updated entry.
+    """
+    __slots__ = ('model', 'path', 'loader', 'mtime_ns', 'size', 'sha256', 'version', 'loaded_at', 'load_seconds')
+
+    def __init__(self, model, path, loader, mtime_ns, size, sha256, version, loaded_at, load_seconds):
+        self.model = model
+        self.path = path
+        self.loader = loader
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.sha256 = sha256
+        self.version = version
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of trained models.
+
+    Each model artifact is unpickled once per worker and shared by every thread.
+    `get()` is a plain dictionary lookup and never touches the disk; a background
+    watcher thread stats the artifacts every `watch_interval` seconds and, when the
+    mtime/size changed and the content hash differs, loads the new model and swaps
+    it in atomically. Load and reload timings are available through `stats()`.
+    """
+    def __init__(self, config: ModelRegistryConfig = None):
+        self.config = config or ModelRegistryConfig()
+        self._entries = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._watcher_pid = None
+        self._stop_event = threading.Event()
+
+    def get(self, model_path: str = DEFAULT_MODEL_PATH, loader=load_model):
+        """
+        Returns the loaded model for `model_path`, loading it on first use.
+        `loader` turns the file path into an object; it defaults to the model
+        artifact loader (native LightGBM file, or a legacy .pkl) and can be any
+        callable (e.g. for companion JSON artifacts that must be hot-reloaded
+        together with the model).
+        """
+        entry = self._entries.get(model_path)
+        if entry is None:
+            entry = self._load_if_missing(model_path, loader)
+        if self._watcher_pid != os.getpid() and self.config.watch_interval > 0:
+            self._start_watcher()
+        return entry.model
+
+    def sha256(self, model_path: str = DEFAULT_MODEL_PATH, loader=load_model):
+        """
+        Returns the content hash of the currently loaded version of `model_path`,
+        e.g. to check that a derived artifact was built from it.
+        """
+        entry = self._entries.get(model_path)
+        if entry is None:
+            entry = self._load_if_missing(model_path, loader)
+        return entry.sha256
+
+    def loaded_sha256(self, model_path: str = DEFAULT_MODEL_PATH):
+        """
+        Returns the content hash of the loaded version of `model_path`, or None
+        when it has not been loaded. Never loads or touches the disk.
+        """
+        entry = self._entries.get(model_path)
+        return entry.sha256 if entry is not None else None
+
+    def preload(self, model_path: str = DEFAULT_MODEL_PATH, loader=load_model):
+        """
+        Loads the model eagerly, e.g. before the first request is served.
+        """
+        self._load_if_missing(model_path, loader)
+        return self
+
+    def reload(self, model_path: str = None, force: bool = False):
+        """
+        Checks one (or every) registered artifact and reloads it if it changed.
+
+        Args:
+            model_path (str): Artifact to check. Checks all registered models when None.
+            force (bool): Reload even if the file looks unchanged.
+
+        Returns:
+            bool: True if at least one model was swapped.
+        """
+        paths = [model_path] if model_path else list(self._entries)
+        swapped = False
+        for path in paths:
+            swapped = self._refresh(path, force=force) or swapped
+        return swapped
+
+    def stats(self):
+        """
+        Returns a JSON-serialisable snapshot of load/reload counters and timings.
+        """
+        snapshot = {}
+        for path, entry in list(self._entries.items()):
+            counters = dict(self._counters.get(path, {}))
+            counters.update({
+                "version": entry.version,
+                "sha256": entry.sha256,
+                "loaded_at": entry.loaded_at,
+                "last_load_seconds": entry.load_seconds,
+            })
+            snapshot[path] = counters
+        return {
+            "watch_interval": self.config.watch_interval,
+            "watcher_alive": bool(self._watcher and self._watcher.is_alive() and self._watcher_pid == os.getpid()),
+            "models": snapshot,
+        }
+
+    def clear(self):
+        """
+        Drops every cached model; the next `get()` loads from disk again.
+        """
+        with self._lock:
+            self._entries = {}
+            self._counters = {}
+
+    # --- Internal helpers ---
+
+    def _load_if_missing(self, model_path, loader=load_model):
+        with self._lock:
+            entry = self._entries.get(model_path)
+            if entry is None:
+                entry = self._load(model_path, loader, version=1)
+                self._entries[model_path] = entry
+            return entry
+
+    def _load(self, model_path, loader, version):
+        try:
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"Model file not found at: {model_path}")
+
+            # Stat before hashing: if the file is rewritten while we read it, the
+            # next check sees a newer mtime and loads it again.
+            stat = os.stat(model_path)
+            start = time.perf_counter()
+            sha256 = file_sha256(model_path)
+            model = loader(model_path)
+            load_seconds = time.perf_counter() - start
+
+            counters = self._counters.setdefault(model_path, {
+                "loads": 0, "reloads": 0, "failed_reloads": 0, "checks": 0, "total_load_seconds": 0.0,
+            })
+            counters["loads"] += 1
+            counters["total_load_seconds"] += load_seconds
+            logger.info(f"Model loaded into registry from {model_path} (version {version}) in {load_seconds:.3f}s")
+
+            return _LoadedModel(
+                model=model, path=model_path, loader=loader, mtime_ns=stat.st_mtime_ns, size=stat.st_size,
+                sha256=sha256, version=version, loaded_at=time.time(), load_seconds=load_seconds,
+            )
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _refresh(self, model_path, force=False):
+        entry = self._entries.get(model_path)
+        if entry is None:
+            self._load_if_missing(model_path)
+            return True
+
+        with self._lock:
+            counters = self._counters.setdefault(model_path, {})
+            counters["checks"] = counters.get("checks", 0) + 1
+            try:
+                stat = os.stat(model_path)
+            except OSError:
+                # A missing artifact (e.g. mid-deploy) keeps the current model in service
+                return False
+
+            if not force and (stat.st_mtime_ns, stat.st_size) == (entry.mtime_ns, entry.size):
+                return False
+
+            if not force and file_sha256(model_path) == entry.sha256:
+                # Touched but identical content: remember the new stat, keep the model
+                self._entries[model_path] = _LoadedModel(
+                    entry.model, entry.path, entry.loader, stat.st_mtime_ns, stat.st_size, entry.sha256,
+                    entry.version, entry.loaded_at, entry.load_seconds,
+                )
+                return False
+
+            try:
+                new_entry = self._load(model_path, entry.loader, version=entry.version + 1)
+            except CustomException as e:
+                counters["failed_reloads"] = counters.get("failed_reloads", 0) + 1
+                logger.error(f"Model reload failed, keeping version {entry.version} in service: {e}")
+                return False
+
+            self._entries[model_path] = new_entry
+            counters["reloads"] = counters.get("reloads", 0) + 1
+            logger.info(f"Model hot-swapped: {model_path} is now version {new_entry.version}")
+            return True
+
+    def _start_watcher(self):
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._stop_event = threading.Event()
+            self._watcher = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+            self._watcher_pid = os.getpid()
+            self._watcher.start()
+
+    def _watch(self):
+        while not self._stop_event.wait(self.config.watch_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Model registry watcher error: {e}")
+
+    def _after_fork(self):
+        # Threads and held locks do not survive fork; the child starts its own watcher.
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._watcher_pid = None
+
+
+_registry = ModelRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_registry._after_fork)
+
+
+def get_model_registry():
+    """
+    Returns the process-wide model registry.
+    """
+    return _registry
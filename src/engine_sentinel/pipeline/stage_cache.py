@@ -0,0 +1,266 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+from dataclasses import asdict, dataclass, is_dataclass
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.logger import logger
+
+MANIFEST_FILE = "manifest.json"
+DIGEST_INDEX_FILE = "digests.json"
+
+
+@dataclass
+class StageCacheConfig:
+    """
+    Configuration for the training pipeline's stage cache.
+    Stage outputs are stored under `cache_dir/<stage>/<key>`, where the key
+    hashes everything the stage declared as an input. Each stage keeps its
+    `max_entries` most recently used entries; older ones are deleted when a
+    new entry is stored (0 keeps them all).
+    """
+    cache_dir: str = os.path.join('artifacts', 'cache', 'stages')
+    enabled: bool = True
+    max_entries: int = 4
+
+
+def code_version(*objects) -> str:
+    """
+    Hash of the source files that define the given modules, classes or
+    functions. Any edit to one of them changes the version.
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        with open(inspect.getsourcefile(obj), "rb") as file_obj:
+            digest.update(file_obj.read())
+    return digest.hexdigest()
+
+
+def config_fingerprint(config) -> str:
+    """
+    Stable JSON rendering of a config (dataclass or plain data).
+    """
+    if is_dataclass(config):
+        config = asdict(config)
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+class StageCache:
+    """
+    Content-addressed cache for pipeline stages.
+
+    A stage declares its inputs (source files, upstream artifacts, config and
+    code version) and the paths it writes. When a stage with the same inputs
+    has run before, its stored outputs are copied back into place and the
+    stage is skipped. Every run is recorded for `report()`. Stages keep their
+    most recently used entries only (see StageCacheConfig.max_entries).
+    """
+    def __init__(self, config: StageCacheConfig = None):
+        self.config = config or StageCacheConfig()
+        self.records = []
+        self._digest_index_path = os.path.join(self.config.cache_dir, DIGEST_INDEX_FILE)
+        self._digest_index = None
+
+    # --- Fingerprints ---
+
+    def file_digest(self, path: str) -> str:
+        """
+        Content hash of a file or directory (e.g. a columnar artifact).
+        Digests are remembered per (path, size, mtime), so unchanged inputs
+        are not re-read on the next run.
+        """
+        if os.path.isdir(path):
+            digest = hashlib.sha256()
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+                    digest.update(self.file_digest(file_path).encode("utf-8"))
+            return digest.hexdigest()
+
+        index = self._load_digest_index()
+        stat = os.stat(path)
+        stamp = f"{stat.st_size}|{stat.st_mtime_ns}"
+        entry = index.get(os.path.abspath(path))
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as file_obj:
+            for block in iter(lambda: file_obj.read(1 << 20), b""):
+                digest.update(block)
+        index[os.path.abspath(path)] = (stamp, digest.hexdigest())
+        return digest.hexdigest()
+
+    def stage_key(self, name: str, inputs: dict) -> str:
+        """
+        Hashes a stage's declared inputs. Values that are existing paths are
+        replaced by the digest of their content.
+        """
+        resolved = {}
+        for label, value in sorted(inputs.items()):
+            values = value if isinstance(value, (list, tuple)) else [value]
+            resolved[label] = [
+                self.file_digest(item) if isinstance(item, str) and os.path.exists(item) else item
+                for item in values
+            ]
+        payload = json.dumps({"stage": name, "inputs": resolved}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- Execution ---
+
+    def run(self, name: str, inputs: dict, outputs: list, function):
+        """
+        Runs `function()` unless a cached run with the same inputs exists.
+
+        Args:
+            name (str): Stage name, used in the cache layout and the report.
+            inputs (dict): label -> path, config string or code version.
+            outputs (list): Paths written by the stage.
+            function (callable): Runs the stage; its return value must be JSON
+                serialisable and is replayed on a cache hit.
+
+        Returns:
+            The stage's return value.
+        """
+        try:
+            started = time.perf_counter()
+            if not self.config.enabled:
+                result = function()
+                self._record(name, "disabled", None, started)
+                return result
+
+            key = self.stage_key(name, inputs)
+            entry_dir = os.path.join(self.config.cache_dir, name, key)
+            manifest_path = os.path.join(entry_dir, MANIFEST_FILE)
+
+            if os.path.exists(manifest_path):
+                with open(manifest_path) as file_obj:
+                    manifest = json.load(file_obj)
+                for index, output in enumerate(manifest["outputs"]):
+                    _copy_path(os.path.join(entry_dir, str(index)), output)
+                _touch(manifest_path)
+                self._save_digest_index()
+                self._record(name, "hit", key, started)
+                return manifest["result"]
+
+            result = function()
+            tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            for index, output in enumerate(outputs):
+                _copy_path(output, os.path.join(tmp_dir, str(index)))
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as file_obj:
+                json.dump({"stage": name, "outputs": list(outputs), "result": result}, file_obj, indent=2)
+            _touch(os.path.join(tmp_dir, MANIFEST_FILE))
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+            self._prune(name)
+            self._save_digest_index()
+
+            self._record(name, "miss", key, started)
+            return result
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def run_uncached(self, name: str, function):
+        """
+        Runs a stage that must not be skipped, e.g. one whose work is its side
+        effects (logging, tracking runs), and lists it in the report.
+        """
+        try:
+            started = time.perf_counter()
+            result = function()
+            self._record(name, "uncached", None, started)
+            return result
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def report(self) -> str:
+        """
+        Per-stage hit/miss and timing table for the stages run so far.
+        """
+        lines = [f"{'stage':<16}{'status':<10}{'seconds':>9}  key"]
+        for record in self.records:
+            key = (record["key"] or "-")[:12]
+            lines.append(f"{record['stage']:<16}{record['status']:<10}{record['seconds']:>9.2f}  {key}")
+        total = sum(record["seconds"] for record in self.records)
+        lines.append(f"{'total':<26}{total:>9.2f}")
+        return "\n".join(lines)
+
+    def _prune(self, name):
+        """
+        Deletes the least recently used entries of a stage beyond
+        `max_entries`. The manifest's mtime marks when an entry was last used.
+        """
+        if not self.config.max_entries:
+            return
+        stage_dir = os.path.join(self.config.cache_dir, name)
+        entries = []
+        for key in os.listdir(stage_dir):
+            try:
+                entries.append((os.stat(os.path.join(stage_dir, key, MANIFEST_FILE)).st_mtime_ns, key))
+            except OSError:
+                # A temporary directory, or an entry another process just removed
+                continue
+        for _, key in sorted(entries, reverse=True)[self.config.max_entries:]:
+            shutil.rmtree(os.path.join(stage_dir, key), ignore_errors=True)
+            logger.info(f"Stage '{name}': evicted cache entry {key[:12]}")
+
+    def _record(self, name, status, key, started):
+        seconds = time.perf_counter() - started
+        self.records.append({"stage": name, "status": status, "seconds": seconds, "key": key})
+        logger.info(f"Stage '{name}': cache {status} in {seconds:.2f}s")
+
+    def _load_digest_index(self):
+        if self._digest_index is None:
+            try:
+                with open(self._digest_index_path) as file_obj:
+                    self._digest_index = {path: tuple(entry) for path, entry in json.load(file_obj).items()}
+            except (OSError, ValueError):
+                self._digest_index = {}
+        return self._digest_index
+
+    def _save_digest_index(self):
+        if self._digest_index is None:
+            return
+        os.makedirs(self.config.cache_dir, exist_ok=True)
+        tmp_path = f"{self._digest_index_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as file_obj:
+            json.dump(self._digest_index, file_obj)
+        os.replace(tmp_path, self._digest_index_path)
+
+
+def _touch(path: str):
+    """
+    Sets a file's mtime to now, at full clock resolution (plain writes get the
+    file system's coarser timestamp).
+    """
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+
+def _copy_path(source: str, destination: str):
+    """
+    Copies a file or directory, replacing `destination` in one rename so
+    readers never see a half-written artifact.
+    """
+    parent = os.path.dirname(destination)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    tmp_path = f"{destination}.tmp-{os.getpid()}"
+    if os.path.isdir(source):
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        shutil.copytree(source, tmp_path)
+        if os.path.isdir(destination):
+            shutil.rmtree(destination)
+    else:
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, destination)
@@ -0,0 +1,118 @@
+import gc
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from src.engine_sentinel.logger import logger
+
+# Modules that dominate import time; reported so a regression that pulls one
+# of them back into the serving import path is visible
+HEAVY_MODULES = ("pandas", "scipy", "sklearn", "lightgbm", "mlflow", "dill")
+
+
+class StartupProfile:
+    """
+    Records how long a serving process takes to become ready: the import of
+    the app module, artifact preloading and, under gunicorn, the time each
+    forked worker needs after the fork. Phases are wall-clock seconds.
+    """
+    def __init__(self):
+        self.pid = os.getpid()
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.ready_seconds = None
+        self.process_seconds_to_ready = None
+        self._forked_at = None
+        self._frozen_objects = 0
+        self._fork_master_pid = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Times the enclosed block as phase `name`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def mark_ready(self):
+        """
+        Records the time to ready, measured from this profile's creation or,
+        in a forked worker, from the fork. The process age at that moment
+        also counts interpreter start-up.
+        """
+        origin = self._forked_at if self._forked_at is not None else self.started
+        self.ready_seconds = time.perf_counter() - origin
+        self.process_seconds_to_ready = _process_age()
+        logger.info(f"Process {os.getpid()} ready in {self.ready_seconds:.3f}s; phases: {self.phases}")
+
+    def freeze_for_fork(self):
+        """
+        Moves every object allocated so far (app, model, compiled arrays) out of
+        the garbage collector's reach. Collections in forked workers then never
+        write to those objects' headers, so their pages stay shared
+        copy-on-write with the master instead of being copied into each worker.
+        """
+        gc.collect()
+        gc.freeze()
+        self._frozen_objects = gc.get_freeze_count()
+        self._fork_master_pid = os.getpid()
+
+    @property
+    def is_fork_master(self):
+        """
+        True in a master that preloaded the app for its workers and serves no
+        requests itself (e.g. it must not persist per-worker state on exit).
+        """
+        return self._fork_master_pid == os.getpid()
+
+    def after_fork(self):
+        """
+        Starts the worker's own readiness clock.
+        """
+        self._forked_at = time.perf_counter()
+        self.ready_seconds = self.process_seconds_to_ready = None
+
+    def stats(self):
+        """
+        Returns a JSON-serialisable snapshot of the startup timings.
+        """
+        return {
+            "pid": os.getpid(),
+            "forked": self._forked_at is not None,
+            "phases": self.phases,
+            "ready_seconds": self.ready_seconds,
+            "process_seconds_to_ready": self.process_seconds_to_ready,
+            "frozen_objects": self._frozen_objects,
+            "modules_loaded": len(sys.modules),
+            "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+        }
+
+
+def _process_age():
+    """
+    Seconds since the process was started (or forked) by the OS; None where
+    /proc is not available.
+    """
+    try:
+        with open("/proc/self/stat") as file_obj:
+            # The command name may contain spaces; fields after it are fixed
+            fields = file_obj.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as file_obj:
+            uptime = float(file_obj.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+_profile = StartupProfile()
+
+
+def get_startup_profile():
+    """
+    Returns the process-wide startup profile.
+    """
+    return _profile
@@ -0,0 +1,486 @@
+import json
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.features import RollingFeatureConfig, is_flat_window
+from src.engine_sentinel.logger import logger
+from src.engine_sentinel.pipeline.predict_pipeline import PredictionPipeline, model_feature_names
+from src.engine_sentinel.pipeline.model_registry import PROJECT_ROOT
+from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# Upper bound on the snapshot slots searched for a free one (one per live worker)
+MAX_SNAPSHOT_SLOTS = 1024
+
+
+class StaleCycleError(ValueError):
+    """
+    Raised when a unit reports a cycle that is not after its last stored cycle.
+    """
+
+
+@dataclass
+class StreamingPipelineConfig:
+    """
+    Configuration for streaming (one cycle at a time) inference.
+    `refresh_every` is the number of updates after which a unit's running sums
+    are recomputed from its ring buffer, so floating point drift cannot build up.
+    Each serving process claims a numbered slot (a locked
+    `<snapshot>.<n>.lock` file) and keeps its units in `<snapshot>.<n>.npz`,
+    so workers never overwrite each other's state; a restarted worker takes
+    over a free slot and restores it. State is saved every `snapshot_interval`
+    seconds when it changed (0 disables) and at exit.
+    ENGINE_SENTINEL_STREAM_SNAPSHOT overrides the snapshot location (e.g. to
+    keep a load test's engines out of the served state).
+    """
+    snapshot_path: str = field(default_factory=lambda: os.environ.get("ENGINE_SENTINEL_STREAM_SNAPSHOT")
+                               or os.path.join(PROJECT_ROOT, 'artifacts', 'stream_state.npz'))
+    snapshot_interval: float = 60.0
+    refresh_every: int = 1024
+    initial_capacity: int = 1024
+
+
+class StreamingFeatureStore:
+    """
+    Per-engine state for the rolling features, held in preallocated arrays.
+
+    Each unit owns one slot: a ring buffer of its last `max(windows)` readings
+    and cycle times, running sums (x, x^2, t*x, t, t^2) per window and the EWMA
+    values. A new cycle evicts the readings that fell out of each window and adds
+    the new one, so an update costs the same no matter how long the unit's
+    history is, and memory per unit is fixed by the window sizes.
+    Features match RollingFeatureEngine on the same history.
+    """
+    _ARRAYS = ("ring", "ring_t", "cycles", "first_time", "sum_x", "sum_xx", "sum_tx", "sum_t", "sum_tt",
+               "ewma", "since_refresh")
+
+    def __init__(self, config: RollingFeatureConfig, capacity: int = 1024, refresh_every: int = 1024):
+        self.config = config
+        self.refresh_every = refresh_every
+        self.windows = np.array(config.windows, dtype=np.int64)
+        self.max_window = int(self.windows.max()) if len(self.windows) else 1
+        self.min_window = int(self.windows.min()) if len(self.windows) else self.max_window
+        self.alphas = np.array([2.0 / (span + 1.0) for span in config.ewma_spans])
+        self.sensor_index = np.array([FEATURE_COLUMNS.index(sensor) for sensor in config.sensors])
+        self.per_sensor = len(config.windows) * len(config.statistics) + len(config.ewma_spans)
+
+        self._slots = {}
+        self._free = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        n_windows, n_sensors = len(self.windows), len(self.sensor_index)
+        shapes = {
+            "ring": ((capacity, self.max_window, n_sensors), np.float32),
+            "ring_t": ((capacity, self.max_window), np.float64),
+            "cycles": ((capacity,), np.int64),
+            "first_time": ((capacity,), np.float64),
+            "sum_x": ((capacity, n_windows, n_sensors), np.float64),
+            "sum_xx": ((capacity, n_windows, n_sensors), np.float64),
+            "sum_tx": ((capacity, n_windows, n_sensors), np.float64),
+            "sum_t": ((capacity, n_windows), np.float64),
+            "sum_tt": ((capacity, n_windows), np.float64),
+            "ewma": ((capacity, len(self.alphas), n_sensors), np.float64),
+            "since_refresh": ((capacity,), np.int64),
+        }
+        for name, (shape, dtype) in shapes.items():
+            grown = np.zeros(shape, dtype=dtype)
+            current = getattr(self, name, None)
+            if current is not None:
+                grown[:len(current)] = current
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    def __len__(self):
+        return len(self._slots)
+
+    def memory_bytes(self):
+        return sum(getattr(self, name).nbytes for name in self._ARRAYS)
+
+    def _slot(self, unit):
+        slot = self._slots.get(unit)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._slots)
+                if slot >= self.capacity:
+                    self._allocate(self.capacity * 2)
+            self._slots[unit] = slot
+        return slot
+
+    def remove(self, unit):
+        """
+        Forgets a unit (e.g. after it was retired) and recycles its slot.
+        """
+        slot = self._slots.pop(unit, None)
+        if slot is not None:
+            for name in self._ARRAYS:
+                getattr(self, name)[slot] = 0
+            self._free.append(slot)
+
+    def last_time(self, unit):
+        """
+        Returns the time_in_cycles of the unit's latest reading, or None for a new unit.
+        """
+        slot = self._slots.get(unit)
+        if slot is None or self.cycles[slot] == 0:
+            return None
+        pos = (int(self.cycles[slot]) - 1) % self.max_window
+        return float(self.first_time[slot] + self.ring_t[slot, pos])
+
+    def update(self, unit, time_in_cycles, readings):
+        """
+        Adds one cycle for `unit` and returns its rolling features.
+
+        Args:
+            unit: Any hashable engine identifier.
+            time_in_cycles (float): Cycle number of this reading.
+            readings (np.ndarray): The 24 raw features in FEATURE_COLUMNS order.
+
+        Returns:
+            np.ndarray: float32 vector in RollingFeatureEngine.feature_names() order.
+        """
+        slot = self._slot(unit)
+        x = np.asarray(readings, dtype=np.float64)[self.sensor_index]
+        total = int(self.cycles[slot])
+        if total == 0:
+            self.first_time[slot] = time_in_cycles
+        t = float(time_in_cycles) - self.first_time[slot]
+
+        # Evict the reading that leaves each full window (read before overwriting the ring)
+        evict = slice(None) if total >= self.max_window else total >= self.windows
+        if total >= self.min_window:
+            old_pos = (total - self.windows[evict]) % self.max_window
+            old_x = self.ring[slot, old_pos].astype(np.float64)
+            old_t = self.ring_t[slot, old_pos]
+            self.sum_x[slot, evict] -= old_x
+            self.sum_xx[slot, evict] -= old_x * old_x
+            self.sum_tx[slot, evict] -= old_t[:, None] * old_x
+            self.sum_t[slot, evict] -= old_t
+            self.sum_tt[slot, evict] -= old_t * old_t
+
+        pos = total % self.max_window
+        self.ring[slot, pos] = x
+        self.ring_t[slot, pos] = t
+        self.sum_x[slot] += x
+        self.sum_xx[slot] += x * x
+        self.sum_tx[slot] += t * x
+        self.sum_t[slot] += t
+        self.sum_tt[slot] += t * t
+        if total == 0:
+            self.ewma[slot] = x
+        else:
+            self.ewma[slot] += self.alphas[:, None] * (x - self.ewma[slot])
+        self.cycles[slot] = total + 1
+
+        self.since_refresh[slot] += 1
+        if self.since_refresh[slot] >= self.refresh_every:
+            self._refresh(slot)
+
+        return self._features(slot)
+
+    def _refresh(self, slot):
+        """
+        Recomputes the running sums of one unit exactly from its ring buffer.
+        """
+        total = int(self.cycles[slot])
+        for i, window in enumerate(self.windows):
+            count = min(total, int(window))
+            idx = (total - 1 - np.arange(count)) % self.max_window
+            x = self.ring[slot, idx].astype(np.float64)
+            t = self.ring_t[slot, idx]
+            self.sum_x[slot, i] = x.sum(axis=0)
+            self.sum_xx[slot, i] = (x * x).sum(axis=0)
+            self.sum_tx[slot, i] = (t[:, None] * x).sum(axis=0)
+            self.sum_t[slot, i] = t.sum()
+            self.sum_tt[slot, i] = (t * t).sum()
+        self.since_refresh[slot] = 0
+
+    def _features(self, slot):
+        total = int(self.cycles[slot])
+        n_sensors = len(self.sensor_index)
+        count = np.minimum(total, self.windows).astype(np.float64)[:, None]
+
+        mean = self.sum_x[slot] / count
+        var = self.sum_xx[slot] / count - mean * mean
+        flat = is_flat_window(var, mean)
+        values = {"mean": mean}
+        if "std" in self.config.statistics:
+            values["std"] = np.where(flat, 0.0, np.sqrt(np.maximum(var, 0.0)))
+        if "slope" in self.config.statistics:
+            sum_t = self.sum_t[slot][:, None]
+            denom = count * self.sum_tt[slot][:, None] - sum_t * sum_t
+            numer = count * self.sum_tx[slot] - sum_t * self.sum_x[slot]
+            slope = np.divide(numer, denom, out=np.zeros_like(numer), where=denom > 1e-12)
+            values["slope"] = np.where(flat, 0.0, slope)
+        if "min" in self.config.statistics or "max" in self.config.statistics:
+            # Unroll the ring so the most recent reading is last; windows are suffixes
+            ring = self.ring[slot]
+            if total >= self.max_window:
+                pos = total % self.max_window
+                ring = np.concatenate([ring[pos:], ring[:pos]])
+            else:
+                ring = ring[:total]
+            lows = [ring[-int(window):].min(axis=0) for window in self.windows]
+            highs = [ring[-int(window):].max(axis=0) for window in self.windows]
+            values["min"], values["max"] = np.array(lows), np.array(highs)
+
+        # (n_windows, n_stats, n_sensors) -> per sensor: window-major stats, then EWMAs
+        stacked = np.stack([values[stat] for stat in self.config.statistics], axis=1)
+        block = np.empty((n_sensors, self.per_sensor), dtype=np.float32)
+        n_rolling = stacked.shape[0] * stacked.shape[1]
+        block[:, :n_rolling] = stacked.reshape(n_rolling, n_sensors).T
+        block[:, n_rolling:] = self.ewma[slot].T
+        return block.ravel()
+
+    # --- Snapshots ---
+
+    def save(self, file_path):
+        """
+        Writes every unit's state to one .npz file (atomically replaced).
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            n_slots = max(self._slots.values(), default=-1) + 1
+            arrays = {name: getattr(self, name)[:n_slots] for name in self._ARRAYS}
+            meta = {
+                "config": asdict(self.config),
+                "units": list(self._slots.keys()),
+                "slots": list(self._slots.values()),
+                "free": self._free,
+            }
+            tmp_path = f"{file_path}.tmp-{os.getpid()}.npz"
+            np.savez(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def load(cls, file_path, refresh_every: int = 1024):
+        try:
+            with np.load(file_path) as snapshot:
+                meta = json.loads(str(snapshot["meta"]))
+                config = RollingFeatureConfig.from_dict(meta["config"])
+                n_slots = len(snapshot["cycles"])
+                store = cls(config, capacity=max(n_slots, 1), refresh_every=refresh_every)
+                for name in cls._ARRAYS:
+                    getattr(store, name)[:n_slots] = snapshot[name]
+            store._slots = dict(zip(meta["units"], meta["slots"]))
+            store._free = list(meta["free"])
+            return store
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+class StreamingPipeline:
+    """
+    Stateful inference for engines that report one cycle at a time.
+
+    Every update refreshes the unit's rolling features from its stored state and
+    returns a new RUL prediction, without re-reading the unit's history. State can
+    be snapshotted to disk and restored after a restart instead of replaying.
+    State is per process: with several workers, each unit must be routed to the
+    same one (e.g. sticky by unit id), or it starts a new history on another.
+    """
+    def __init__(self, prediction_pipeline: PredictionPipeline = None, config: StreamingPipelineConfig = None):
+        self.prediction_pipeline = prediction_pipeline or PredictionPipeline()
+        self.config = config or StreamingPipelineConfig()
+        self.store = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._owner_pid = None
+        self._slot = None
+        self._slot_handle = None
+        self._updates = 0
+        self._saved_updates = 0
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """
+        Claims this process's snapshot slot, restores the slot's state and
+        starts the periodic snapshots. Runs on the first update or stats call
+        of each process, so a preloading master that forks the workers never
+        claims a slot.
+        """
+        with self._start_lock:
+            if self._owner_pid == os.getpid():
+                return
+            self._slot, self._slot_handle = self._claim_slot()
+            self._owner_pid = os.getpid()
+            self.load_snapshot(self.snapshot_file())
+            self._saved_updates = self._updates
+            if self.config.snapshot_interval > 0:
+                self._stop_event = threading.Event()
+                threading.Thread(target=self._snapshot_loop, name="stream-snapshots", daemon=True).start()
+
+    def close(self):
+        """
+        Saves this process's state, stops the periodic snapshots and releases
+        the slot. Does nothing in a process that has not started streaming.
+        """
+        with self._start_lock:
+            if self._owner_pid != os.getpid():
+                return
+            self._stop_event.set()
+            self.save_snapshot()
+            if self._slot_handle is not None:
+                self._slot_handle.close()
+            self._owner_pid = self._slot = self._slot_handle = None
+
+    def snapshot_file(self):
+        """
+        Snapshot file of this process's slot.
+        """
+        root, extension = os.path.splitext(self.config.snapshot_path)
+        return f"{root}.{self._slot}{extension or '.npz'}"
+
+    def _claim_slot(self):
+        # The first slot whose lock no live process holds; the lock is released
+        # when this process exits, however it exits
+        root, _ = os.path.splitext(self.config.snapshot_path)
+        os.makedirs(os.path.dirname(root) or ".", exist_ok=True)
+        if fcntl is None:
+            return 0, None
+        for slot in range(MAX_SNAPSHOT_SLOTS):
+            handle = open(f"{root}.{slot}.lock", "a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                continue
+            return slot, handle
+        raise RuntimeError(f"All {MAX_SNAPSHOT_SLOTS} streaming snapshot slots of {root} are in use")
+
+    def _snapshot_loop(self):
+        while not self._stop_event.wait(self.config.snapshot_interval):
+            try:
+                if self._updates != self._saved_updates:
+                    self.save_snapshot()
+            except Exception as e:
+                logger.error(f"Streaming snapshot error: {e}")
+
+    def _current_store(self, engine):
+        if self.store is None or self.store.config != engine.config:
+            if self.store is not None:
+                logger.warning("Rolling feature definition changed; streaming state was reset.")
+            self.store = StreamingFeatureStore(
+                engine.config, capacity=self.config.initial_capacity, refresh_every=self.config.refresh_every
+            )
+        return self.store
+
+    def update(self, unit, time_in_cycles, readings):
+        """
+        Ingests one cycle for one engine and returns its predicted RUL.
+        """
+        return float(self.update_batch([unit], [time_in_cycles], [readings])[0])
+
+    def update_batch(self, units, times, readings):
+        """
+        Ingests one cycle for each of several engines (in order) and scores all of
+        them with a single predict call.
+
+        Args:
+            units (list): Engine identifiers.
+            times (list): time_in_cycles of each reading.
+            readings (array-like): (n, 24) raw features in FEATURE_COLUMNS order;
+                they are normalized per operating regime before entering the store
+                when the model was trained with an active regime index.
+
+        Returns:
+            np.ndarray: Predicted RUL per reading.
+
+        Raises:
+            StaleCycleError: A unit's cycle is not after its previous one; no
+                reading of the batch is stored.
+        """
+        try:
+            pipeline = self.prediction_pipeline
+            raw = np.asarray(readings, dtype=np.float32).reshape(len(units), len(FEATURE_COLUMNS))
+            raw = pipeline.normalize_regimes(raw)
+            model = pipeline.registry.get(pipeline.model_path)
+
+            if model_feature_names(model) == FEATURE_COLUMNS:
+                return pipeline.score(raw, model)
+
+            engine = pipeline.feature_engine()
+            if self._owner_pid != os.getpid():
+                self.start()
+            with self._lock:
+                store = self._current_store(engine)
+                self._check_order(store, units, times)
+                rolling = np.stack([
+                    store.update(unit, time, row) for unit, time, row in zip(units, times, raw)
+                ])
+                self._updates += len(units)
+            return pipeline.score(pipeline.assemble_model_input(raw, rolling, model, engine), model)
+
+        except StaleCycleError:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _check_order(store, units, times):
+        # A repeated or older cycle would be pushed into the ring as the newest
+        # reading and corrupt the unit's windows, so the whole batch is rejected
+        latest = {}
+        for i, (unit, time) in enumerate(zip(units, times)):
+            last = latest[unit] if unit in latest else store.last_time(unit)
+            if last is not None and float(time) <= last:
+                raise StaleCycleError(
+                    f"Record {i}: unit {unit} cycle {time} is not after its last cycle {last:g}."
+                )
+            latest[unit] = float(time)
+
+    def stats(self):
+        if self._owner_pid != os.getpid():
+            self.start()
+        store = self.store
+        return {
+            "units": len(store) if store else 0,
+            "capacity": store.capacity if store else 0,
+            "memory_bytes": store.memory_bytes() if store else 0,
+        }
+
+    def save_snapshot(self, file_path: str = None):
+        """
+        Saves the state to `file_path`, by default this process's slot file.
+        Does nothing in a process that has not started streaming (e.g. a
+        preloading master at exit).
+        """
+        if file_path is None:
+            if self._owner_pid != os.getpid():
+                return
+            file_path = self.snapshot_file()
+        with self._lock:
+            if self.store is not None:
+                self.store.save(file_path)
+                self._saved_updates = self._updates
+                logger.info(f"Streaming state for {len(self.store)} units saved to {file_path}")
+
+    def load_snapshot(self, file_path: str = None):
+        """
+        Restores state saved by `save_snapshot` (by default from this process's
+        slot file). Returns False if there is no snapshot.
+        """
+        if file_path is None:
+            if self._owner_pid != os.getpid():
+                self.start()
+                return self.store is not None
+            file_path = self.snapshot_file()
+        if not os.path.exists(file_path):
+            return False
+        with self._lock:
+            self.store = StreamingFeatureStore.load(file_path, refresh_every=self.config.refresh_every)
+        logger.info(f"Streaming state for {len(self.store)} units restored from {file_path}")
+        return True
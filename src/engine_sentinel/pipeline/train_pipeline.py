@@ -1,49 +1,192 @@
+import os
 import sys
+from src.engine_sentinel import compiled_model, drift, features, model_artifact, regimes, schema, search, scheduler, utils
 from src.engine_sentinel.exception import CustomException
-from src.engine_sentinel.logger import logger
+from src.engine_sentinel.logger import configure_logging, logger
+from src.engine_sentinel.metrics import get_metrics
+from src.engine_sentinel.components import data_ingestion, data_transformation, model_trainer
 from src.engine_sentinel.components.data_ingestion import DataIngestion
 from src.engine_sentinel.components.data_transformation import DataTransformation
+from src.engine_sentinel.components.incremental_trainer import FullRetrainRequired, IncrementalTrainer, IncrementalTrainerConfig
 from src.engine_sentinel.components.model_trainer import ModelTrainer
 from src.engine_sentinel.components.model_evaluation import ModelEvaluation
+from src.engine_sentinel.pipeline.stage_cache import StageCache, StageCacheConfig, code_version, config_fingerprint
+from src.engine_sentinel.tracking import TrackingConfig, get_tracker, upload_pending_in_background
+
+# Stage timings and memory peaks of the last run, in the Prometheus text format
+TRAINING_METRICS_PATH = os.path.join('artifacts', 'metrics', 'training.prom')
 
 class TrainingPipeline:
     """
     This class orchestrates the entire training process by calling
     each component in the correct order.
+    Every stage declares its inputs (source files, upstream artifacts, config
+    and the code it runs), so stages whose inputs did not change are served
+    from the stage cache instead of being re-run.
     """
+    def __init__(self, cache_config: StageCacheConfig = None, tracking_config: TrackingConfig = None):
+        configure_logging()
+        self.cache = StageCache(cache_config)
+        self.tracking_config = tracking_config or TrackingConfig()
+        get_tracker(self.tracking_config)
+
     def run_pipeline(self):
         """
-        Runs the end-to-end training pipeline.
+        Runs the end-to-end training pipeline, prints the per-stage cache report
+        and writes the stages' timing and memory metrics to TRAINING_METRICS_PATH.
+        Tracking runs are written to the local store, and uploaded afterwards
+        when tracking is in 'remote' mode.
         """
         try:
             logger.info("--- Training Pipeline Started ---")
-            
+
             # Step 1: Data Ingestion
-            data_ingestion = DataIngestion()
-            raw_data_path = data_ingestion.initiate_data_ingestion()
-            
+            data_ingestion_step = DataIngestion()
+            ingestion_config = data_ingestion_step.ingestion_config
+            source_files = [
+                os.path.join(ingestion_config.data_dir, ingestion_config.file_pattern.format(subset=subset))
+                for subset in ingestion_config.subsets
+            ]
+            outputs = [ingestion_config.raw_data_path]
+            if ingestion_config.export_csv:
+                outputs.append(ingestion_config.raw_data_csv_path)
+            raw_data_path = self.cache.run(
+                "ingestion",
+                inputs={
+                    # Missing subsets are skipped by the stage, so their absence is part of the key
+                    "sources": [path if os.path.exists(path) else f"missing:{path}" for path in source_files],
+                    "config": config_fingerprint(ingestion_config),
+                    "code": code_version(data_ingestion, utils),
+                },
+                outputs=outputs,
+                function=data_ingestion_step.initiate_data_ingestion,
+            )
+
             # Step 2: Data Transformation
-            data_transformation = DataTransformation()
-            transformed_data_path = data_transformation.initiate_data_transformation(raw_data_path=raw_data_path)
-            
+            data_transformation_step = DataTransformation()
+            transformation_config = data_transformation_step.data_transformation_config
+            outputs = [
+                transformation_config.transformed_data_path, transformation_config.feature_spec_path,
+                transformation_config.feature_schema_path, transformation_config.regime_index_path,
+                transformation_config.drift_reference_path,
+            ]
+            if transformation_config.export_csv:
+                outputs.append(transformation_config.transformed_data_csv_path)
+            transformed_data_path = self.cache.run(
+                "transformation",
+                inputs={
+                    "raw_data": raw_data_path,
+                    "config": config_fingerprint(transformation_config),
+                    "code": code_version(data_transformation, drift, features, regimes, schema, utils),
+                },
+                outputs=outputs,
+                function=lambda: data_transformation_step.initiate_data_transformation(raw_data_path=raw_data_path),
+            )
+
             # Step 3: Model Training
-            model_trainer = ModelTrainer()
-            trained_model_path = model_trainer.initiate_model_trainer(transformed_data_path=transformed_data_path)
-
-            # Step 4: Model Evaluation (NEW STEP)
-            model_evaluation = ModelEvaluation()
-            model_evaluation.initiate_model_evaluation(
-                transformed_data_path=transformed_data_path,
-                trained_model_path=trained_model_path
+            model_trainer_step = ModelTrainer()
+            trainer_config = model_trainer_step.model_trainer_config
+            trainer_config.feature_schema_path = transformation_config.feature_schema_path
+            trained_model_path = self.cache.run(
+                "training",
+                inputs={
+                    "transformed_data": transformed_data_path,
+                    "feature_schema": transformation_config.feature_schema_path,
+                    "config": config_fingerprint(trainer_config),
+                    "param_grid": config_fingerprint(utils.LGBM_PARAM_GRID),
+                    "code": code_version(model_trainer, search, scheduler, schema, compiled_model, model_artifact, utils),
+                },
+                outputs=[trainer_config.trained_model_file_path, trainer_config.compiled_model_file_path],
+                function=lambda: model_trainer_step.initiate_model_trainer(transformed_data_path=transformed_data_path),
             )
-            
+
+            # Step 4: Model Evaluation on the official test sets
+            model_evaluation_step = ModelEvaluation()
+            evaluation_config = model_evaluation_step.model_evaluation_config
+            evaluation_config.feature_spec_path = transformation_config.feature_spec_path
+            evaluation_config.regime_index_path = transformation_config.regime_index_path
+            # Always run: a hit would skip the metrics logging and the tracking run.
+            # Subsets already scored for this model come from the evaluation's own result cache.
+            self.cache.run_uncached(
+                "evaluation",
+                lambda: model_evaluation_step.initiate_model_evaluation(trained_model_path=trained_model_path),
+            )
+
             logger.info(f"--- Training Pipeline Completed Successfully ---")
             logger.info(f"Trained model saved at: {trained_model_path}")
 
+            report = self.cache.report()
+            logger.info(f"Stage report:\n{report}")
+            print(report)
+            get_metrics().write_textfile(TRAINING_METRICS_PATH)
+
+            # Runs are recorded locally; with a remote configured they are uploaded
+            # now, within a time limit, and otherwise stay pending for a later upload
+            get_tracker().flush()
+            if self.tracking_config.mode == "remote":
+                upload_pending_in_background(self.tracking_config)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def run_incremental(self, incremental_config: IncrementalTrainerConfig = None):
+        """
+        Adds the units appended to the source files since the last run by
+        continuing to boost the saved model. Falls back to the full pipeline
+        (with hyperparameter search) on the first run, when a source file was
+        rewritten or a trained unit got new cycles, on validation drift, or
+        after too many incremental rounds; incremental tracking then restarts
+        from the new model.
+
+        Returns:
+            dict: The update report; status is 'updated', 'up_to_date' or 'full_retrain'.
+        """
+        try:
+            ingestion_config = DataIngestion().ingestion_config
+            sources = [
+                (subset, os.path.join(ingestion_config.data_dir, ingestion_config.file_pattern.format(subset=subset)))
+                for subset in ingestion_config.subsets
+            ]
+            sources = [(subset, path) for subset, path in sources if os.path.exists(path)]
+            transformation_config = DataTransformation().data_transformation_config
+            trainer_config = ModelTrainer().model_trainer_config
+            trainer = IncrementalTrainer(
+                model_dir=trainer_config.trained_model_file_path,
+                feature_spec_path=transformation_config.feature_spec_path,
+                feature_schema_path=transformation_config.feature_schema_path,
+                regime_index_path=transformation_config.regime_index_path,
+                compiled_model_path=trainer_config.compiled_model_file_path,
+                config=incremental_config,
+            )
+
+            try:
+                report = trainer.initiate_incremental_training(sources)
+            except FullRetrainRequired as e:
+                logger.info(f"Running the full training pipeline: {e}")
+                trainer.reset()
+                self.run_pipeline()
+                trainer.bootstrap(sources, transformation_config.transformed_data_path)
+                return {"status": "full_retrain", "reason": str(e)}
+
+            if report["status"] == "updated":
+                ModelEvaluation().initiate_model_evaluation(trained_model_path=trainer_config.trained_model_file_path)
+            get_metrics().write_textfile(TRAINING_METRICS_PATH)
+            get_tracker().flush()
+            return report
+
         except Exception as e:
             raise CustomException(e, sys)
 
 if __name__ == '__main__':
-    pipeline = TrainingPipeline()
-    pipeline.run_pipeline()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Runs the training pipeline.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only add units appended since the last run (full retrain when needed).")
+    args = parser.parse_args()
 
+    pipeline = TrainingPipeline()
+    if args.incremental:
+        print(pipeline.run_incremental())
+    else:
+        pipeline.run_pipeline()
@@ -0,0 +1,131 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from src.engine_sentinel.logger import logger
+
+
+@dataclass
+class SlowRequestProfilerConfig:
+    """
+    Configuration for the opt-in slow request profiler.
+    While enabled, a background thread samples the stack of every in-flight
+    request each `interval_ms`. Requests that take longer than `threshold_ms`
+    get their samples written to `output_dir` as folded stacks
+    ("frame;frame;frame count" lines), the input format of flamegraph.pl and
+    speedscope. Set ENGINE_SENTINEL_PROFILE_SLOW_MS to enable it in the apps.
+    """
+    enabled: bool = field(default_factory=lambda: "ENGINE_SENTINEL_PROFILE_SLOW_MS" in os.environ)
+    threshold_ms: float = field(default_factory=lambda: float(os.environ.get("ENGINE_SENTINEL_PROFILE_SLOW_MS") or 100.0))
+    interval_ms: float = 5.0
+    output_dir: str = os.path.join('artifacts', 'profiles')
+    max_files: int = 1000
+
+
+class _RequestSamples:
+    __slots__ = ("label", "thread_id", "started", "stacks")
+
+    def __init__(self, label, thread_id):
+        self.label = label
+        self.thread_id = thread_id
+        self.started = time.perf_counter()
+        self.stacks = Counter()
+
+
+class SlowRequestProfiler:
+    """
+    Sampling profiler for slow requests. `begin()` registers the calling
+    thread's request and `end()` decides whether its samples are kept.
+    Under asyncio every request runs on the event loop thread, so samples show
+    what the loop was doing while the request was in flight.
+    """
+    def __init__(self, config: SlowRequestProfilerConfig = None):
+        self.config = config or SlowRequestProfilerConfig()
+        self.dumped = 0
+        self._active = {}
+        self._lock = threading.Lock()
+        self._sampler_pid = None
+
+    def begin(self, label: str):
+        """
+        Starts sampling the current thread. Returns a token for `end()`, or
+        None when profiling is disabled.
+        """
+        if not self.config.enabled:
+            return None
+        if self._sampler_pid != os.getpid():
+            self._start_sampler()
+        samples = _RequestSamples(label, threading.get_ident())
+        with self._lock:
+            self._active[id(samples)] = samples
+        return samples
+
+    def end(self, samples):
+        """
+        Stops sampling a request and, if it was slow, writes its folded stacks.
+
+        Returns:
+            str: The written file, or None.
+        """
+        if samples is None:
+            return None
+        with self._lock:
+            self._active.pop(id(samples), None)
+        elapsed_ms = (time.perf_counter() - samples.started) * 1000.0
+        if elapsed_ms < self.config.threshold_ms or not samples.stacks or self.dumped >= self.config.max_files:
+            return None
+        return self._dump(samples, elapsed_ms)
+
+    def _dump(self, samples, elapsed_ms):
+        try:
+            os.makedirs(self.config.output_dir, exist_ok=True)
+            name = "".join(c if c.isalnum() else "_" for c in samples.label).strip("_") or "request"
+            file_path = os.path.join(
+                self.config.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{name}-{elapsed_ms:.0f}ms.folded"
+            )
+            with open(file_path, "w") as file_obj:
+                for stack, count in samples.stacks.most_common():
+                    file_obj.write(f"{stack} {count}\n")
+            self.dumped += 1
+            logger.warning(f"Slow request {samples.label} took {elapsed_ms:.0f}ms; stacks written to {file_path}")
+            return file_path
+        except OSError as e:
+            logger.error(f"Could not write profile for {samples.label}: {e}")
+            return None
+
+    def _start_sampler(self):
+        with self._lock:
+            if self._sampler_pid == os.getpid():
+                return
+            self._sampler_pid = os.getpid()
+            threading.Thread(target=self._sample_forever, name="slow-request-profiler", daemon=True).start()
+
+    def _sample_forever(self):
+        interval = self.config.interval_ms / 1000.0
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                active = list(self._active.values())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for samples in active:
+                frame = frames.get(samples.thread_id)
+                if frame is not None and samples.thread_id != own_id:
+                    samples.stacks[_fold(frame)] += 1
+
+
+def _fold(frame):
+    """
+    Renders a stack root-first as 'function (file:line);...'.
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
@@ -0,0 +1,249 @@
+import json
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.utils import FEATURE_COLUMNS, OP_SETTING_COLUMNS, SENSOR_COLUMNS
+
+# The regime index is fitted on the training data during transformation and
+# saved as one .npz file:
+#   settings  - op settings that locate the regime (the ones the schema keeps)
+#   decimals  - rounding applied to each setting before the centroid lookup
+#   centroids - (n_regimes, n_settings) quantized regime centres
+#   scale     - per-setting distance scale (range of the centroids)
+#   sensors   - normalized sensors, in FEATURE_COLUMNS order
+#   mean, std - (n_regimes, n_sensors) float32 statistics of each regime
+# FD001/FD003 run at a single condition; their index has one regime and is
+# inactive, so their sensors are left as recorded.
+REGIME_INDEX_FORMAT_VERSION = 1
+# Rows processed per chunk, so the per-chunk temporaries stay in cache
+CHUNK_ROWS = 1 << 15
+
+
+@dataclass
+class RegimeIndexConfig:
+    """
+    Rules for finding the operating regimes.
+    Op settings are rounded to `decimals` (one entry per OP_SETTING_COLUMNS
+    column), which collapses the measurement noise around each flight
+    condition. Distinct rounded combinations holding less than
+    `min_regime_fraction` of the rows are treated as noise; when more than
+    `max_regimes` remain they are merged by k-means.
+    A regime sensor whose std is below `min_std` is only centred.
+    """
+    decimals: tuple = (0, 2, 0)
+    max_regimes: int = 6
+    min_regime_fraction: float = 0.01
+    kmeans_iterations: int = 25
+    min_std: float = 1e-6
+
+
+class RegimeIndex:
+    """
+    Operating-regime centroids and per-regime sensor statistics.
+
+    Assignment and normalization are whole-array operations: the distance of
+    every row to each centroid is computed column by column, and each row's
+    regime offset and scale (full-width tables, identity for the columns that
+    are not normalized) are gathered with one take, chunk by chunk. The cost
+    per row is a few dozen float operations and there is no per-row Python.
+    """
+    def __init__(self, settings, decimals, centroids, scale, sensors, mean, std):
+        self.settings = list(settings)
+        self.decimals = np.asarray(decimals, dtype=np.int64)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.sensors = list(sensors)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.std = np.asarray(std, dtype=np.float32)
+        self.setting_index = np.array([FEATURE_COLUMNS.index(name) for name in self.settings], dtype=np.intp)
+        self.sensor_index = np.array([FEATURE_COLUMNS.index(name) for name in self.sensors], dtype=np.intp)
+        self._inv_scale = (1.0 / self.scale).astype(np.float32)
+        self._offset = np.zeros((len(self.centroids), len(FEATURE_COLUMNS)), dtype=np.float32)
+        self._factor = np.ones((len(self.centroids), len(FEATURE_COLUMNS)), dtype=np.float32)
+        self._offset[:, self.sensor_index] = self.mean
+        self._factor[:, self.sensor_index] = 1.0 / self.std
+
+    @property
+    def n_regimes(self):
+        return len(self.centroids)
+
+    @property
+    def active(self):
+        """
+        True when the data has more than one regime to normalize across.
+        """
+        return self.n_regimes > 1 and len(self.sensors) > 0
+
+    @classmethod
+    def fit(cls, raw, columns=None, config: RegimeIndexConfig = None):
+        """
+        Finds the regimes and their sensor statistics.
+
+        Args:
+            raw (np.ndarray): (n_rows, 24) training readings in FEATURE_COLUMNS order.
+            columns (list): Raw columns to use (e.g. the feature schema's
+                input_columns); defaults to all of FEATURE_COLUMNS.
+            config (RegimeIndexConfig): Regime rules.
+
+        Returns:
+            RegimeIndex: The fitted index (inactive for single-condition data).
+        """
+        try:
+            config = config or RegimeIndexConfig()
+            columns = set(FEATURE_COLUMNS if columns is None else columns)
+            settings = [name for name in OP_SETTING_COLUMNS if name in columns]
+            sensors = [name for name in SENSOR_COLUMNS if name in columns]
+            decimals = [config.decimals[OP_SETTING_COLUMNS.index(name)] for name in settings]
+            raw = np.asarray(raw, dtype=np.float32)
+            n_sensors = len(sensors)
+
+            if not settings or not len(raw):
+                return cls(settings, decimals, np.zeros((1, len(settings))), np.ones(len(settings)), sensors,
+                           np.zeros((1, n_sensors)), np.ones((1, n_sensors)))
+
+            quantized = _quantize(raw[:, [FEATURE_COLUMNS.index(name) for name in settings]], decimals)
+            combos, counts = np.unique(quantized, axis=0, return_counts=True)
+            frequent = counts >= config.min_regime_fraction * len(raw)
+            if frequent.any():
+                combos, counts = combos[frequent], counts[frequent]
+            # Most common conditions first, so regime numbers are stable across refits
+            order = np.argsort(-counts, kind="stable")
+            combos, counts = combos[order].astype(np.float64), counts[order]
+
+            if len(combos) > config.max_regimes:
+                centroids = _weighted_kmeans(combos, counts, config.max_regimes, config.kmeans_iterations)
+            else:
+                centroids = combos
+            spread = centroids.max(axis=0) - centroids.min(axis=0)
+            scale = np.where(spread > 0, spread, 1.0)
+
+            index = cls(settings, decimals, centroids, scale, sensors,
+                        np.zeros((len(centroids), n_sensors)), np.ones((len(centroids), n_sensors)))
+            if not index.active:
+                return index
+
+            # Per-regime mean and std of each sensor (two passes, in float64)
+            regime = index.assign(raw).astype(np.intp)
+            values = raw[:, index.sensor_index].astype(np.float64)
+            n_rows = np.bincount(regime, minlength=index.n_regimes).astype(np.float64)[:, None]
+            sums = _regime_sums(regime, values, index.n_regimes)
+            mean = np.divide(sums, n_rows, out=np.zeros_like(sums), where=n_rows > 0)
+            squares = _regime_sums(regime, (values - mean[regime]) ** 2, index.n_regimes)
+            std = np.sqrt(np.divide(squares, n_rows, out=np.zeros_like(squares), where=n_rows > 0))
+            std = np.where(std >= config.min_std, std, 1.0)
+            return cls(settings, decimals, centroids, scale, sensors, mean, std)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def assign(self, raw):
+        """
+        Returns the regime number (uint8) of every row of a (n_rows, 24) raw matrix.
+        """
+        raw = np.asarray(raw)
+        regime = np.zeros(len(raw), dtype=np.uint8)
+        if self.n_regimes > 1:
+            for start in range(0, len(raw), CHUNK_ROWS):
+                regime[start:start + CHUNK_ROWS] = self._assign_chunk(raw[start:start + CHUNK_ROWS])
+        return regime
+
+    def _assign_chunk(self, raw):
+        quantized = _quantize(raw[:, self.setting_index], self.decimals)
+        distance = np.zeros((len(raw), self.n_regimes), dtype=np.float32)
+        for j in range(len(self.settings)):
+            delta = (quantized[:, j, None] - self.centroids[None, :, j]) * self._inv_scale[j]
+            distance += delta * delta
+        return distance.argmin(axis=1)
+
+    def normalize(self, raw):
+        """
+        Replaces the sensors of a (n_rows, 24) raw matrix by their per-regime
+        z-scores. Returns a new float32 matrix; op settings and unnormalized
+        columns are copied unchanged. Inactive indexes return the input.
+        """
+        raw = np.asarray(raw, dtype=np.float32)
+        if not self.active or not len(raw):
+            return raw
+        out = np.empty_like(raw)
+        table = np.empty((min(len(raw), CHUNK_ROWS), raw.shape[1]), dtype=np.float32)
+        for start in range(0, len(raw), CHUNK_ROWS):
+            chunk, target = raw[start:start + CHUNK_ROWS], out[start:start + CHUNK_ROWS]
+            gathered = table[:len(chunk)]
+            regime = self._assign_chunk(chunk)
+            np.take(self._offset, regime, axis=0, out=gathered)
+            np.subtract(chunk, gathered, out=target)
+            np.take(self._factor, regime, axis=0, out=gathered)
+            target *= gathered
+        return out
+
+    # --- Persistence ---
+
+    def save(self, file_path):
+        """
+        Saves the index to one .npz file.
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            meta = {"format_version": REGIME_INDEX_FORMAT_VERSION, "settings": self.settings, "sensors": self.sensors}
+            tmp_path = f"{file_path}.tmp-{os.getpid()}.npz"
+            np.savez(tmp_path, meta=np.array(json.dumps(meta)), decimals=self.decimals, centroids=self.centroids,
+                     scale=self.scale, mean=self.mean, std=self.std)
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def load(cls, file_path):
+        try:
+            with np.load(file_path) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("format_version") != REGIME_INDEX_FORMAT_VERSION:
+                    raise ValueError(f"Unsupported regime index format: {meta.get('format_version')}")
+                return cls(meta["settings"], data["decimals"], data["centroids"], data["scale"], meta["sensors"],
+                           data["mean"], data["std"])
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def _quantize(settings, decimals):
+    """
+    Rounds each op setting column to its number of decimals (float32).
+    """
+    quantized = np.empty(settings.shape, dtype=np.float32)
+    for j, places in enumerate(decimals):
+        np.round(settings[:, j], int(places), out=quantized[:, j])
+    return quantized
+
+
+def _regime_sums(regime, values, n_regimes):
+    """
+    Column sums of `values` per regime, as a (n_regimes, n_columns) array.
+    """
+    return np.stack([np.bincount(regime, weights=values[:, j], minlength=n_regimes)
+                     for j in range(values.shape[1])], axis=1).reshape(n_regimes, values.shape[1])
+
+
+def _weighted_kmeans(points, weights, k, iterations):
+    """
+    Lloyd's k-means on the distinct rounded settings, weighted by their row
+    counts and started from the `k` most frequent (the first `k` points).
+    Distances use the range of each column, like RegimeIndex.assign.
+    """
+    spread = points.max(axis=0) - points.min(axis=0)
+    scaled = points / np.where(spread > 0, spread, 1.0)
+    centres = scaled[:k].copy()
+    weights = np.asarray(weights, dtype=np.float64)
+    for _ in range(iterations):
+        label = ((scaled[:, None, :] - centres[None]) ** 2).sum(axis=2).argmin(axis=1)
+        total = np.bincount(label, weights=weights, minlength=k)
+        moved = np.stack([np.bincount(label, weights=weights * scaled[:, j], minlength=k)
+                          for j in range(scaled.shape[1])], axis=1)
+        updated = np.where(total[:, None] > 0, moved / np.maximum(total, 1e-12)[:, None], centres)
+        if np.allclose(updated, centres):
+            break
+        centres = updated
+    return centres * np.where(spread > 0, spread, 1.0)
@@ -0,0 +1,126 @@
+import os
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from threadpoolctl import threadpool_limits
+
+from src.engine_sentinel.logger import logger
+from src.engine_sentinel.metrics import record_stage
+
+
+@dataclass
+class CpuBudgetConfig:
+    """
+    How training splits its CPU budget.
+
+    `cores` is the total budget (default: every CPU this process may run on).
+    It is divided between `outer_jobs` (fits running side by side, i.e.
+    candidates x folds) and `inner_threads` (LightGBM/BLAS threads inside one
+    fit). Leave either unset to derive it from the other and the workload, so
+    that outer_jobs * inner_threads never exceeds `cores`.
+    """
+    cores: int = None
+    outer_jobs: int = None
+    inner_threads: int = None
+
+
+def available_cores() -> int:
+    """
+    Number of CPUs this process is allowed to use (honours affinity masks and
+    container CPU sets where the platform exposes them).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class CpuScheduler:
+    """
+    Splits a fixed core budget between outer and inner parallelism, so that
+    parallel fits do not each start a full set of OpenMP threads.
+
+    Outer parallelism uses threads: LightGBM releases the GIL while it trains,
+    and threads share the binned datasets instead of copying them into worker
+    processes. Every fit is then given `inner` threads explicitly.
+    """
+    def __init__(self, config: CpuBudgetConfig = None):
+        self.config = config or CpuBudgetConfig()
+        self.cores = max(1, self.config.cores or available_cores())
+
+    def plan(self, n_tasks: int):
+        """
+        Returns (outer_jobs, inner_threads) for `n_tasks` independent fits.
+        """
+        config = self.config
+        n_tasks = max(1, n_tasks)
+        if config.outer_jobs and config.inner_threads:
+            # Both set: keep the outer split and shrink the inner one to fit the budget
+            outer = min(n_tasks, config.outer_jobs, self.cores)
+            inner = max(1, min(config.inner_threads, self.cores // outer))
+            if outer * inner < config.outer_jobs * config.inner_threads:
+                logger.warning(
+                    f"CPU split {config.outer_jobs} x {config.inner_threads} exceeds {self.cores} core(s) "
+                    f"or {n_tasks} task(s); using {outer} x {inner}"
+                )
+            return outer, inner
+        if config.inner_threads:
+            inner = min(config.inner_threads, self.cores)
+            return max(1, min(n_tasks, self.cores // inner)), inner
+        outer = min(n_tasks, config.outer_jobs or self.cores, self.cores)
+        return outer, max(1, self.cores // outer)
+
+    @contextmanager
+    def limit(self, threads: int):
+        """
+        Caps the native thread pools (OpenMP, BLAS) of this process to `threads`.
+        """
+        with threadpool_limits(limits=threads):
+            yield
+
+    def map(self, function, items, outer: int, inner: int):
+        """
+        Calls `function` on every item with at most `outer` running at once,
+        each limited to `inner` native threads. Returns results in order.
+        """
+        items = list(items)
+        with self.limit(inner):
+            if outer <= 1 or len(items) <= 1:
+                return [function(item) for item in items]
+            with ThreadPoolExecutor(max_workers=outer) as executor:
+                return list(executor.map(function, items))
+
+    @contextmanager
+    def measure(self, label: str):
+        """
+        Measures wall time and the CPU time of this process and its reaped
+        children. Yields a dict that is filled in on exit with
+        'wall_seconds', 'cpu_seconds', 'cores' and 'utilisation' (the fraction
+        of the core budget kept busy).
+        """
+        report = {"label": label, "cores": self.cores}
+        cpu_before = _cpu_seconds()
+        started = time.perf_counter()
+        try:
+            yield report
+        finally:
+            wall = time.perf_counter() - started
+            cpu = _cpu_seconds() - cpu_before
+            report.update(
+                wall_seconds=wall,
+                cpu_seconds=cpu,
+                utilisation=cpu / (wall * self.cores) if wall > 0 else 0.0,
+            )
+            logger.info(
+                f"{label}: {wall:.1f}s wall, {cpu:.1f}s CPU, "
+                f"{report['utilisation']:.0%} utilisation of {self.cores} core(s)"
+            )
+            record_stage({"stage": label, "wall_seconds": wall, "cpu_seconds": cpu})
+
+
+def _cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.utils import compact_dtype
+
+# The feature schema is fitted on the training data during transformation and
+# saved next to the rolling feature definition (and into the model metadata):
+#   input_columns - raw readings the model uses, in FEATURE_COLUMNS order
+#   dropped       - pruned raw columns and why ('constant', 'near_zero_variance',
+#                   'duplicate_of:<column>')
+#   dtypes        - compact dtype of every column of the transformed data
+# Pruned sensors get no rolling features, so the transformed data, the model
+# and the per-request feature computation all shrink with them.
+FEATURE_SCHEMA_FORMAT_VERSION = 1
+
+
+@dataclass
+class FeatureSchemaConfig:
+    """
+    Rules for pruning raw feature columns.
+    A column is near-zero-variance when its most common value is more than
+    `max_frequency_ratio` times as frequent as the second most common and it
+    has fewer than `min_unique_fraction` distinct values per row (the usual
+    nzv rule). A column whose absolute correlation with an earlier kept
+    column reaches `max_correlation` is redundant.
+    """
+    max_frequency_ratio: float = 19.0
+    min_unique_fraction: float = 0.1
+    max_correlation: float = 0.999
+
+
+class FeatureSchema:
+    """
+    Raw input columns kept for the model and the dtypes of the transformed data.
+    """
+    def __init__(self, input_columns, dropped=None, dtypes=None):
+        self.input_columns = list(input_columns)
+        self.dropped = dict(dropped or {})
+        self.dtypes = dict(dtypes or {})
+
+    @classmethod
+    def fit(cls, values, columns, config: FeatureSchemaConfig = None):
+        """
+        Decides which raw columns to keep.
+
+        Args:
+            values (np.ndarray): (n_rows, n_columns) training readings.
+            columns (list): Names of the columns of `values`.
+            config (FeatureSchemaConfig): Pruning rules.
+
+        Returns:
+            FeatureSchema: The schema, without dtypes (see `record_dtypes`).
+        """
+        try:
+            config = config or FeatureSchemaConfig()
+            values = np.asarray(values)
+            n_rows = len(values)
+            dropped = {}
+            candidates = []
+            for j, name in enumerate(columns):
+                _, counts = np.unique(values[:, j], return_counts=True)
+                if len(counts) <= 1:
+                    dropped[name] = "constant"
+                    continue
+                top = np.partition(counts, len(counts) - 2)[-2:]
+                if top[1] > config.max_frequency_ratio * top[0] and len(counts) < config.min_unique_fraction * n_rows:
+                    dropped[name] = "near_zero_variance"
+                    continue
+                candidates.append(j)
+
+            kept = []
+            if candidates:
+                correlation = np.abs(np.corrcoef(values[:, candidates].astype(np.float64), rowvar=False))
+                correlation = np.atleast_2d(correlation)
+                for position, j in enumerate(candidates):
+                    duplicate = next(
+                        (k for k in kept if correlation[position, candidates.index(k)] >= config.max_correlation), None
+                    )
+                    if duplicate is None:
+                        kept.append(j)
+                    else:
+                        dropped[columns[j]] = f"duplicate_of:{columns[duplicate]}"
+            return cls([columns[j] for j in kept], dropped)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def record_dtypes(self, df):
+        """
+        Downcasts the columns of `df` to their compact dtypes (float32 for
+        readings and features, the smallest integer type for ids) and records
+        them in the schema.
+
+        Returns:
+            pd.DataFrame: The downcast frame.
+        """
+        dtypes = {name: compact_dtype(df[name].to_numpy()) for name in df.columns}
+        self.dtypes = {str(name): np.dtype(dtype).name for name, dtype in dtypes.items()}
+        changed = {name: dtype for name, dtype in dtypes.items() if df[name].dtype != dtype}
+        return df.astype(changed, copy=False) if changed else df
+
+    def prune_sensors(self, sensors):
+        """
+        Returns the sensors of `sensors` that the schema keeps.
+        """
+        kept = set(self.input_columns)
+        return tuple(sensor for sensor in sensors if sensor in kept)
+
+    def to_dict(self):
+        return {
+            "format_version": FEATURE_SCHEMA_FORMAT_VERSION,
+            "input_columns": self.input_columns,
+            "dropped": self.dropped,
+            "dtypes": self.dtypes,
+        }
+
+    @classmethod
+    def from_dict(cls, values):
+        if values.get("format_version") != FEATURE_SCHEMA_FORMAT_VERSION:
+            raise ValueError(f"Unsupported feature schema format: {values.get('format_version')}")
+        return cls(values["input_columns"], values.get("dropped"), values.get("dtypes"))
+
+    # --- Persistence ---
+
+    def save(self, file_path):
+        try:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            with open(file_path, "w") as file_obj:
+                json.dump(self.to_dict(), file_obj, indent=2)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def load(cls, file_path):
+        try:
+            with open(file_path) as file_obj:
+                return cls.from_dict(json.load(file_obj))
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,394 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from src.engine_sentinel.exception import CustomException
+from src.engine_sentinel.logger import logger
+from src.engine_sentinel.utils import content_sha256
+
+# Experiment tracking is offline first: runs are appended to a local file store
+# by a background thread and never touch the network while the pipeline runs.
+# Each run is a directory under TrackingConfig.local_dir:
+#   events.jsonl  - one JSON object per params/metrics/tags/artifact/end event
+#   upload.json   - written once the run has been uploaded to a remote server;
+#                   upload.json.partial records the remote run id and the steps
+#                   already sent while an upload is in progress
+# Artifacts are recorded as references (path + content hash), not copies; the
+# files themselves are only read when the run is uploaded, and only if they
+# still have the recorded hash.
+EVENTS_FILE = "events.jsonl"
+UPLOAD_FILE = "upload.json"
+
+
+@dataclass
+class TrackingConfig:
+    """
+    Configuration for experiment tracking.
+    mode:
+      'offline' - record runs in `local_dir` only (default);
+      'remote'  - record locally, then upload pending runs to `tracking_uri`
+                  after the pipeline, giving up after `upload_timeout` seconds
+                  (runs stay pending and go with the next upload);
+      'off'     - record nothing.
+    Pending runs can also be uploaded later with
+    `python -m src.engine_sentinel.tracking upload`.
+    The environment defaults are read when a config is created.
+    """
+    mode: str = field(default_factory=lambda: os.environ.get("ENGINE_SENTINEL_TRACKING", "offline"))
+    local_dir: str = os.path.join('artifacts', 'tracking')
+    tracking_uri: str = field(default_factory=lambda: os.environ.get("MLFLOW_TRACKING_URI"))
+    registry_uri: str = field(default_factory=lambda: os.environ.get("MLFLOW_REGISTRY_URI"))
+    experiment_name: str = "EngineSentinel"
+    registered_model_name: str = None
+    upload_timeout: float = 30.0
+
+
+class TrackingRun:
+    """
+    A run being recorded. Every call only enqueues an event; the tracker's
+    writer thread appends it to the run's events file.
+    """
+    def __init__(self, tracker, run_id, run_dir):
+        self.tracker = tracker
+        self.run_id = run_id
+        self.run_dir = run_dir
+
+    def log_params(self, params: dict):
+        self.tracker._put(self, {"type": "params", "values": {key: str(value) for key, value in params.items()}})
+
+    def log_metrics(self, metrics: dict, step: int = 0):
+        self.tracker._put(self, {
+            "type": "metrics", "values": {key: float(value) for key, value in metrics.items()},
+            "step": step, "timestamp": int(time.time() * 1000),
+        })
+
+    def set_tags(self, tags: dict):
+        self.tracker._put(self, {"type": "tags", "values": {key: str(value) for key, value in tags.items()}})
+
+    def log_artifact(self, path: str, artifact_path: str = None):
+        """
+        Records a reference to an existing file or directory. The content hash
+        is computed by the writer thread, so this returns immediately.
+        """
+        self.tracker._put(self, {
+            "type": "artifact", "path": os.path.abspath(path),
+            "artifact_path": artifact_path or os.path.basename(os.path.normpath(path)),
+        })
+
+    def end(self, status: str = "FINISHED"):
+        self.tracker._put(self, {"type": "end", "status": status, "timestamp": int(time.time() * 1000)})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end("FAILED" if exc_type else "FINISHED")
+        return False
+
+
+class OfflineTracker:
+    """
+    Records runs to the local file store through a background writer thread.
+    """
+    def __init__(self, config: TrackingConfig = None):
+        self.config = config or TrackingConfig()
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def start_run(self, run_name: str = None, tags: dict = None):
+        """
+        Starts a run. Returns a TrackingRun, usable as a context manager.
+        """
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        run = TrackingRun(self, run_id, os.path.join(self.config.local_dir, run_id))
+        self._put(run, {
+            "type": "start", "run_name": run_name or run_id, "experiment": self.config.experiment_name,
+            "timestamp": int(time.time() * 1000),
+        })
+        if tags:
+            run.set_tags(tags)
+        return run
+
+    def flush(self):
+        """
+        Blocks until every event enqueued so far is written.
+        """
+        if self._writer is not None:
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+
+    def _put(self, run, event):
+        if self.config.mode == "off":
+            return
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._write_forever, name="tracking-writer", daemon=True)
+                    self._writer.start()
+                    atexit.register(self.flush)
+        self._queue.put((run.run_dir, event))
+
+    def _write_forever(self):
+        while True:
+            item = self._queue.get()
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            run_dir, event = item
+            try:
+                if event["type"] == "artifact":
+                    event["sha256"] = content_sha256(event["path"]) if os.path.exists(event["path"]) else None
+                os.makedirs(run_dir, exist_ok=True)
+                with open(os.path.join(run_dir, EVENTS_FILE), "a") as file_obj:
+                    file_obj.write(json.dumps(event) + "\n")
+            except Exception as e:
+                # Tracking must never take the pipeline down
+                logger.error(f"Could not record tracking event in {run_dir}: {e}")
+
+
+_tracker = None
+
+
+def get_tracker(config: TrackingConfig = None):
+    """
+    Returns the process-wide tracker, creating it on first use. A `config`
+    that differs from the current tracker's replaces it (after the events
+    queued so far are written); runs already started keep their tracker.
+    """
+    global _tracker
+    if _tracker is None:
+        _tracker = OfflineTracker(config)
+    elif config is not None and config != _tracker.config:
+        logger.warning(f"Tracking reconfigured from {_tracker.config} to {config}")
+        _tracker.flush()
+        _tracker = OfflineTracker(config)
+    return _tracker
+
+
+def read_run(run_dir):
+    """
+    Folds a run's events into one dict: params, tags, metric history,
+    artifact references, status and start/end times.
+    """
+    run = {"params": {}, "tags": {}, "metrics": [], "artifacts": [], "status": "RUNNING"}
+    with open(os.path.join(run_dir, EVENTS_FILE)) as file_obj:
+        for line in file_obj:
+            event = json.loads(line)
+            kind = event["type"]
+            if kind == "start":
+                run.update(run_name=event["run_name"], experiment=event["experiment"], start_time=event["timestamp"])
+            elif kind in ("params", "tags"):
+                run[kind].update(event["values"])
+            elif kind == "metrics":
+                run["metrics"].extend(
+                    (key, value, event["timestamp"], event["step"]) for key, value in event["values"].items()
+                )
+            elif kind == "artifact":
+                run["artifacts"].append(event)
+            elif kind == "end":
+                run.update(status=event["status"], end_time=event["timestamp"])
+    return run
+
+
+def pending_runs(config: TrackingConfig = None):
+    """
+    Lists the finished runs in the local store that were not uploaded yet.
+    """
+    config = config or TrackingConfig()
+    if not os.path.isdir(config.local_dir):
+        return []
+    runs = []
+    for name in sorted(os.listdir(config.local_dir)):
+        run_dir = os.path.join(config.local_dir, name)
+        if os.path.exists(os.path.join(run_dir, UPLOAD_FILE)) or not os.path.exists(os.path.join(run_dir, EVENTS_FILE)):
+            continue
+        if read_run(run_dir)["status"] != "RUNNING":
+            runs.append(run_dir)
+    return runs
+
+
+def upload_run(client, run_dir, config: TrackingConfig):
+    """
+    Uploads one recorded run with a single log_batch call plus its artifact
+    files, and marks it as uploaded. A run that failed halfway is resumed
+    under the same remote run id, skipping the steps that were already sent,
+    so its metrics are not logged twice. Artifacts that are gone or whose
+    content changed since the run recorded them are not uploaded (and a
+    skipped model is not registered); they are listed in the run's
+    'engine_sentinel.skipped_artifacts' tag.
+
+    Returns:
+        str: The remote run id.
+    """
+    from mlflow.entities import Metric, Param, RunTag
+
+    run = read_run(run_dir)
+    upload_path = os.path.join(run_dir, UPLOAD_FILE)
+    partial_path = f"{upload_path}.partial"
+    if os.path.exists(partial_path):
+        with open(partial_path) as file_obj:
+            progress = json.load(file_obj)
+        remote_run_id = progress["remote_run_id"]
+    else:
+        experiment = client.get_experiment_by_name(run["experiment"])
+        experiment_id = experiment.experiment_id if experiment else client.create_experiment(run["experiment"])
+        remote_run = client.create_run(
+            experiment_id, start_time=run["start_time"], run_name=run["run_name"],
+            tags={"engine_sentinel.local_run": os.path.basename(run_dir)},
+        )
+        remote_run_id = remote_run.info.run_id
+        progress = {"remote_run_id": remote_run_id}
+        _save_progress(partial_path, progress)
+
+    if not progress.get("batch_logged"):
+        client.log_batch(
+            remote_run_id,
+            metrics=[Metric(key, value, timestamp, step) for key, value, timestamp, step in run["metrics"]],
+            params=[Param(key, value) for key, value in run["params"].items()],
+            tags=[RunTag(key, value) for key, value in run["tags"].items()],
+        )
+        progress["batch_logged"] = True
+        _save_progress(partial_path, progress)
+    uploaded = set(progress.get("artifacts", []))
+    skipped = []
+    for artifact in run["artifacts"]:
+        path = artifact["path"]
+        if path in uploaded:
+            continue
+        if not os.path.exists(path):
+            logger.warning(f"Artifact {path} of run {run_dir} no longer exists; skipped")
+            skipped.append(artifact["artifact_path"])
+            continue
+        if content_sha256(path) != artifact.get("sha256"):
+            # Replaced since the run recorded it (e.g. by a retrain): uploading the
+            # current file would attach another model to this run
+            logger.warning(f"Artifact {path} changed since run {run_dir} recorded it; skipped")
+            skipped.append(artifact["artifact_path"])
+            continue
+        if os.path.isdir(path):
+            client.log_artifacts(remote_run_id, path, artifact["artifact_path"])
+        else:
+            client.log_artifact(remote_run_id, path, os.path.dirname(artifact["artifact_path"]) or None)
+        uploaded.add(path)
+        progress["artifacts"] = sorted(uploaded)
+        _save_progress(partial_path, progress)
+    if skipped:
+        client.set_tag(remote_run_id, "engine_sentinel.skipped_artifacts", ",".join(skipped))
+    client.set_terminated(remote_run_id, status=run["status"], end_time=run.get("end_time"))
+
+    model_uploaded = any(artifact["artifact_path"] == "model" and artifact["path"] in uploaded
+                         for artifact in run["artifacts"])
+    if config.registered_model_name and model_uploaded:
+        _register_model(client, config.registered_model_name, remote_run_id)
+
+    os.replace(partial_path, upload_path)
+    return remote_run_id
+
+
+def _save_progress(partial_path, progress):
+    tmp_path = f"{partial_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as file_obj:
+        json.dump(progress, file_obj)
+    os.replace(tmp_path, partial_path)
+
+
+def _register_model(client, name, run_id):
+    try:
+        if not client.search_registered_models(filter_string=f"name='{name}'"):
+            client.create_registered_model(name)
+        source = f"{client.get_run(run_id).info.artifact_uri}/model"
+        client.create_model_version(name, source, run_id=run_id)
+    except Exception as e:
+        logger.warning(f"Could not register model {name} for run {run_id}: {e}")
+
+
+def upload_pending(config: TrackingConfig = None):
+    """
+    Uploads every pending run to the configured MLflow server. Runs that
+    fail to upload stay pending.
+
+    Returns:
+        list: (run directory, remote run id or None) per pending run.
+    """
+    try:
+        config = config or TrackingConfig()
+        if not config.tracking_uri:
+            raise ValueError("No remote configured: set MLFLOW_TRACKING_URI or TrackingConfig.tracking_uri")
+
+        from mlflow.tracking import MlflowClient
+
+        client = MlflowClient(tracking_uri=config.tracking_uri, registry_uri=config.registry_uri)
+        results = []
+        for run_dir in pending_runs(config):
+            try:
+                results.append((run_dir, upload_run(client, run_dir, config)))
+                logger.info(f"Uploaded tracking run {run_dir} to {config.tracking_uri}")
+            except Exception as e:
+                logger.warning(f"Upload of tracking run {run_dir} failed, it stays pending: {e}")
+                results.append((run_dir, None))
+        return results
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def upload_pending_in_background(config: TrackingConfig = None):
+    """
+    Runs `upload_pending` on a daemon thread and waits at most
+    `config.upload_timeout` seconds for it, so an unreachable server cannot
+    hold up the caller. Whatever is not uploaded by then stays pending.
+
+    Returns:
+        bool: True if the upload finished in time.
+    """
+    config = config or TrackingConfig()
+    get_tracker().flush()
+    errors = []
+
+    def upload():
+        try:
+            upload_pending(config)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=upload, name="tracking-upload", daemon=True)
+    thread.start()
+    thread.join(config.upload_timeout)
+    if thread.is_alive():
+        logger.warning(f"Tracking upload still running after {config.upload_timeout}s; remaining runs stay pending")
+        return False
+    if errors:
+        logger.warning(f"Tracking upload failed: {errors[0]}")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline experiment tracking store.")
+    parser.add_argument("command", choices=["upload", "pending"])
+    parser.add_argument("--local-dir", default=TrackingConfig.local_dir)
+    parser.add_argument("--tracking-uri", default=os.environ.get("MLFLOW_TRACKING_URI"))
+    parser.add_argument("--registry-uri", default=os.environ.get("MLFLOW_REGISTRY_URI"))
+    parser.add_argument("--register-model", default=None, help="Register uploaded models under this name.")
+    args = parser.parse_args()
+
+    cli_config = TrackingConfig(
+        mode="remote", local_dir=args.local_dir, tracking_uri=args.tracking_uri,
+        registry_uri=args.registry_uri, registered_model_name=args.register_model,
+    )
+    if args.command == "pending":
+        for pending_dir in pending_runs(cli_config):
+            print(pending_dir)
+    else:
+        for pending_dir, remote_id in upload_pending(cli_config):
+            print(f"{pending_dir}\t{remote_id or 'FAILED'}")
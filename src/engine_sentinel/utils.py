@@ -1,8 +1,16 @@
 import os
 import sys
+import json
+import shutil
+import hashlib
 import dill
 import logging
 
+import numpy as np
+# pandas is imported inside the functions that build DataFrames, so importing
+# the package stays cheap. Loading a model still imports it: lightgbm pulls in
+# pandas, scipy and sklearn (~1.1-1.3s), paid once by the preloading master.
+
 from src.engine_sentinel.exception import CustomException
 
 def save_object(file_path, obj):
@@ -40,6 +48,167 @@ def load_object(file_path):
     except Exception as e:
         raise CustomException(e, sys)
 
+def file_sha256(file_path, chunk_size=1 << 20):
+    """
+    Returns the hex SHA-256 digest of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def content_sha256(path):
+    """
+    Returns the hex SHA-256 digest of a file, or of every file under a
+    directory (e.g. a columnar artifact) together with their relative paths.
+    """
+    if not os.path.isdir(path):
+        return file_sha256(path)
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+            digest.update(file_sha256(file_path).encode("utf-8"))
+    return digest.hexdigest()
+
+# --- Columnar Artifacts ---
+# Stages hand data to each other as a directory holding one .npy file per column
+# plus a schema.json sidecar. Columns are memory-mapped on load, so there is no
+# text parsing between stages.
+COLUMNAR_SCHEMA_FILE = "schema.json"
+COLUMNAR_FORMAT_VERSION = 1
+
+def compact_dtype(values):
+    """
+    Returns the smallest dtype that holds `values` without losing information
+    that matters to the model: integers are narrowed to the smallest signed type
+    that fits, floating point columns are stored as float32.
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.integer) or np.issubdtype(values.dtype, np.bool_):
+        if values.size == 0:
+            return np.dtype(np.int32)
+        low, high = values.min(), values.max()
+        for dtype in (np.int8, np.int16, np.int32, np.int64):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return np.dtype(dtype)
+    if np.issubdtype(values.dtype, np.floating):
+        return np.dtype(np.float32)
+    return values.dtype
+
+def save_columnar(dir_path, df, compact=True):
+    """
+    Saves a DataFrame as a columnar artifact directory (one .npy per column
+    plus schema.json). The directory is written next to its final location
+    and swapped in with a rename, so readers never see a partial artifact.
+    """
+    try:
+        parent_dir = os.path.dirname(dir_path) or "."
+        os.makedirs(parent_dir, exist_ok=True)
+        tmp_path = f"{dir_path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        columns = []
+        for index, name in enumerate(df.columns):
+            values = df[name].to_numpy()
+            dtype = compact_dtype(values) if compact else values.dtype
+            file_name = f"{index:03d}.npy"
+            np.save(os.path.join(tmp_path, file_name), np.ascontiguousarray(values, dtype=dtype))
+            columns.append({"name": str(name), "dtype": np.dtype(dtype).str, "file": file_name})
+
+        schema = {"format_version": COLUMNAR_FORMAT_VERSION, "n_rows": int(len(df)), "columns": columns}
+        with open(os.path.join(tmp_path, COLUMNAR_SCHEMA_FILE), "w") as file_obj:
+            json.dump(schema, file_obj, indent=2)
+
+        old_path = f"{dir_path}.old-{os.getpid()}"
+        if os.path.exists(dir_path):
+            os.replace(dir_path, old_path)
+        os.replace(tmp_path, dir_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        logging.info(f"Columnar artifact saved successfully to: {dir_path}")
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def load_columnar(dir_path, mmap=True, columns=None):
+    """
+    Loads a columnar artifact directory as a DataFrame.
+    With `mmap=True` the columns are memory-mapped read-only views of the files;
+    `columns` restricts loading to a subset of columns.
+    """
+    try:
+        with open(os.path.join(dir_path, COLUMNAR_SCHEMA_FILE)) as file_obj:
+            schema = json.load(file_obj)
+
+        wanted = None if columns is None else set(columns)
+        data = {}
+        for column in schema["columns"]:
+            if wanted is not None and column["name"] not in wanted:
+                continue
+            data[column["name"]] = np.load(
+                os.path.join(dir_path, column["file"]), mmap_mode="r" if mmap else None
+            )
+        if columns is not None:
+            data = {name: data[name] for name in columns}
+        import pandas as pd
+        return pd.DataFrame(data, copy=False)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def load_frame(file_path, columns=None):
+    """
+    Loads a stage artifact, either a columnar directory or (opt-in) CSV export.
+    """
+    if os.path.isdir(file_path):
+        return load_columnar(file_path, columns=columns)
+    import pandas as pd
+    return pd.read_csv(file_path, usecols=columns)
+
+def export_csv(df, file_path):
+    """
+    Writes the optional human-readable CSV copy of a stage artifact.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        df.to_csv(file_path, index=False, header=True)
+        logging.info(f"CSV export saved to: {file_path}")
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def raw_feature_matrix(df):
+    """
+    Reads the raw readings of a DataFrame into a (n_rows, 24) float32 matrix
+    in FEATURE_COLUMNS order. Columns absent from `df` (e.g. pruned by the
+    feature schema) are NaN.
+    """
+    raw = np.full((len(df), len(FEATURE_COLUMNS)), np.nan, dtype=np.float32)
+    for i, column in enumerate(FEATURE_COLUMNS):
+        if column in df.columns:
+            raw[:, i] = df[column].to_numpy(dtype=np.float32)
+    return raw
+
+# --- Dataset Layout (NASA C-MAPSS) ---
+# The model consumes the three operational settings followed by the 21 sensors,
+# in this order, wherever features are built (web form, batch files, training).
+OP_SETTING_COLUMNS = [f'op_setting_{i}' for i in range(1, 4)]
+SENSOR_COLUMNS = [f'sensor_{i}' for i in range(1, 22)]
+FEATURE_COLUMNS = OP_SETTING_COLUMNS + SENSOR_COLUMNS
+# Column order of the raw train/test text files
+RAW_COLUMNS = ['unit_number', 'time_in_cycles'] + FEATURE_COLUMNS
+# Identifier columns carried through the pipeline but never used as features;
+# unit numbers are only unique within a subset
+ID_COLUMNS = ['subset_id', 'unit_number', 'time_in_cycles']
+UNIT_KEY_COLUMNS = ['subset_id', 'unit_number']
+TARGET_COLUMN = 'RUL'
+
 # --- Hyperparameter Grid for LightGBM ---
 # Centralizing this configuration makes it easier to manage and reuse.
 LGBM_PARAM_GRID = {
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import lightgbm
+import numpy as np
+import pytest
+
+# Tests import the package as src.engine_sentinel, like the apps and benchmarks
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.engine_sentinel.components.data_ingestion import parse_cmapss_file  # noqa: E402
+from src.engine_sentinel.features import RollingFeatureConfig, RollingFeatureEngine, segment_bounds  # noqa: E402
+from src.engine_sentinel.model_artifact import save_model_artifact  # noqa: E402
+from src.engine_sentinel.pipeline.model_registry import ModelRegistry, ModelRegistryConfig  # noqa: E402
+from src.engine_sentinel.pipeline.predict_pipeline import PredictionPipeline  # noqa: E402
+from src.engine_sentinel.utils import FEATURE_COLUMNS  # noqa: E402
+
+TEST_FILE = os.path.join(PROJECT_ROOT, "data", "test_FD001.txt")
+
+
+@pytest.fixture(scope="session")
+def fleet():
+    """
+    (units, times, raw) of the first 3000 rows of data/test_FD001.txt.
+    """
+    if not os.path.exists(TEST_FILE):
+        pytest.skip(f"{TEST_FILE} not found")
+    table = parse_cmapss_file(TEST_FILE)[:3000]
+    return table[:, 0], table[:, 1], table[:, 2:].astype(np.float32)
+
+
+@pytest.fixture
+def make_pipeline():
+    """
+    Builds a PredictionPipeline around a model file, with its own registry and
+    no optional artifacts unless given.
+    """
+    def make(model_path, **paths):
+        paths = {"compiled_model_path": None, "feature_spec_path": None, "feature_schema_path": None,
+                 "regime_index_path": None, "drift_reference_path": None, **paths}
+        return PredictionPipeline(model_path=model_path,
+                                  registry=ModelRegistry(ModelRegistryConfig(watch_interval=0)), **paths)
+    return make
+
+
+@pytest.fixture
+def train_model(tmp_path):
+    """
+    Trains a small booster on named columns and saves it as a model artifact;
+    returns (booster, model_path).
+    """
+    def train(features, names, name="model"):
+        target = np.random.default_rng(0).uniform(0, 200, size=len(features))
+        booster = lightgbm.train({"objective": "regression", "verbose": -1, "seed": 0},
+                                 lightgbm.Dataset(features, target, feature_name=list(names)), num_boost_round=20)
+        return booster, save_model_artifact(str(tmp_path / name), booster)
+    return train
+
+
+@pytest.fixture
+def rolling_pipeline(tmp_path, fleet, make_pipeline, train_model):
+    """
+    A pipeline whose model reads rolling features of three sensors; returns
+    (pipeline, booster, model input of `fleet`).
+    """
+    units, times, raw = fleet
+    engine = RollingFeatureEngine(RollingFeatureConfig(sensors=("sensor_2", "sensor_7", "sensor_11"), windows=(5,)))
+    sensor_index = [FEATURE_COLUMNS.index(sensor) for sensor in engine.config.sensors]
+    segment_start, _ = segment_bounds(units)
+    features = np.hstack([raw, engine.compute(raw[:, sensor_index], segment_start, times)])
+    booster, model_path = train_model(features, FEATURE_COLUMNS + engine.feature_names())
+    spec_path = str(tmp_path / "feature_spec.json")
+    engine.save(spec_path)
+    return make_pipeline(model_path, feature_spec_path=spec_path), booster, features
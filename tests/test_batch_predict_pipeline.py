@@ -0,0 +1,133 @@
+"""
+BatchPredictionPipeline: the three payload formats parse to the same matrix,
+malformed payloads raise BatchSchemaError, columns pruned by the feature
+schema may be left out, and unit ids and cycles reach the rolling features.
+"""
+import io
+import json
+
+import numpy as np
+import pytest
+
+from src.engine_sentinel.pipeline.batch_predict_pipeline import BatchPredictionPipeline, BatchSchemaError
+from src.engine_sentinel.pipeline.predict_pipeline import SnapshotScoringError
+from src.engine_sentinel.schema import FeatureSchema
+from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+PRUNED = ["op_setting_3", "sensor_1"]
+KEPT = [column for column in FEATURE_COLUMNS if column not in PRUNED]
+
+
+@pytest.fixture
+def rows(fleet):
+    units, times, raw = fleet
+    return units[:40].astype(int).tolist(), times[:40].tolist(), raw[:40]
+
+
+@pytest.fixture
+def pruned_batch(tmp_path, fleet, make_pipeline, train_model):
+    raw = fleet[2]
+    booster, model_path = train_model(raw[:, [FEATURE_COLUMNS.index(column) for column in KEPT]], KEPT)
+    schema_path = str(tmp_path / "feature_schema.json")
+    FeatureSchema(KEPT, {column: "constant" for column in PRUNED}).save(schema_path)
+    pipeline = make_pipeline(model_path, feature_schema_path=schema_path)
+    return BatchPredictionPipeline(prediction_pipeline=pipeline), booster
+
+
+def columnar(units, times, raw, columns=FEATURE_COLUMNS):
+    payload = {column: raw[:, FEATURE_COLUMNS.index(column)].tolist() for column in columns}
+    payload.update(unit_number=units, time_in_cycles=times)
+    return payload
+
+
+def as_csv(units, times, raw, columns=FEATURE_COLUMNS):
+    lines = [",".join(["unit_number", "time_in_cycles"] + list(columns))]
+    for unit, time, row in zip(units, times, raw):
+        lines.append(",".join([str(unit), str(time)] + [repr(float(row[FEATURE_COLUMNS.index(c)])) for c in columns]))
+    return io.StringIO("\n".join(lines))
+
+
+def as_ndjson(units, times, raw, columns=FEATURE_COLUMNS):
+    for unit, time, row in zip(units, times, raw):
+        record = {column: float(row[FEATURE_COLUMNS.index(column)]) for column in columns}
+        yield json.dumps({"unit_number": unit, "time_in_cycles": time, **record}).encode() + b"\n"
+
+
+def test_formats_parse_to_the_same_rows(pruned_batch, rows):
+    batch, _ = pruned_batch
+    units, times, raw = rows
+    parsed = [batch.parse_columnar_json(columnar(*rows)), batch.parse_csv(as_csv(*rows)),
+              batch.parse_ndjson(as_ndjson(*rows))]
+    for matrix, ids, cycles in parsed:
+        np.testing.assert_array_equal(matrix, raw)
+        assert ids == units
+        np.testing.assert_array_equal(cycles, times)
+
+
+def test_pruned_columns_may_be_left_out(pruned_batch, rows):
+    batch, booster = pruned_batch
+    units, times, raw = rows
+    expected = booster.predict(raw[:, [FEATURE_COLUMNS.index(column) for column in KEPT]])
+    for parse, payload in ((batch.parse_columnar_json, columnar(*rows, columns=KEPT)),
+                           (batch.parse_csv, as_csv(*rows, columns=KEPT)),
+                           (batch.parse_ndjson, as_ndjson(*rows, columns=KEPT))):
+        matrix, ids, cycles = parse(payload)
+        assert np.isnan(matrix[:, [FEATURE_COLUMNS.index(column) for column in PRUNED]]).all()
+        np.testing.assert_allclose(batch.predict(matrix, ids, cycles), expected, rtol=1e-6)
+
+
+@pytest.mark.parametrize("payload, message", [
+    ([1, 2], "must be an object"),
+    (None, "must be an object"),
+    ({"sensor_2": [1.0]}, "Missing required feature columns"),
+    ("wrong_length", "expected 40"),
+    ("not_a_list", "must be a list"),
+    ("text_value", "non-numeric"),
+    ("bad_times", "non-numeric"),
+])
+def test_columnar_json_errors(pruned_batch, rows, payload, message):
+    batch, _ = pruned_batch
+    if isinstance(payload, str):
+        body = columnar(*rows, columns=KEPT)
+        if payload == "wrong_length":
+            body["sensor_2"] = body["sensor_2"][:-1]
+        elif payload == "not_a_list":
+            body["sensor_2"] = 5
+        elif payload == "text_value":
+            body["sensor_2"][3] = "high"
+        else:
+            body["time_in_cycles"][0] = "first"
+        payload = body
+    with pytest.raises(BatchSchemaError, match=message):
+        batch.parse_columnar_json(payload)
+
+
+def test_ndjson_errors(pruned_batch, rows):
+    batch, _ = pruned_batch
+    lines = list(as_ndjson(*rows, columns=KEPT))
+    with pytest.raises(BatchSchemaError, match="Line 2 is not valid JSON"):
+        batch.parse_ndjson([lines[0], b"{oops\n"])
+    with pytest.raises(BatchSchemaError, match="Line 2 must be a JSON object"):
+        batch.parse_ndjson([lines[0], b"[1, 2]\n"])
+    record = json.loads(lines[1])
+    del record["sensor_2"]
+    with pytest.raises(BatchSchemaError, match="Line 2 is missing a feature"):
+        batch.parse_ndjson([lines[0], json.dumps(record)])
+
+
+def test_csv_errors(pruned_batch):
+    batch, _ = pruned_batch
+    with pytest.raises(BatchSchemaError, match="Missing required feature columns"):
+        batch.parse_csv(io.StringIO("unit_number,sensor_2\n1,640.0\n"))
+    with pytest.raises(BatchSchemaError, match="could not be parsed"):
+        batch.parse_csv(io.StringIO(",".join(KEPT) + "\n" + ",".join(["x"] * len(KEPT)) + "\n"))
+
+
+def test_unit_histories_reach_the_rolling_features(rolling_pipeline, fleet):
+    pipeline, booster, features = rolling_pipeline
+    units, times, raw = fleet
+    batch = BatchPredictionPipeline(prediction_pipeline=pipeline)
+    matrix, ids, cycles = batch.parse_columnar_json(columnar(units.astype(int).tolist(), times.tolist(), raw))
+    np.testing.assert_allclose(batch.predict(matrix, ids, cycles), booster.predict(features), rtol=1e-6)
+    with pytest.raises(SnapshotScoringError):
+        batch.predict(matrix)
@@ -0,0 +1,118 @@
+"""
+Parity of the compiled flat-array evaluator with the LightGBM booster it was
+compiled from, on single rows and batches, with missing values and through
+PredictionPipeline's small-batch path.
+"""
+import os
+
+import lightgbm
+import numpy as np
+import pytest
+
+from src.engine_sentinel.compiled_model import CompiledEnsemble
+from src.engine_sentinel.components.data_ingestion import parse_cmapss_file
+from src.engine_sentinel.model_artifact import save_model_artifact
+from src.engine_sentinel.pipeline.model_registry import PROJECT_ROOT, ModelRegistry, ModelRegistryConfig
+from src.engine_sentinel.pipeline.predict_pipeline import PredictionPipeline
+from src.engine_sentinel.utils import FEATURE_COLUMNS, file_sha256
+
+TOLERANCE = 1e-9
+ARTIFACTS_DIR = os.path.join(PROJECT_ROOT, "artifacts")
+TEST_FILE = os.path.join(PROJECT_ROOT, "data", "test_FD001.txt")
+
+
+def sample_rows(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 6))
+    X[:, 3] = rng.integers(0, 4, size=n_rows)
+    y = 2.0 * X[:, 0] - X[:, 1] ** 2 + np.sin(3 * X[:, 2]) + X[:, 3]
+    return X, y
+
+
+def train_booster(params, X, y, num_boost_round=40, feature_name="auto"):
+    params = {"objective": "regression", "verbose": -1, "seed": 0, **params}
+    return lightgbm.train(params, lightgbm.Dataset(X, y, feature_name=feature_name), num_boost_round=num_boost_round)
+
+
+def with_missing(X, seed=1):
+    # NaNs, exact zeros and values at the extremes of every column
+    X = X.copy()
+    rng = np.random.default_rng(seed)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    X[rng.random(X.shape) < 0.05] = 0.0
+    X[:3] = [np.nanmax(X, axis=0) * 10, np.nanmin(X, axis=0) * 10, np.full(X.shape[1], np.nan)]
+    return X
+
+
+@pytest.mark.parametrize("params", [
+    {"num_leaves": 15},
+    # More than 64 leaves per tree: the leaf masks span several words
+    {"num_leaves": 200, "min_data_in_leaf": 2},
+    {"num_leaves": 15, "zero_as_missing": True},
+    {"num_leaves": 15, "use_missing": False},
+], ids=["default", "multi_word", "zero_as_missing", "no_missing"])
+def test_compiled_matches_booster(params):
+    X, y = sample_rows(3000)
+    X_train = with_missing(X)
+    booster = train_booster(params, X_train, y)
+    compiled = CompiledEnsemble.from_booster(booster)
+
+    X_test = with_missing(sample_rows(500, seed=2)[0], seed=3)
+    expected = booster.predict(X_test)
+    np.testing.assert_allclose(compiled.predict(X_test), expected, rtol=0, atol=TOLERANCE)
+    singles = np.array([compiled.predict_row(row) for row in X_test[:100]])
+    np.testing.assert_allclose(singles, expected[:100], rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(compiled.predict(X_test[:1].astype(np.float32)),
+                               booster.predict(X_test[:1].astype(np.float32)), rtol=0, atol=TOLERANCE)
+
+
+def test_saved_compiled_model_matches_booster(tmp_path):
+    X, y = sample_rows(2000)
+    booster = train_booster({"num_leaves": 31}, X, y)
+    path = str(tmp_path / "compiled_model.npz")
+    CompiledEnsemble.from_booster(booster, source_sha256="abc").save(path)
+
+    loaded = CompiledEnsemble.load(path)
+    assert loaded.source_sha256 == "abc"
+    X_test = with_missing(sample_rows(300, seed=4)[0])
+    np.testing.assert_allclose(loaded.predict(X_test), booster.predict(X_test), rtol=0, atol=TOLERANCE)
+
+
+def test_committed_compiled_model_matches_booster():
+    model_path = os.path.join(ARTIFACTS_DIR, "model", "booster.txt")
+    compiled_path = os.path.join(ARTIFACTS_DIR, "compiled_model.npz")
+    if not (os.path.exists(model_path) and os.path.exists(compiled_path) and os.path.exists(TEST_FILE)):
+        pytest.skip("No trained model, compiled export or test data in this checkout")
+    compiled = CompiledEnsemble.load(compiled_path)
+    if compiled.source_sha256 != file_sha256(model_path):
+        pytest.skip("The compiled export was built from another model file")
+    booster = lightgbm.Booster(model_file=model_path)
+    if booster.feature_name() != FEATURE_COLUMNS:
+        pytest.skip("The committed model needs rolling features")
+
+    matrix = parse_cmapss_file(TEST_FILE)[:, 2:].astype(np.float32)
+    rows = matrix[np.random.default_rng(0).choice(len(matrix), 500, replace=False)]
+    np.testing.assert_allclose(compiled.predict(rows), booster.predict(rows), rtol=0, atol=TOLERANCE)
+
+
+def test_pipeline_small_batches_use_compiled_model(tmp_path):
+    if not os.path.exists(TEST_FILE):
+        pytest.skip(f"{TEST_FILE} not found")
+    matrix = parse_cmapss_file(TEST_FILE)[:, 2:].astype(np.float32)
+    rng = np.random.default_rng(0)
+    # The pipeline reads the input layout from the model's feature names
+    booster = train_booster({"num_leaves": 31}, matrix, rng.uniform(0, 200, size=len(matrix)),
+                            feature_name=FEATURE_COLUMNS)
+    model_path = save_model_artifact(str(tmp_path / "model"), booster)
+    compiled_path = str(tmp_path / "compiled_model.npz")
+    CompiledEnsemble.from_booster(booster, source_sha256=file_sha256(model_path)).save(compiled_path)
+
+    pipeline = PredictionPipeline(
+        model_path=model_path, registry=ModelRegistry(ModelRegistryConfig(watch_interval=0)),
+        compiled_model_path=compiled_path, compiled_max_rows=1,
+        feature_spec_path=None, feature_schema_path=None, regime_index_path=None, drift_reference_path=None,
+    )
+    assert pipeline.compiled_model() is not None
+    rows = matrix[rng.choice(len(matrix), 50, replace=False)]
+    singles = np.concatenate([pipeline.predict_matrix(row[None, :]) for row in rows])
+    np.testing.assert_allclose(singles, booster.predict(rows), rtol=0, atol=TOLERANCE)
@@ -0,0 +1,79 @@
+"""
+Drift monitoring: traffic like the training data is stable, a shifted sensor
+is flagged as drifted, out-of-range readings are reported per row, and small
+staged batches summarize like one large batch.
+"""
+import numpy as np
+import pytest
+
+from src.engine_sentinel.drift import DriftMonitor, DriftMonitorConfig, DriftReference
+from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+SENSOR_2 = FEATURE_COLUMNS.index("sensor_2")
+
+
+@pytest.fixture(scope="module")
+def reference(fleet):
+    return DriftReference.fit(fleet[2][:2000])
+
+
+def test_training_like_traffic_is_stable(reference, fleet):
+    monitor = DriftMonitor(reference)
+    monitor.observe(fleet[2][:2000])
+    report = monitor.report()
+    assert report["rows"] == 2000 and report["drifted"] == []
+    assert report["max_psi"] < 0.01
+    sensor = report["columns"]["sensor_2"]
+    assert sensor["status"] == "stable"
+    assert sensor["mean"] == pytest.approx(sensor["reference"]["mean"], rel=1e-6)
+    assert sensor["out_of_range"] == {"below": 0, "above": 0}
+
+
+def test_shifted_sensor_is_drifted(reference, fleet):
+    monitor = DriftMonitor(reference)
+    # The training rows themselves, so no other column moves
+    raw = fleet[2][:2000].copy()
+    raw[:, SENSOR_2] += 3 * reference.std[reference.columns.index("sensor_2")]
+    monitor.observe(raw)
+    report = monitor.report()
+    assert report["drifted"] == ["sensor_2"]
+    assert report["columns"]["sensor_2"]["psi"] >= DriftMonitorConfig().psi_alert
+
+
+def test_out_of_range_readings_are_flagged(reference, fleet):
+    monitor = DriftMonitor(reference)
+    raw = fleet[2][:3].copy()
+    raw[1, SENSOR_2] = 1e6
+    raw[2, FEATURE_COLUMNS.index("sensor_7")] = -1e6
+    mask = monitor.observe(raw)
+    assert monitor.flagged(mask) == {1: ["sensor_2"], 2: ["sensor_7"]}
+    report = monitor.report()
+    assert report["columns"]["sensor_2"]["out_of_range"] == {"below": 0, "above": 1}
+    assert report["columns"]["sensor_7"]["out_of_range"] == {"below": 1, "above": 0}
+    # Far fewer rows than min_rows: no PSI yet
+    assert report["max_psi"] is None and report["columns"]["sensor_2"]["status"] == "insufficient_data"
+
+
+def test_staged_rows_match_one_batch(reference, fleet):
+    raw = fleet[2][:700].copy()
+    raw[::7, SENSOR_2] = np.nan
+    batched, staged = DriftMonitor(reference), DriftMonitor(reference)
+    batched.observe(raw)
+    for start in range(0, len(raw), 3):
+        staged.observe(raw[start:start + 3])
+    expected, actual = batched.report(), staged.report()
+    assert actual["rows"] == expected["rows"] == 700
+    assert actual["columns"]["sensor_2"]["rows"] == 600
+    for name in ("sensor_2", "sensor_11"):
+        for key in ("psi", "rows", "min", "max", "quantiles"):
+            assert actual["columns"][name][key] == pytest.approx(expected["columns"][name][key])
+        assert actual["columns"][name]["mean"] == pytest.approx(expected["columns"][name]["mean"], rel=1e-9)
+
+
+def test_round_trip(tmp_path, reference):
+    path = str(tmp_path / "drift_reference.npz")
+    reference.save(path)
+    loaded = DriftReference.load(path)
+    assert loaded.columns == reference.columns and loaded.n_rows == reference.n_rows
+    np.testing.assert_array_equal(loaded.edges, reference.edges)
+    np.testing.assert_array_equal(loaded.fractions, reference.fractions)
@@ -0,0 +1,58 @@
+"""
+Fleet scoring: the per-unit tails and EWMA values folded chunk by chunk into
+a UnitTailStore give the same latest-cycle features and predictions as the
+batch engine over each unit's whole history.
+"""
+import io
+import os
+
+import numpy as np
+import pytest
+
+from src.engine_sentinel.features import segment_bounds
+from src.engine_sentinel.pipeline.fleet_scoring import (FleetScoringConfig, FleetScoringPipeline, UnitTailStore,
+                                                        tail_features)
+
+TEST_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "test_FD001.txt")
+
+
+def last_rows(units):
+    _, segment_end = segment_bounds(units)
+    return np.unique(segment_end)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 97, 3000])
+def test_tail_store_matches_the_batch_engine(rolling_pipeline, fleet, chunk_rows):
+    pipeline, _, features = rolling_pipeline
+    units, times, raw = fleet
+    engine = pipeline.feature_engine()
+    store = UnitTailStore(engine.config, capacity=4)
+    for start in range(0, len(units), chunk_rows):
+        stop = start + chunk_rows
+        store.update(units[start:stop].astype(np.int64), times[start:stop], raw[start:stop])
+
+    rows = last_rows(units)
+    np.testing.assert_array_equal(store.units, units[rows])
+    last_raw, tail, tail_time, length, ewma = store.batch(0, len(store))
+    np.testing.assert_array_equal(last_raw, raw[rows])
+    np.testing.assert_allclose(tail_features(engine, tail, tail_time, length, ewma),
+                               features[rows, len(raw[0]):], rtol=1e-5, atol=1e-6)
+
+
+def test_fleet_scores_match_whole_history_predictions(tmp_path, rolling_pipeline, fleet):
+    pipeline, booster, features = rolling_pipeline
+    units, times, _ = fleet
+    input_path = tmp_path / "test_FD001.txt"
+    with open(TEST_FILE) as file_obj:
+        input_path.write_text("".join(file_obj.readlines()[:len(units)]))
+
+    output = io.StringIO()
+    config = FleetScoringConfig(chunk_bytes=4096, batch_units=3, max_workers=1)
+    stats = FleetScoringPipeline(pipeline, config).run([str(input_path)], output)
+    rows = last_rows(units)
+    assert stats["rows"] == len(units) and stats["units"] == len(rows)
+
+    results = np.loadtxt(io.StringIO(output.getvalue()), delimiter=",", skiprows=1, usecols=(1, 2, 3))
+    np.testing.assert_array_equal(results[:, 0], units[rows])
+    np.testing.assert_array_equal(results[:, 1], times[rows])
+    np.testing.assert_allclose(results[:, 2], booster.predict(features[rows]), atol=1e-3)
@@ -0,0 +1,128 @@
+"""
+IncrementalTrainer: the watermark picks up only the units appended since the
+last run, rewritten files and new cycles of trained units force a full
+retrain, and a failed compiled-model parity check leaves the served model,
+its export and the watermark untouched.
+"""
+import os
+
+import lightgbm
+import numpy as np
+import pytest
+
+from src.engine_sentinel.compiled_model import CompiledEnsemble
+from src.engine_sentinel.components import incremental_trainer
+from src.engine_sentinel.components.data_ingestion import parse_cmapss_file, subset_id, table_to_frame
+from src.engine_sentinel.components.data_transformation import transform_units
+from src.engine_sentinel.components.incremental_trainer import (FullRetrainRequired, IncrementalTrainer,
+                                                               IncrementalTrainerConfig)
+from src.engine_sentinel.features import RollingFeatureConfig, RollingFeatureEngine
+from src.engine_sentinel.model_artifact import load_model_metadata, save_model_artifact
+from src.engine_sentinel.schema import FeatureSchema
+from src.engine_sentinel.utils import FEATURE_COLUMNS, ID_COLUMNS, TARGET_COLUMN, content_sha256, save_columnar
+
+TRAIN_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "train_FD001.txt")
+
+
+@pytest.fixture
+def unit_lines():
+    """
+    Lines of data/train_FD001.txt by unit number.
+    """
+    if not os.path.exists(TRAIN_FILE):
+        pytest.skip(f"{TRAIN_FILE} not found")
+    lines = {}
+    with open(TRAIN_FILE) as file_obj:
+        for line in file_obj:
+            lines.setdefault(int(line.split()[0]), []).append(line.strip() + "\n")
+    return lines
+
+
+@pytest.fixture
+def trainer(tmp_path, unit_lines):
+    """
+    A model trained on units 1-5 of a copy of FD001 and a bootstrapped
+    incremental trainer; returns (trainer, source file path).
+    """
+    source = tmp_path / "train_FD001.txt"
+    source.write_text("".join(line for unit in range(1, 6) for line in unit_lines[unit]))
+    raw = table_to_frame(parse_cmapss_file(str(source)))
+    raw.insert(0, "subset_id", np.int8(subset_id("FD001")))
+
+    engine = RollingFeatureEngine(RollingFeatureConfig(sensors=("sensor_2", "sensor_7", "sensor_11"), windows=(5,)))
+    schema = FeatureSchema(FEATURE_COLUMNS)
+    transformed = transform_units(raw, engine, schema)
+    transformed_path = str(tmp_path / "transformed_data")
+    save_columnar(transformed_path, transformed)
+    paths = {"feature_spec_path": str(tmp_path / "feature_spec.json"),
+             "feature_schema_path": str(tmp_path / "feature_schema.json"),
+             "compiled_model_path": str(tmp_path / "compiled_model.npz")}
+    engine.save(paths["feature_spec_path"])
+    schema.save(paths["feature_schema_path"])
+
+    X = transformed.drop(columns=[TARGET_COLUMN] + ID_COLUMNS)
+    booster = lightgbm.train({"objective": "regression", "verbose": -1, "seed": 0},
+                             lightgbm.Dataset(X, transformed[TARGET_COLUMN]), num_boost_round=20)
+    model_dir = str(tmp_path / "model")
+    save_model_artifact(model_dir, booster, training_data_sha256=content_sha256(transformed_path))
+
+    config = IncrementalTrainerConfig(state_path=str(tmp_path / "incremental" / "state.json"),
+                                      segments_dir=str(tmp_path / "incremental" / "segments"),
+                                      reference_dataset_path=str(tmp_path / "incremental" / "reference.bin"),
+                                      rounds=5, drift_threshold=100.0)
+    trainer = IncrementalTrainer(model_dir, config=config, **paths)
+    trainer.bootstrap([("FD001", str(source))], transformed_path)
+    return trainer, source
+
+
+def append(source, lines):
+    with open(source, "a") as file_obj:
+        file_obj.writelines(lines)
+
+
+def test_only_appended_units_are_trained(trainer, unit_lines):
+    trainer, source = trainer
+    sources = [("FD001", str(source))]
+    assert trainer.initiate_incremental_training(sources)["status"] == "up_to_date"
+
+    # A partial last line is left for the next run
+    new_lines = unit_lines[6] + unit_lines[7]
+    append(source, new_lines + [unit_lines[8][0][:20]])
+    report = trainer.initiate_incremental_training(sources)
+    assert report["status"] == "updated"
+    assert report["new_rows"] == len(new_lines) and report["num_trees"] == 25
+
+    compiled = CompiledEnsemble.load(trainer.compiled_model_path)
+    assert compiled.source_sha256 == load_model_metadata(trainer.model_dir)["booster_sha256"]
+    assert trainer.initiate_incremental_training(sources)["status"] == "up_to_date"
+    state = trainer.load_state()
+    assert state["watermarks"][str(source)]["units"]["FD001:7"] == len(unit_lines[7])
+    assert state["updates"] == 1 and len(state["segments"]) == 2
+
+
+def test_rewritten_files_and_extended_units_need_a_full_retrain(trainer, unit_lines):
+    trainer, source = trainer
+    sources = [("FD001", str(source))]
+    append(source, unit_lines[5][:1])
+    with pytest.raises(FullRetrainRequired, match="already trained unit"):
+        trainer.initiate_incremental_training(sources)
+
+    source.write_text("".join(unit_lines[1]))
+    with pytest.raises(FullRetrainRequired, match="rewritten"):
+        trainer.initiate_incremental_training(sources)
+
+
+def test_failed_parity_check_keeps_the_served_model(trainer, unit_lines, monkeypatch):
+    trainer, source = trainer
+    model_sha256 = load_model_metadata(trainer.model_dir)["booster_sha256"]
+    state = trainer.load_state()
+
+    def fail(*args, **kwargs):
+        raise ValueError("Compiled model deviates from model.predict")
+    monkeypatch.setattr(incremental_trainer, "check_parity", fail)
+    append(source, unit_lines[6])
+    with pytest.raises(Exception, match="deviates"):
+        trainer.initiate_incremental_training([("FD001", str(source))])
+    assert load_model_metadata(trainer.model_dir)["booster_sha256"] == model_sha256
+    assert not os.path.exists(trainer.compiled_model_path)
+    assert trainer.load_state() == state
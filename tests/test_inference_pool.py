@@ -0,0 +1,38 @@
+"""
+InferencePool: the workers score like the calling process, and after a retrain
+they follow the model version the pool owner serves, so small (in-process) and
+large (pooled) inputs get the same model.
+"""
+import numpy as np
+import pytest
+
+from src.engine_sentinel.pipeline.inference_pool import InferencePool, InferencePoolConfig
+from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+
+@pytest.fixture
+def pool(fleet, make_pipeline, train_model):
+    booster, model_path = train_model(fleet[2], FEATURE_COLUMNS)
+    config = InferencePoolConfig(n_workers=2, capacity_rows=4096, slice_rows=512, min_parallel_rows=100)
+    with InferencePool(make_pipeline(model_path), config) as pool:
+        yield pool, booster
+
+
+def test_pool_matches_in_process_scoring(pool, fleet):
+    pool, booster = pool
+    units, times, raw = fleet
+    np.testing.assert_allclose(pool.predict(raw), booster.predict(raw), rtol=1e-6)
+    np.testing.assert_allclose(pool.predict(raw, units, times), booster.predict(raw), rtol=1e-6)
+
+
+def test_workers_follow_a_retrained_model(pool, fleet, train_model):
+    pool, booster = pool
+    raw = fleet[2]
+    pool.predict(raw)
+
+    # Retrain on fewer rows into the same artifact directory
+    retrained, _ = train_model(raw[:1000], FEATURE_COLUMNS)
+    assert pool.reload()
+    expected = retrained.predict(raw)
+    np.testing.assert_allclose(pool.predict(raw), expected, rtol=1e-6)
+    np.testing.assert_allclose(pool.predict(raw[:50]), expected[:50], rtol=1e-6)
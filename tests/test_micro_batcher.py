@@ -0,0 +1,81 @@
+"""
+MicroBatcher: concurrent rows are coalesced into batches of at most
+max_batch_size, every caller gets the prediction of its own row, and a failed
+batch fails its callers without stopping the dispatcher.
+"""
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from src.engine_sentinel.pipeline.micro_batcher import MicroBatcher, MicroBatcherConfig
+
+
+def slow_sum(matrix):
+    # Long enough for the next requests to queue behind the running batch
+    time.sleep(0.01)
+    return matrix.sum(axis=1)
+
+
+def run_batcher(score, config, scenario):
+    async def main():
+        batcher = MicroBatcher(score, n_features=3, config=config)
+        await batcher.start()
+        try:
+            return await scenario(batcher), batcher.stats()
+        finally:
+            await batcher.stop()
+    return asyncio.run(main())
+
+
+def rows(n):
+    return [np.array([i, 2 * i, 0.5], dtype=np.float32) for i in range(n)]
+
+
+def test_concurrent_rows_are_batched():
+    async def scenario(batcher):
+        return await asyncio.gather(*(batcher.submit(row) for row in rows(100)))
+
+    config = MicroBatcherConfig(max_batch_size=16, max_wait_ms=50.0)
+    preds, stats = run_batcher(slow_sum, config, scenario)
+    assert preds == [3 * i + 0.5 for i in range(100)]
+    assert stats["requests"] == 100
+    assert stats["mean_batch_size"] > 1
+    assert max(int(size) for size in stats["batch_size_histogram"]) <= 16
+
+
+def test_lone_requests_are_not_held_back():
+    async def scenario(batcher):
+        preds = []
+        for row in rows(5):
+            preds.append(await batcher.submit(row))
+            await asyncio.sleep(0.1)
+        return preds
+
+    # Requests 100ms apart: waiting 20ms for companions would only delay each one
+    config = MicroBatcherConfig(max_wait_ms=20.0)
+    preds, stats = run_batcher(lambda matrix: matrix.sum(axis=1), config, scenario)
+    assert preds == [3 * i + 0.5 for i in range(5)]
+    assert stats["batch_size_histogram"] == {"1": 5}
+    assert stats["queue_delay_ms"]["max"] < 10.0
+
+
+def test_failed_batches_fail_their_callers_only():
+    calls = []
+
+    def flaky(matrix):
+        calls.append(len(matrix))
+        if len(calls) == 1:
+            raise ValueError("model unavailable")
+        return matrix.sum(axis=1)
+
+    async def scenario(batcher):
+        first, second = rows(2)
+        with pytest.raises(ValueError, match="model unavailable"):
+            await batcher.submit(first)
+        return await batcher.submit(second)
+
+    pred, stats = run_batcher(flaky, MicroBatcherConfig(max_wait_ms=0.0), scenario)
+    assert pred == 3.5
+    assert stats["batches"] == 2
@@ -0,0 +1,83 @@
+"""
+ModelRegistry: models are loaded once, swapped in when their content changes
+(explicitly or by the watcher), and a broken or missing artifact keeps the
+loaded version in service.
+"""
+import os
+import time
+
+import pytest
+
+from src.engine_sentinel.pipeline.model_registry import ModelRegistry, ModelRegistryConfig
+
+
+def read_text(path):
+    with open(path) as file_obj:
+        text = file_obj.read()
+    if text == "broken":
+        raise ValueError("not a model")
+    return text
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / "booster.txt"
+    path.write_text("tree 1")
+    return str(path)
+
+
+def rewrite(path, text):
+    # A distinct mtime even on file systems with coarse timestamps
+    with open(path, "w") as file_obj:
+        file_obj.write(text)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_models_are_loaded_once(artifact):
+    registry = ModelRegistry(ModelRegistryConfig(watch_interval=0))
+    assert registry.loaded_sha256(artifact) is None
+    model = registry.get(artifact, loader=read_text)
+    assert registry.get(artifact, loader=read_text) is model
+    assert registry.stats()["models"][artifact]["loads"] == 1
+    assert not registry.stats()["watcher_alive"]
+
+
+def test_reload_swaps_changed_content_only(artifact):
+    registry = ModelRegistry(ModelRegistryConfig(watch_interval=0))
+    registry.get(artifact, loader=read_text)
+    first_sha256 = registry.sha256(artifact)
+
+    rewrite(artifact, "tree 1")
+    assert not registry.reload()
+    rewrite(artifact, "tree 2")
+    assert registry.reload()
+    assert registry.get(artifact) == "tree 2"
+    assert registry.sha256(artifact) != first_sha256
+    stats = registry.stats()["models"][artifact]
+    assert (stats["version"], stats["reloads"]) == (2, 1)
+
+
+def test_broken_or_missing_artifacts_keep_the_loaded_model(artifact):
+    registry = ModelRegistry(ModelRegistryConfig(watch_interval=0))
+    registry.get(artifact, loader=read_text)
+    rewrite(artifact, "broken")
+    assert not registry.reload()
+    assert registry.get(artifact) == "tree 1"
+    assert registry.stats()["models"][artifact]["failed_reloads"] == 1
+
+    os.remove(artifact)
+    assert not registry.reload()
+    assert registry.get(artifact) == "tree 1"
+
+
+def test_watcher_hot_swaps_the_model(artifact):
+    registry = ModelRegistry(ModelRegistryConfig(watch_interval=0.05))
+    registry.get(artifact, loader=read_text)
+    assert registry.stats()["watcher_alive"]
+    rewrite(artifact, "tree 2")
+    deadline = time.monotonic() + 5
+    while registry.get(artifact) != "tree 2" and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert registry.get(artifact) == "tree 2"
+    registry._stop_event.set()
@@ -0,0 +1,40 @@
+"""
+PredictionPipeline with a model trained on per-unit rolling features: rows
+are scored with their engine history, and rows without unit ids are
+rejected instead of being scored as one-cycle snapshots.
+"""
+import numpy as np
+import pytest
+
+from src.engine_sentinel.pipeline.predict_pipeline import SnapshotScoringError
+from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+
+def test_rolling_model_scores_rows_with_their_history(rolling_pipeline, fleet):
+    pipeline, booster, features = rolling_pipeline
+    units, times, raw = fleet
+    assert pipeline.needs_history()
+    # Shuffled rows are put back in (unit, cycle) order for the features
+    order = np.random.default_rng(1).permutation(len(raw))
+    preds = pipeline.predict_matrix(raw[order], units[order], times[order])
+    np.testing.assert_allclose(preds, booster.predict(features[order]), rtol=1e-6)
+
+
+def test_rolling_model_rejects_snapshots(rolling_pipeline, fleet):
+    pipeline, _, _ = rolling_pipeline
+    raw = fleet[2]
+    with pytest.raises(SnapshotScoringError):
+        pipeline.predict_matrix(raw[:5])
+    with pytest.raises(SnapshotScoringError):
+        pipeline.predict(raw[:1])
+
+
+@pytest.mark.parametrize("columns", [FEATURE_COLUMNS, [c for c in FEATURE_COLUMNS if c not in ("op_setting_3", "sensor_1")]],
+                         ids=["all_columns", "pruned"])
+def test_raw_feature_model_scores_snapshots(fleet, make_pipeline, train_model, columns):
+    raw = fleet[2]
+    index = [FEATURE_COLUMNS.index(column) for column in columns]
+    booster, model_path = train_model(raw[:, index], columns)
+    pipeline = make_pipeline(model_path)
+    assert not pipeline.needs_history()
+    np.testing.assert_allclose(pipeline.predict_matrix(raw[:5]), booster.predict(raw[:5, index]), rtol=1e-6)
@@ -0,0 +1,76 @@
+"""
+RegimeIndex: the flight conditions are found from noisy op settings, each
+regime's sensors are normalized to zero mean and unit variance, single-
+condition data is left as recorded, and the index round-trips through its
+.npz file.
+"""
+import numpy as np
+import pytest
+
+from src.engine_sentinel.regimes import RegimeIndex, RegimeIndexConfig
+
+CONDITIONS = np.array([[0, 0, 100], [10, 0.25, 100], [20, 0.7, 100],
+                       [25, 0.62, 60], [35, 0.84, 100], [42, 0.84, 100]])
+
+
+@pytest.fixture(scope="module")
+def six_regimes(fleet):
+    """
+    The fleet's readings moved into six flight conditions, like
+    benchmarks/suite.py's six_regime_rows; returns (raw, true regime).
+    """
+    rng = np.random.default_rng(0)
+    raw = fleet[2].astype(np.float64)
+    regime = rng.integers(0, len(CONDITIONS), len(raw))
+    gain = rng.uniform(0.6, 1.4, (len(CONDITIONS), raw.shape[1] - 3))
+    offset = rng.uniform(-200, 200, (len(CONDITIONS), raw.shape[1] - 3))
+    raw[:, :3] = CONDITIONS[regime] + rng.normal(0, [0.003, 0.0003, 0], (len(raw), 3))
+    raw[:, 3:] = raw[:, 3:] * gain[regime] + offset[regime]
+    return raw.astype(np.float32), regime
+
+
+def test_regimes_are_found_and_normalized(six_regimes):
+    raw, regime = six_regimes
+    index = RegimeIndex.fit(raw)
+    assert index.active and index.n_regimes == 6
+
+    # One fitted regime per condition
+    assigned = index.assign(raw)
+    mapping = {true: np.unique(assigned[regime == true]) for true in range(len(CONDITIONS))}
+    assert all(len(found) == 1 for found in mapping.values())
+    assert len({int(found[0]) for found in mapping.values()}) == 6
+
+    normalized = index.normalize(raw)
+    np.testing.assert_array_equal(normalized[:, :3], raw[:, :3])
+    for found in np.unique(assigned):
+        rows = normalized[assigned == found][:, index.sensor_index]
+        # float32 readings of a few thousand with a small spread: z-scores good to ~1e-2
+        np.testing.assert_allclose(rows.mean(axis=0), 0, atol=1e-2)
+        # Sensors that are constant within a regime are only centred
+        varying = raw[assigned == found][:, index.sensor_index].std(axis=0) > 1e-3
+        np.testing.assert_allclose(rows[:, varying].std(axis=0), 1, atol=1e-2)
+
+
+def test_extra_conditions_are_merged(six_regimes):
+    raw, _ = six_regimes
+    index = RegimeIndex.fit(raw, config=RegimeIndexConfig(max_regimes=4))
+    assert index.n_regimes == 4
+    assert np.isfinite(index.normalize(raw)).all()
+
+
+def test_single_condition_data_is_left_as_recorded(fleet):
+    raw = fleet[2]
+    index = RegimeIndex.fit(raw)
+    assert not index.active
+    assert index.normalize(raw) is raw
+
+
+def test_round_trip(tmp_path, six_regimes):
+    raw, _ = six_regimes
+    columns = ["op_setting_1", "op_setting_2", "sensor_2", "sensor_7", "sensor_11"]
+    index = RegimeIndex.fit(raw, columns)
+    assert index.settings == columns[:2] and index.sensors == columns[2:]
+    path = str(tmp_path / "regime_index.npz")
+    index.save(path)
+    loaded = RegimeIndex.load(path)
+    np.testing.assert_array_equal(loaded.normalize(raw), index.normalize(raw))
@@ -0,0 +1,49 @@
+"""
+FeatureSchema: constant, near-zero-variance and duplicate columns are pruned
+with their reason, dtypes are compacted, and the schema round-trips through
+its JSON file.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.engine_sentinel.schema import FeatureSchema
+from src.engine_sentinel.utils import FEATURE_COLUMNS
+
+
+def test_pruning_rules():
+    rng = np.random.default_rng(0)
+    signal = rng.normal(size=1000)
+    rare = np.zeros(1000)
+    rare[:10] = 1.0
+    values = np.column_stack([signal, np.full(1000, 7.0), rare, 2 * signal + 1, rng.normal(size=1000)])
+    schema = FeatureSchema.fit(values, ["signal", "constant", "rare", "scaled", "noise"])
+    assert schema.input_columns == ["signal", "noise"]
+    assert schema.dropped == {"constant": "constant", "rare": "near_zero_variance", "scaled": "duplicate_of:signal"}
+
+
+def test_fd001_pruning(fleet):
+    schema = FeatureSchema.fit(fleet[2], FEATURE_COLUMNS)
+    # FD001 runs at one flight condition: these readings never move
+    for column in ("op_setting_3", "sensor_1", "sensor_10", "sensor_18", "sensor_19"):
+        assert column in schema.dropped
+    assert schema.input_columns == [column for column in FEATURE_COLUMNS if column not in schema.dropped]
+    assert schema.prune_sensors(("sensor_1", "sensor_2", "sensor_7")) == ("sensor_2", "sensor_7")
+
+
+def test_dtypes_and_round_trip(tmp_path):
+    df = pd.DataFrame({"unit_number": np.arange(100, dtype=np.int64), "sensor_2": np.linspace(0, 1, 100)})
+    schema = FeatureSchema(["sensor_2"], {"sensor_1": "constant"})
+    compact = schema.record_dtypes(df)
+    assert schema.dtypes == {"unit_number": "int8", "sensor_2": "float32"}
+    assert list(compact.dtypes) == [np.int8, np.float32]
+
+    path = str(tmp_path / "feature_schema.json")
+    schema.save(path)
+    loaded = FeatureSchema.load(path)
+    assert loaded.to_dict() == schema.to_dict()
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported feature schema format"):
+        FeatureSchema.from_dict({"format_version": 99, "input_columns": []})
@@ -0,0 +1,42 @@
+"""
+SuccessiveHalvingSearch: bad candidates are pruned after the first rung, the
+winner is refit with its early-stopped number of rounds, and dataset
+parameters may not vary between candidates.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.engine_sentinel.search import HalvingSearchConfig, SuccessiveHalvingSearch
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(600, 4)), columns=["a", "b", "c", "d"])
+    y = 3 * X["a"] - 2 * X["b"] ** 2 + rng.normal(scale=0.1, size=len(X))
+    return X, y
+
+
+def test_search_prunes_bad_candidates_and_refits_the_best(data):
+    X, y = data
+    grid = {"learning_rate": [1e-4, 0.1], "num_leaves": [4, 15], "n_estimators": [80]}
+    config = HalvingSearchConfig(cv=3, eta=2, min_resource=10, early_stopping_rounds=10)
+    search = SuccessiveHalvingSearch(grid, config).fit(X, y)
+
+    assert search.best_params_["learning_rate"] == 0.1
+    assert 1 <= search.best_params_["n_estimators"] <= 80
+    assert search.best_score_ > 0.8
+    assert len(search.cv_results_) == 4
+    assert all(result["fit_seconds"] > 0 for result in search.cv_results_)
+    # The tiny learning rate cannot fit anything in the first rung
+    slow = [result["mean_test_score"] for result in search.cv_results_ if result["params"]["learning_rate"] == 1e-4]
+    assert max(slow) < 0.1
+    assert search.best_estimator_.n_estimators == search.best_params_["n_estimators"]
+    assert np.corrcoef(search.best_estimator_.predict(X), y)[0, 1] > 0.9
+
+
+def test_dataset_parameters_cannot_vary(data):
+    X, y = data
+    with pytest.raises(Exception, match="Dataset parameters cannot vary"):
+        SuccessiveHalvingSearch({"max_bin": [63, 255], "n_estimators": [20]}).fit(X, y)
@@ -0,0 +1,67 @@
+"""
+StageCache: a stage runs once per set of inputs, a hit restores its outputs
+and result, and each stage keeps only its most recently used entries.
+"""
+import os
+
+import pytest
+
+from src.engine_sentinel.pipeline.stage_cache import StageCache, StageCacheConfig
+
+
+@pytest.fixture
+def stage(tmp_path):
+    """
+    A stage that writes its input's upper-cased text; returns (run, calls).
+    """
+    source, output = tmp_path / "source.txt", tmp_path / "output.txt"
+    calls = []
+
+    def run(cache, text):
+        source.write_text(text)
+
+        def function():
+            calls.append(text)
+            output.write_text(text.upper())
+            return {"length": len(text)}
+        result = cache.run("upper", {"source": str(source), "config": "v1"}, [str(output)], function)
+        return result, output.read_text()
+    return run, calls
+
+
+def test_hits_restore_outputs_and_result(tmp_path, stage):
+    run, calls = stage
+    cache = StageCache(StageCacheConfig(cache_dir=str(tmp_path / "cache")))
+    assert run(cache, "abc") == ({"length": 3}, "ABC")
+    (tmp_path / "output.txt").unlink()
+    assert run(cache, "abc") == ({"length": 3}, "ABC")
+    assert calls == ["abc"]
+    assert [record["status"] for record in cache.records] == ["miss", "hit"]
+
+    # Changed input content: a new key
+    assert run(cache, "abcd") == ({"length": 4}, "ABCD")
+    assert calls == ["abc", "abcd"]
+
+
+def test_disabled_cache_always_runs(tmp_path, stage):
+    run, calls = stage
+    cache = StageCache(StageCacheConfig(cache_dir=str(tmp_path / "cache"), enabled=False))
+    run(cache, "abc")
+    run(cache, "abc")
+    assert calls == ["abc", "abc"]
+    assert not os.path.exists(tmp_path / "cache")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, stage):
+    run, calls = stage
+    cache = StageCache(StageCacheConfig(cache_dir=str(tmp_path / "cache"), max_entries=2))
+    run(cache, "a")
+    run(cache, "b")
+    run(cache, "a")  # hit: "a" is now more recent than "b"
+    run(cache, "c")  # evicts "b"
+    assert len(os.listdir(tmp_path / "cache" / "upper")) == 2
+
+    run(cache, "a")
+    run(cache, "c")
+    run(cache, "b")
+    assert calls == ["a", "b", "c", "b"]
@@ -0,0 +1,82 @@
+"""
+StreamingPipeline: cycle-by-cycle updates match the batch rolling features,
+stale cycles are rejected without touching the state, and snapshots round-trip
+through per-process slot files.
+"""
+import numpy as np
+import pytest
+
+from src.engine_sentinel.pipeline.streaming_pipeline import (StaleCycleError, StreamingPipeline,
+                                                             StreamingPipelineConfig)
+
+
+@pytest.fixture
+def streaming(tmp_path, rolling_pipeline):
+    pipelines = []
+
+    def make():
+        config = StreamingPipelineConfig(snapshot_path=str(tmp_path / "stream_state.npz"), snapshot_interval=0)
+        pipelines.append(StreamingPipeline(prediction_pipeline=rolling_pipeline[0], config=config))
+        return pipelines[-1]
+    yield make
+    for pipeline in pipelines:
+        pipeline.close()
+
+
+def first_units(fleet, n_units):
+    units, times, raw = fleet
+    rows = np.flatnonzero(units <= n_units)
+    return units[rows], times[rows], raw[rows], rows
+
+
+def test_updates_match_batch_features(streaming, rolling_pipeline, fleet):
+    _, booster, features = rolling_pipeline
+    units, times, raw, rows = first_units(fleet, 3)
+    pipeline = streaming()
+    # Interleave the engines, each still in cycle order
+    order = np.lexsort((units, times))
+    preds = np.array([pipeline.update(units[i], times[i], raw[i]) for i in order])
+    np.testing.assert_allclose(preds, booster.predict(features[rows[order]]), rtol=1e-5)
+
+
+def test_stale_cycles_are_rejected_without_storing(streaming, fleet):
+    units, times, raw, _ = first_units(fleet, 1)
+    pipeline = streaming()
+    pipeline.update_batch(units[:3], times[:3], raw[:3])
+    for batch_times in ([times[2]], [times[1]], [times[3], times[3]]):
+        with pytest.raises(StaleCycleError):
+            pipeline.update_batch([units[0]] * len(batch_times), batch_times, raw[3:3 + len(batch_times)])
+    assert pipeline.store.last_time(units[0]) == times[2]
+    # The rejected batches left the unit able to take its next cycle
+    pipeline.update(units[3], times[3], raw[3])
+
+
+def test_snapshot_round_trip(streaming, fleet):
+    units, times, raw, _ = first_units(fleet, 2)
+    half = len(units) // 2
+    first = streaming()
+    first.update_batch(units[:half], times[:half], raw[:half])
+    first.close()
+
+    # A new process (here: a new pipeline) takes over the free slot and its state
+    restored = streaming()
+    assert restored.stats()["units"] == len(np.unique(units[:half]))
+    uninterrupted = streaming()
+    uninterrupted.update_batch(units[:half], times[:half], raw[:half])
+    np.testing.assert_allclose(restored.update_batch(units[half:], times[half:], raw[half:]),
+                               uninterrupted.update_batch(units[half:], times[half:], raw[half:]))
+
+
+def test_live_pipelines_use_separate_snapshot_files(streaming, fleet):
+    units, times, raw, _ = first_units(fleet, 2)
+    first, second = streaming(), streaming()
+    first.update(units[0], times[0], raw[0])
+    second.update(units[-1], times[-1], raw[-1])
+    assert first.snapshot_file() != second.snapshot_file()
+    first.close()
+    second.close()
+
+    # Each slot kept its own units instead of the last writer's
+    reopened = [streaming(), streaming()]
+    assert [pipeline.stats()["units"] for pipeline in reopened] == [1, 1]
+    assert reopened[0].snapshot_file() != reopened[1].snapshot_file()
@@ -0,0 +1,86 @@
+"""
+Offline experiment tracking: runs are recorded locally, uploaded to an MLflow
+file store once, resumed after a failed upload without logging twice, and
+artifacts replaced since the run are not attached to it.
+"""
+import os
+
+import pytest
+
+pytest.importorskip("mlflow")
+from mlflow.tracking import MlflowClient  # noqa: E402
+
+from src.engine_sentinel.tracking import (OfflineTracker, TrackingConfig, pending_runs, read_run,  # noqa: E402
+                                          upload_pending, upload_run)
+
+
+@pytest.fixture
+def config(tmp_path):
+    uri = (tmp_path / "mlruns").as_uri()
+    return TrackingConfig(mode="remote", local_dir=str(tmp_path / "tracking"), tracking_uri=uri, registry_uri=uri,
+                          registered_model_name="engine-sentinel")
+
+
+@pytest.fixture
+def recorded_run(tmp_path, config):
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    (model_dir / "booster.txt").write_text("tree 1\n")
+    tracker = OfflineTracker(config)
+    with tracker.start_run(run_name="train") as run:
+        run.log_params({"num_leaves": 31})
+        run.log_metrics({"rmse": 18.5})
+        run.log_artifact(str(model_dir), "model")
+    tracker.flush()
+    return run.run_dir, model_dir
+
+
+def client_for(config):
+    return MlflowClient(tracking_uri=config.tracking_uri, registry_uri=config.registry_uri)
+
+
+class FailingArtifactClient(MlflowClient):
+    """
+    Loses the connection on the first artifact upload.
+    """
+    def log_artifacts(self, *args, **kwargs):
+        raise ConnectionError("server went away")
+
+
+def test_run_is_recorded_locally(recorded_run, config):
+    run_dir, model_dir = recorded_run
+    run = read_run(run_dir)
+    assert run["status"] == "FINISHED"
+    assert run["params"] == {"num_leaves": "31"}
+    assert [metric[:2] for metric in run["metrics"]] == [("rmse", 18.5)]
+    assert run["artifacts"][0]["path"] == str(model_dir) and run["artifacts"][0]["sha256"]
+    assert pending_runs(config) == [run_dir]
+
+
+def test_upload_resumes_without_logging_twice(recorded_run, config):
+    run_dir, _ = recorded_run
+    failing = FailingArtifactClient(tracking_uri=config.tracking_uri, registry_uri=config.registry_uri)
+    with pytest.raises(ConnectionError):
+        upload_run(failing, run_dir, config)
+    assert pending_runs(config) == [run_dir]
+
+    [(uploaded_dir, remote_run_id)] = upload_pending(config)
+    assert uploaded_dir == run_dir and remote_run_id is not None
+    client = client_for(config)
+    assert len(client.get_metric_history(remote_run_id, "rmse")) == 1
+    assert [item.path for item in client.list_artifacts(remote_run_id)] == ["model"]
+    assert client.search_model_versions("name='engine-sentinel'")[0].run_id == remote_run_id
+    assert pending_runs(config) == []
+
+
+def test_replaced_artifacts_are_not_uploaded(recorded_run, config):
+    run_dir, model_dir = recorded_run
+    # A retrain replaces the model before the deferred upload
+    (model_dir / "booster.txt").write_text("tree 2\n")
+
+    remote_run_id = upload_run(client_for(config), run_dir, config)
+    client = client_for(config)
+    assert client.list_artifacts(remote_run_id) == []
+    assert client.get_run(remote_run_id).data.tags["engine_sentinel.skipped_artifacts"] == "model"
+    assert client.search_registered_models() == []
+    assert os.path.exists(os.path.join(run_dir, "upload.json"))